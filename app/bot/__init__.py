@@ -1,10 +1,11 @@
 from aiogram import Dispatcher
 
 from .handlers import router as main_router
-from .middleware import LoggingMiddleware
+from .middleware import AdmissionMiddleware, LoggingMiddleware
 
 
 def register_handlers(dp: Dispatcher) -> None:
     dp.message.middleware(LoggingMiddleware())
+    dp.message.middleware(AdmissionMiddleware.from_settings())
 
     dp.include_router(main_router)
@@ -1,24 +1,89 @@
 import logging
+from typing import List, Optional
 
 from aiogram import Router
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 
-from app.nlp.llm_client import parse_user_query
-from app.services.video_service import execute_analytics_query
+from app import metrics
+from app.config import settings
+from app.nlp.llm_client import parse_user_queries_async, parse_user_query_async
+from app.nlp.splitter import split_questions
+from app.services.report import REPORT_USAGE, format_report, parse_report_args, report_queries
+from app.services.video_service import (
+    execute_analytics_queries_async,
+    execute_analytics_query_async,
+    execute_batch_query_async,
+)
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+ERROR_REPLY = "Не удалось обработать запрос, попробуйте переформулировать."
+UNANSWERED_REPLY = "не удалось разобрать вопрос"
+
+
+def format_batch_reply(values: List[Optional[int]]) -> str:
+    """Ответы по номерам вопросов; None — вопрос без ответа."""
+    return "\n".join(
+        f"{number}. {UNANSWERED_REPLY if value is None else value}"
+        for number, value in enumerate(values, start=1)
+    )
+
+
+@router.message(Command("report"))
+async def handle_report(message: Message, command: CommandObject) -> None:
+    """/report <период> [креатор]: панель показателей одним запросом к БД."""
+    try:
+        date_range, creator_id = parse_report_args(command.args)
+    except ValueError:
+        await message.answer(REPORT_USAGE)
+        return
+
+    panel = report_queries(date_range, creator_id, settings.report_min_views)
+    stage = "sql"
+    try:
+        values = await execute_batch_query_async([parsed for _, parsed in panel])
+        stage = "reply"
+        with metrics.REPLY_LATENCY.time():
+            await message.answer(format_report(
+                date_range, creator_id, [(label, value) for (label, _), value in zip(panel, values)]
+            ))
+    except Exception:
+        metrics.ERRORS.inc(stage=stage)
+        logger.exception("Failed to build report for user %s: %s", message.from_user.id, message.text)
+        await message.answer(ERROR_REPLY)
+
 
 @router.message()
 async def handle_any_message(message: Message) -> None:
     text = message.text or ""
+    questions = split_questions(text)
 
+    # Этап, на котором произошла ошибка, попадает в метку bot_errors_total.
+    stage = "parse"
     try:
-        parsed = parse_user_query(text)
-        value = execute_analytics_query(parsed)
-        await message.answer(str(value))
+        if len(questions) > 1:
+            # Один запрос к LLM на все неразобранные вопросы и один обмен
+            # с БД на все SQL-запросы.
+            limit = settings.batch_max_questions
+            with metrics.PARSE_LATENCY.time():
+                parsed = await parse_user_queries_async(questions[:limit])
+            stage = "sql"
+            values = iter(await execute_analytics_queries_async([item for item in parsed if item is not None]))
+            reply = format_batch_reply([None if item is None else next(values) for item in parsed])
+            if len(questions) > limit:
+                reply += f"\nОтвечено на первые {limit} вопросов из {len(questions)}."
+        else:
+            with metrics.PARSE_LATENCY.time():
+                parsed_query = await parse_user_query_async(text)
+            stage = "sql"
+            reply = str(await execute_analytics_query_async(parsed_query))
+        stage = "reply"
+        with metrics.REPLY_LATENCY.time():
+            await message.answer(reply)
     except Exception as e:
+        metrics.ERRORS.inc(stage=stage)
         logger.exception("Failed to handle message from user %s: %s", message.from_user.id, text)
-        await message.answer("Не удалось обработать запрос, попробуйте переформулировать.")
+        await message.answer(ERROR_REPLY)
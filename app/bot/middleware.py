@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Awaitable, Callable, Dict
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message, TelegramObject
 
+from app import metrics
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,9 +28,179 @@ class LoggingMiddleware(BaseMiddleware):
             text = event.text or ""
             logger.info("Incoming message from %s: %r", user_id, text)
 
-        result = await handler(event, data)
+        with metrics.MESSAGE_LATENCY.time():
+            result = await handler(event, data)
 
         if isinstance(event, Message):
             logger.info("Handler finished for user %s", event.from_user.id if event.from_user else "unknown")
 
         return result
+
+
+RATE_LIMITED_REPLY = "Слишком много запросов подряд. Подождите немного и повторите вопрос."
+OVERLOADED_REPLY = "Сейчас бот перегружен, попробуйте повторить вопрос через минуту."
+
+
+class TokenBucket:
+    """Корзина токенов: capacity запросов подряд, далее refill_per_second в секунду."""
+
+    __slots__ = ("capacity", "refill_per_second", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = now
+
+    def take(self, now: float) -> bool:
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Ограничение нагрузки перед хендлером сообщений.
+
+    - У каждого пользователя своя корзина токенов (rate_per_minute,
+      burst): сверх неё пользователь получает вежливый отказ, и один
+      пользователь не может выбрать весь лимит LLM и пул БД.
+    - Одновременно обрабатывается не больше max_in_flight сообщений.
+      Остальные ждут в FIFO-очереди длиной до max_queue не дольше
+      queue_timeout секунд; если очередь полна или ожидание истекло,
+      сообщение отклоняется сразу, а не копится, поэтому задержка
+      принятых сообщений остаётся предсказуемой.
+
+    Нулевые или отрицательные значения отключают соответствующее ограничение.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = 20.0,
+        burst: int = 5,
+        max_in_flight: int = 32,
+        max_queue: int = 100,
+        queue_timeout: float = 15.0,
+        max_tracked_users: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate_per_second = rate_per_minute / 60.0
+        self._burst = max(1, burst)
+        self._max_in_flight = max_in_flight
+        self._max_queue = max(0, max_queue)
+        self._queue_timeout = queue_timeout if queue_timeout > 0 else None
+        self._max_tracked_users = max_tracked_users
+        self._clock = clock
+
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._stats = {"admitted": 0, "queued": 0, "rate_limited": 0, "shed": 0}
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionMiddleware":
+        return cls(
+            rate_per_minute=settings.user_rate_limit_per_minute,
+            burst=settings.user_rate_limit_burst,
+            max_in_flight=settings.max_in_flight_requests,
+            max_queue=settings.max_queued_requests,
+            queue_timeout=settings.queue_timeout_seconds,
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Message) or event.from_user is None:
+            return await handler(event, data)
+
+        if not self._take_token(event.from_user.id):
+            self._stats["rate_limited"] += 1
+            metrics.ADMISSION.inc(outcome="rate_limited")
+            logger.info("Rate limited user %s", event.from_user.id)
+            await event.answer(RATE_LIMITED_REPLY)
+            return None
+
+        if not await self._acquire():
+            self._stats["shed"] += 1
+            metrics.ADMISSION.inc(outcome="shed")
+            logger.warning("Shedding message from user %s: %s in flight, %s queued",
+                           event.from_user.id, self._in_flight, len(self._waiters))
+            await event.answer(OVERLOADED_REPLY)
+            return None
+
+        self._stats["admitted"] += 1
+        metrics.ADMISSION.inc(outcome="admitted")
+        try:
+            with metrics.MESSAGES_IN_FLIGHT.track_inprogress():
+                return await handler(event, data)
+        finally:
+            self._release()
+
+    def _take_token(self, user_id: int) -> bool:
+        if self._rate_per_second <= 0:
+            return True
+        now = self._clock()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self._burst, self._rate_per_second, now)
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self._max_tracked_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.take(now)
+
+    async def _acquire(self) -> bool:
+        if self._max_in_flight <= 0:
+            self._in_flight += 1
+            return True
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return True
+        if len(self._waiters) >= self._max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        metrics.ADMISSION.inc(outcome="queued")
+        metrics.MESSAGES_QUEUED.inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self._queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            # Слот мог освободиться одновременно с истечением таймаута.
+            if waiter.done():
+                return True
+            waiter.cancel()
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            metrics.MESSAGES_QUEUED.dec()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self) -> None:
+        # Освободившийся слот передаётся первому ожидающему, поэтому
+        # очередь обслуживается строго по порядку.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self._in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, in_flight=self._in_flight, queued_now=len(self._waiters))
@@ -1,17 +1,76 @@
+from functools import lru_cache
+from typing import Any, Literal
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
 
     telegram_bot_token: str
+    bot_mode: Literal["polling", "webhook"] = "polling"
+    webhook_base_url: str | None = None
+    webhook_path: str = "/webhook"
+    webhook_secret: str | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    user_rate_limit_per_minute: float = 20.0
+    user_rate_limit_burst: int = 5
+    max_in_flight_requests: int = 32
+    max_queued_requests: int = 100
+    queue_timeout_seconds: float = 15.0
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100
     database_url: str
+    database_async_url: str | None = None
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_pre_ping: bool = True
     llm_api_key: str
     llm_api_base: str | None = None
     llm_model: str = "gpt-4.1-mini"
+    llm_max_concurrency: int = 4
+    llm_timeout_seconds: float = 30.0
+    llm_prompt_examples: int = 3
+    batch_max_questions: int = 20
+    rule_parser_min_confidence: float = 0.9
+    query_cache_size: int = 1024
+    query_cache_path: str | None = None
+    result_cache_size: int = 2048
+    result_cache_ttl_seconds: float = 300.0
+    query_use_rollups: bool = True
+    query_executor: Literal["sql", "columnar"] = "sql"
+    columnar_refresh_seconds: float = 30.0
+    reporting_timezone: str = "UTC"
+    report_min_views: int = 100000
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Settings читаются из окружения и .env при первом обращении."""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Прокси к get_settings().
+
+    Позволяет импортировать settings на уровне модуля, не читая
+    окружение при импорте: экземпляр Settings создаётся при первом
+    обращении к атрибуту.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
+settings: Settings = _LazySettings()  # type: ignore[assignment]
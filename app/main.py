@@ -2,9 +2,82 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 from .config import settings
 from .bot import register_handlers
+from .metrics import start_metrics_server
+from .nlp import llm_client
+
+
+def build_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    register_handlers(dp)
+    return dp
+
+
+async def _healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def build_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    """
+    aiohttp-приложение для режима webhook.
+
+    Запрос от Telegram проверяется по заголовку
+    X-Telegram-Bot-Api-Secret-Token; ответ 200 отдаётся сразу, а апдейт
+    обрабатывается в фоновой задаче. Состояния между запросами нет,
+    поэтому несколько реплик можно поставить за балансировщик.
+    """
+    if not settings.webhook_secret:
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=settings.webhook_secret,
+    ).register(app, path=settings.webhook_path)
+    app.router.add_get("/healthz", _healthz)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_polling(bot: Bot, dp: Dispatcher) -> None:
+    logging.info("Starting Telegram bot polling...")
+    await dp.start_polling(bot)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    app = build_webhook_app(bot, dp)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    await site.start()
+    logging.info(
+        "Webhook server listening on %s:%s%s",
+        settings.webhook_host,
+        settings.webhook_port,
+        settings.webhook_path,
+    )
+
+    # Регистрация webhook идемпотентна, поэтому её может выполнять каждая реплика.
+    if settings.webhook_base_url:
+        url = settings.webhook_base_url.rstrip("/") + settings.webhook_path
+        await bot.set_webhook(
+            url,
+            secret_token=settings.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logging.info("Webhook registered: %s", url)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def main() -> None:
@@ -14,12 +87,23 @@ async def main() -> None:
     )
 
     bot = Bot(token=settings.telegram_bot_token)
-    dp = Dispatcher()
+    dp = build_dispatcher()
 
-    register_handlers(dp)
+    metrics_runner = None
+    if settings.metrics_port:
+        metrics_runner = await start_metrics_server(settings.metrics_host, settings.metrics_port)
+        logging.info("Metrics available at http://%s:%s/metrics", settings.metrics_host, settings.metrics_port)
 
-    logging.info("Starting Telegram bot polling...")
-    await dp.start_polling(bot)
+    try:
+        if settings.bot_mode == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await run_polling(bot, dp)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if llm_client.query_cache is not None:
+            llm_client.query_cache.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,290 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Небольшая реализация счётчиков, gauge и гистограмм без внешних
+зависимостей: метрики пишутся из хендлера, LLM-клиента и сервисного
+слоя, а start_metrics_server отдаёт их по HTTP на /metrics рядом с
+ботом. Все операции выполняются под блокировкой, поэтому метрики можно
+обновлять и из потоков (синхронные скрипты, executor).
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+
+# Границы подобраны под этапы бота: от микросекунд (разбор правилами,
+# build_sql) до десятков секунд (LLM с таймаутом).
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+M = TypeVar("M", bound="_Metric")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple("none" if labels[name] is None else str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: object) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Для каждой комбинации меток: счётчики по корзинам (не
+        # кумулятивные), сумма и число наблюдений.
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * len(self.buckets), [0.0, 0.0])
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+            entry[1][1] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Наблюдает длительность блока (в том числе завершившегося исключением)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return int(entry[1][1]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._values.items())
+
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, (counts, (total, observed)) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(observed)}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def _gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def _histogram(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames))
+
+
+# Сообщения и допуск (app.bot)
+MESSAGE_LATENCY = _histogram(
+    "bot_message_duration_seconds", "Full handling time of a message, including admission queueing"
+)
+ADMISSION = _counter(
+    "bot_admission_total", "Admission decisions for incoming messages", ["outcome"]
+)
+MESSAGES_IN_FLIGHT = _gauge("bot_messages_in_flight", "Messages currently being handled")
+MESSAGES_QUEUED = _gauge("bot_messages_queued", "Messages waiting in the admission queue")
+REPLY_LATENCY = _histogram("bot_reply_duration_seconds", "Time to send the answer to Telegram")
+ERRORS = _counter("bot_errors_total", "Failed messages by stage", ["stage"])
+
+# Разбор вопроса (app.nlp)
+PARSE_LATENCY = _histogram("bot_parse_duration_seconds", "Question to ParsedQuery latency")
+PARSE_SOURCE = _counter(
+    "bot_parse_total", "Parsed questions by source (rules, cache, llm)", ["source"]
+)
+LLM_LATENCY = _histogram("bot_llm_request_duration_seconds", "Latency of LLM requests")
+LLM_TOKENS = _counter("bot_llm_tokens_total", "LLM tokens by kind (prompt, cached, output)", ["kind"])
+LLM_IN_FLIGHT = _gauge("bot_llm_in_flight", "LLM requests currently in progress")
+
+# Запросы к БД (app.services)
+BUILD_SQL_LATENCY = _histogram("bot_build_sql_duration_seconds", "Time spent in build_sql")
+SQL_LATENCY = _histogram(
+    "bot_sql_duration_seconds", "Analytics SQL latency", ["metric", "entity", "special"]
+)
+SQL_IN_FLIGHT = _gauge("bot_sql_in_flight", "Analytics SQL queries currently in progress")
+CACHE_REQUESTS = _counter(
+    "bot_cache_requests_total", "Cache lookups by cache (query, result) and result (hit, miss)", ["cache", "result"]
+)
+
+# Объединение одинаковых запросов (app.single_flight)
+SINGLE_FLIGHT = _counter(
+    "bot_single_flight_requests_total",
+    "Single-flight calls by flight (parse, query) and result (leader, coalesced)",
+    ["flight", "result"],
+)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+async def start_metrics_server(host: str, port: int):
+    """
+    Поднимает HTTP-сервер с GET /metrics и возвращает его AppRunner
+    (остановка — runner.cleanup()).
+    """
+    from aiohttp import web
+
+    async def _metrics(request: web.Request) -> web.Response:
+        return web.Response(body=render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    return runner
@@ -0,0 +1,12 @@
+-- Migration: data version counter used to invalidate cached analytics results.
+-- app/scripts/load_json.py bumps it in the same transaction as every ingest.
+
+CREATE TABLE IF NOT EXISTS data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO data_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,186 @@
+-- Migration: pre-aggregated rollups over video_snapshots.
+--
+-- snapshot_rollup_hourly      — per UTC hour and creator;
+-- snapshot_rollup_daily       — per UTC day and creator;
+-- snapshot_rollup_video_daily — per UTC day and video (for COUNT(DISTINCT video_id)).
+--
+-- Each rollup stores the sum of delta_views_count, the number of snapshots and
+-- the number of snapshots with positive / negative delta_views_count.
+-- The rollups are maintained by a statement-level trigger on video_snapshots,
+-- so every loader mode (row, batch, COPY + merge) keeps them in sync.
+-- Snapshots are never updated or deleted by the loader, so only INSERT is handled.
+
+CREATE TABLE IF NOT EXISTS snapshot_rollup_hourly (
+    bucket_start TIMESTAMPTZ NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_sum BIGINT NOT NULL DEFAULT 0,
+    snapshots_count BIGINT NOT NULL DEFAULT 0,
+    positive_delta_count BIGINT NOT NULL DEFAULT 0,
+    negative_delta_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, creator_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_hourly_creator
+    ON snapshot_rollup_hourly (creator_id, bucket_start);
+
+CREATE TABLE IF NOT EXISTS snapshot_rollup_daily (
+    bucket_date DATE NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_sum BIGINT NOT NULL DEFAULT 0,
+    snapshots_count BIGINT NOT NULL DEFAULT 0,
+    positive_delta_count BIGINT NOT NULL DEFAULT 0,
+    negative_delta_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_date, creator_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_creator
+    ON snapshot_rollup_daily (creator_id, bucket_date);
+
+CREATE TABLE IF NOT EXISTS snapshot_rollup_video_daily (
+    bucket_date DATE NOT NULL,
+    video_id TEXT NOT NULL,
+    creator_id TEXT NOT NULL,
+    delta_views_sum BIGINT NOT NULL DEFAULT 0,
+    snapshots_count BIGINT NOT NULL DEFAULT 0,
+    positive_delta_count BIGINT NOT NULL DEFAULT 0,
+    negative_delta_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_date, video_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_video_daily_positive
+    ON snapshot_rollup_video_daily (bucket_date, video_id)
+    WHERE positive_delta_count > 0;
+
+-- Rows are upserted in key order so that concurrent loaders lock rollup rows
+-- in the same order and do not deadlock each other.
+CREATE OR REPLACE FUNCTION snapshot_rollups_after_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO snapshot_rollup_hourly AS r (
+        bucket_start, creator_id,
+        delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+    )
+    SELECT
+        date_trunc('hour', n.created_at, 'UTC'),
+        v.creator_id,
+        SUM(n.delta_views_count),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE n.delta_views_count > 0),
+        COUNT(*) FILTER (WHERE n.delta_views_count < 0)
+    FROM new_snapshots AS n
+    JOIN videos AS v ON v.id = n.video_id
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_start, creator_id) DO UPDATE SET
+        delta_views_sum = r.delta_views_sum + EXCLUDED.delta_views_sum,
+        snapshots_count = r.snapshots_count + EXCLUDED.snapshots_count,
+        positive_delta_count = r.positive_delta_count + EXCLUDED.positive_delta_count,
+        negative_delta_count = r.negative_delta_count + EXCLUDED.negative_delta_count;
+
+    INSERT INTO snapshot_rollup_daily AS r (
+        bucket_date, creator_id,
+        delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+    )
+    SELECT
+        (n.created_at AT TIME ZONE 'UTC')::date,
+        v.creator_id,
+        SUM(n.delta_views_count),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE n.delta_views_count > 0),
+        COUNT(*) FILTER (WHERE n.delta_views_count < 0)
+    FROM new_snapshots AS n
+    JOIN videos AS v ON v.id = n.video_id
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_date, creator_id) DO UPDATE SET
+        delta_views_sum = r.delta_views_sum + EXCLUDED.delta_views_sum,
+        snapshots_count = r.snapshots_count + EXCLUDED.snapshots_count,
+        positive_delta_count = r.positive_delta_count + EXCLUDED.positive_delta_count,
+        negative_delta_count = r.negative_delta_count + EXCLUDED.negative_delta_count;
+
+    INSERT INTO snapshot_rollup_video_daily AS r (
+        bucket_date, video_id, creator_id,
+        delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+    )
+    SELECT
+        (n.created_at AT TIME ZONE 'UTC')::date,
+        n.video_id,
+        v.creator_id,
+        SUM(n.delta_views_count),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE n.delta_views_count > 0),
+        COUNT(*) FILTER (WHERE n.delta_views_count < 0)
+    FROM new_snapshots AS n
+    JOIN videos AS v ON v.id = n.video_id
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_date, video_id) DO UPDATE SET
+        delta_views_sum = r.delta_views_sum + EXCLUDED.delta_views_sum,
+        snapshots_count = r.snapshots_count + EXCLUDED.snapshots_count,
+        positive_delta_count = r.positive_delta_count + EXCLUDED.positive_delta_count,
+        negative_delta_count = r.negative_delta_count + EXCLUDED.negative_delta_count;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_snapshot_rollups ON video_snapshots;
+
+CREATE TRIGGER trg_snapshot_rollups
+    AFTER INSERT ON video_snapshots
+    REFERENCING NEW TABLE AS new_snapshots
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION snapshot_rollups_after_insert();
+
+-- Backfill from already loaded snapshots. Rebuilding from scratch keeps the
+-- migration idempotent.
+BEGIN;
+
+TRUNCATE snapshot_rollup_hourly, snapshot_rollup_daily, snapshot_rollup_video_daily;
+
+INSERT INTO snapshot_rollup_hourly (
+    bucket_start, creator_id,
+    delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+)
+SELECT
+    date_trunc('hour', s.created_at, 'UTC'),
+    v.creator_id,
+    SUM(s.delta_views_count),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE s.delta_views_count > 0),
+    COUNT(*) FILTER (WHERE s.delta_views_count < 0)
+FROM video_snapshots AS s
+JOIN videos AS v ON v.id = s.video_id
+GROUP BY 1, 2;
+
+INSERT INTO snapshot_rollup_daily (
+    bucket_date, creator_id,
+    delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+)
+SELECT
+    (bucket_start AT TIME ZONE 'UTC')::date,
+    creator_id,
+    SUM(delta_views_sum),
+    SUM(snapshots_count),
+    SUM(positive_delta_count),
+    SUM(negative_delta_count)
+FROM snapshot_rollup_hourly
+GROUP BY 1, 2;
+
+INSERT INTO snapshot_rollup_video_daily (
+    bucket_date, video_id, creator_id,
+    delta_views_sum, snapshots_count, positive_delta_count, negative_delta_count
+)
+SELECT
+    (s.created_at AT TIME ZONE 'UTC')::date,
+    s.video_id,
+    v.creator_id,
+    SUM(s.delta_views_count),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE s.delta_views_count > 0),
+    COUNT(*) FILTER (WHERE s.delta_views_count < 0)
+FROM video_snapshots AS s
+JOIN videos AS v ON v.id = s.video_id
+GROUP BY 1, 2, 3;
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- Migration: index for date-only filters on videos.
+-- build_sql compares video_created_at with half-open timestamptz bounds; without
+-- a creator filter idx_videos_creator_created cannot serve such ranges.
+
+CREATE INDEX IF NOT EXISTS idx_videos_created
+    ON videos (video_created_at);
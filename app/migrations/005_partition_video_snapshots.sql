@@ -0,0 +1,169 @@
+-- Migration: range partitioning of video_snapshots by created_at.
+--
+-- Partitions cover whole UTC days (video_snapshots_p20251101) or months
+-- (video_snapshots_p202511). The granularity is chosen once, when the migration
+-- is applied, from the custom setting video_stats.snapshot_partition_granularity
+-- (month by default):
+--
+--     PGOPTIONS='-c video_stats.snapshot_partition_granularity=day' psql ... -f 005_partition_video_snapshots.sql
+--
+-- and is stored in video_snapshot_partitioning together with premake — how far
+-- ahead of now() partitions are created in advance. Daily partitions prune date
+-- filters more precisely, but queries without a date (creator totals) then visit
+-- every partition, so they only pay off with many snapshots per day.
+--
+-- The primary key becomes (id, created_at): a unique constraint on a partitioned
+-- table must include the partition key. A snapshot id always comes with the same
+-- created_at, so ON CONFLICT DO NOTHING still skips rows that are loaded twice.
+--
+-- Partitions are created by ensure_video_snapshot_partitions(from_ts, to_ts).
+-- The loader calls it for the periods of the rows it inserts, and
+-- create_future_video_snapshot_partitions() before every load; without regular
+-- loads schedule the latter (cron, pg_cron) daily. There is no DEFAULT partition:
+-- a row outside the existing partitions fails the insert instead of landing in a
+-- partition that would later prevent creating the right one.
+
+CREATE TABLE IF NOT EXISTS video_snapshot_partitioning (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    granularity TEXT NOT NULL CHECK (granularity IN ('day', 'month')),
+    premake INTERVAL NOT NULL
+);
+
+INSERT INTO video_snapshot_partitioning (id, granularity, premake)
+SELECT 1, s.granularity, CASE s.granularity WHEN 'day' THEN INTERVAL '30 days' ELSE INTERVAL '3 months' END
+FROM (
+    SELECT COALESCE(NULLIF(current_setting('video_stats.snapshot_partition_granularity', true), ''), 'month')
+        AS granularity
+) AS s
+ON CONFLICT (id) DO NOTHING;
+
+-- A partition is created as a plain table and then attached: ATTACH PARTITION
+-- takes SHARE UPDATE EXCLUSIVE on video_snapshots, which, unlike the ACCESS
+-- EXCLUSIVE of CREATE TABLE ... PARTITION OF, does not wait for transactions
+-- that are inserting snapshots. Returns the number of created partitions.
+--
+-- Concurrent loaders are serialized by EXCLUSIVE lock on
+-- video_snapshot_partitioning, held until commit; the one that waited re-checks
+-- the partition. An advisory lock is not enough here: taking it does not process
+-- catalog invalidations, so to_regclass() would still miss the partition the
+-- other loader has just committed and CREATE TABLE would fail with
+-- duplicate_table. The loader calls this before writing videos: ATTACH PARTITION
+-- waits for a lock on videos (foreign key), so a loader that had already written
+-- videos and then waited here for another one would deadlock with it.
+CREATE OR REPLACE FUNCTION ensure_video_snapshot_partitions(from_ts TIMESTAMPTZ, to_ts TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    unit TEXT;
+    step INTERVAL;
+    bucket TIMESTAMP;
+    last_bucket TIMESTAMP;
+    partition_name TEXT;
+    locked BOOLEAN := false;
+    created INTEGER := 0;
+BEGIN
+    IF from_ts IS NULL OR to_ts IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    SELECT granularity INTO STRICT unit FROM video_snapshot_partitioning WHERE id = 1;
+    step := ('1 ' || unit)::INTERVAL;
+    bucket := date_trunc(unit, from_ts AT TIME ZONE 'UTC');
+    last_bucket := date_trunc(unit, to_ts AT TIME ZONE 'UTC');
+
+    WHILE bucket <= last_bucket LOOP
+        partition_name := 'video_snapshots_p'
+            || to_char(bucket, CASE unit WHEN 'day' THEN 'YYYYMMDD' ELSE 'YYYYMM' END);
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Concurrent loaders: the second one waits here and re-checks.
+            IF NOT locked THEN
+                LOCK TABLE video_snapshot_partitioning IN EXCLUSIVE MODE;
+                locked := true;
+            END IF;
+            IF to_regclass(partition_name) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I (LIKE video_snapshots INCLUDING DEFAULTS)', partition_name);
+                EXECUTE format(
+                    'ALTER TABLE video_snapshots ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    partition_name,
+                    bucket AT TIME ZONE 'UTC',
+                    (bucket + step) AT TIME ZONE 'UTC'
+                );
+                created := created + 1;
+            END IF;
+        END IF;
+        bucket := bucket + step;
+    END LOOP;
+
+    RETURN created;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION create_future_video_snapshot_partitions()
+RETURNS INTEGER
+LANGUAGE sql AS $$
+    SELECT ensure_video_snapshot_partitions(now(), now() + premake)
+    FROM video_snapshot_partitioning
+    WHERE id = 1;
+$$;
+
+-- Converts the table once; re-running the migration leaves it as is. Existing
+-- rows are copied before the rollup trigger is created, so the rollups (already
+-- built from these rows by 003) are not counted twice. Run VACUUM ANALYZE
+-- video_snapshots afterwards: without the visibility map the planner does not
+-- use index-only scans on the new partitions.
+DO $$
+DECLARE
+    first_ts TIMESTAMPTZ;
+    last_ts TIMESTAMPTZ;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'video_snapshots'::regclass) THEN
+        RETURN;
+    END IF;
+
+    DROP TRIGGER IF EXISTS trg_snapshot_rollups ON video_snapshots;
+    DROP INDEX IF EXISTS idx_snapshots_created;
+    DROP INDEX IF EXISTS idx_snapshots_video;
+    ALTER TABLE video_snapshots RENAME TO video_snapshots_unpartitioned;
+    ALTER TABLE video_snapshots_unpartitioned
+        RENAME CONSTRAINT video_snapshots_pkey TO video_snapshots_unpartitioned_pkey;
+
+    CREATE TABLE video_snapshots (
+        id TEXT NOT NULL,
+        video_id TEXT NOT NULL REFERENCES videos(id),
+        views_count BIGINT NOT NULL,
+        likes_count BIGINT NOT NULL,
+        comments_count BIGINT NOT NULL,
+        reports_count BIGINT NOT NULL,
+        delta_views_count BIGINT NOT NULL,
+        delta_likes_count BIGINT NOT NULL,
+        delta_comments_count BIGINT NOT NULL,
+        delta_reports_count BIGINT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE INDEX idx_snapshots_created
+        ON video_snapshots (created_at);
+
+    CREATE INDEX idx_snapshots_video
+        ON video_snapshots (video_id, created_at);
+
+    SELECT min(created_at), max(created_at) INTO first_ts, last_ts FROM video_snapshots_unpartitioned;
+    PERFORM ensure_video_snapshot_partitions(first_ts, last_ts);
+    PERFORM create_future_video_snapshot_partitions();
+
+    INSERT INTO video_snapshots SELECT * FROM video_snapshots_unpartitioned;
+    DROP TABLE video_snapshots_unpartitioned;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_snapshot_rollups ON video_snapshots;
+
+CREATE TRIGGER trg_snapshot_rollups
+    AFTER INSERT ON video_snapshots
+    REFERENCING NEW TABLE AS new_snapshots
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION snapshot_rollups_after_insert();
+
+ANALYZE video_snapshots;
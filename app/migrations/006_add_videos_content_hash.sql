@@ -0,0 +1,7 @@
+-- Migration: content hash of every loaded video record.
+-- load_json stores a hash of the video row together with its snapshots; the
+-- incremental mode compares it with the export and skips unchanged videos.
+-- Rows loaded before this migration have NULL and are treated as changed once.
+
+ALTER TABLE videos
+    ADD COLUMN IF NOT EXISTS content_hash TEXT;
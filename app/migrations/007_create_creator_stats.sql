@@ -0,0 +1,251 @@
+-- Migration: per-creator totals over videos.
+--
+-- creator_stats has one row per creator with the number of videos, the sums of
+-- views_count / likes_count / comments_count, the largest views_count and the
+-- first / last video_created_at. Total questions without a date filter (and
+-- distinct_creators_with_min_views via max_views) are answered from it instead
+-- of aggregating videos.
+--
+-- The table is maintained by statement-level triggers on videos, so every
+-- loader mode keeps it in sync. The incremental loader updates changed videos in
+-- place: sums are adjusted by the difference between the old and new rows, and
+-- max / first / last are recomputed from videos only for creators whose extreme
+-- value may have come from an updated row. Videos are never deleted by the
+-- loader, so DELETE is not handled. The loader defers the triggers' changes and
+-- applies them once per load (see apply_creator_stats_delta below).
+
+CREATE TABLE IF NOT EXISTS creator_stats (
+    creator_id TEXT PRIMARY KEY,
+    videos_count BIGINT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_likes BIGINT NOT NULL DEFAULT 0,
+    total_comments BIGINT NOT NULL DEFAULT 0,
+    max_views BIGINT NOT NULL DEFAULT 0,
+    first_video_at TIMESTAMPTZ NOT NULL,
+    last_video_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_creator_stats_max_views
+    ON creator_stats (max_views);
+
+-- Triggers do not write creator_stats directly: each statement appends its
+-- per-creator changes to the temp table creator_stats_delta, and
+-- apply_creator_stats_delta() folds them in with one upsert in creator_id order.
+-- Normally the trigger applies them right away. A transaction that sets
+--
+--     SET LOCAL video_stats.defer_creator_stats = on;
+--
+-- must call apply_creator_stats_delta() itself before COMMIT (the temp table is
+-- dropped on commit). The loader does this once per load: otherwise each of its
+-- statements would lock the creator_stats rows of its own creators, every shard
+-- in a different order, and parallel loads would deadlock.
+CREATE OR REPLACE FUNCTION creator_stats_delta_table() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF to_regclass('pg_temp.creator_stats_delta') IS NULL THEN
+        CREATE TEMP TABLE creator_stats_delta (
+            creator_id TEXT NOT NULL,
+            videos_count BIGINT NOT NULL,
+            total_views BIGINT NOT NULL,
+            total_likes BIGINT NOT NULL,
+            total_comments BIGINT NOT NULL,
+            -- extremes of the added rows
+            max_views BIGINT,
+            first_video_at TIMESTAMPTZ,
+            last_video_at TIMESTAMPTZ,
+            -- extremes of the removed rows: a stored extreme may have come from them
+            old_max_views BIGINT,
+            old_first_video_at TIMESTAMPTZ,
+            old_last_video_at TIMESTAMPTZ
+        ) ON COMMIT DROP;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION apply_creator_stats_delta() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF to_regclass('pg_temp.creator_stats_delta') IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Sums are adjusted by the difference. A creator that only lost videos has
+    -- no new extremes: the placeholders leave the stored values as they are
+    -- (NOT NULL is checked before ON CONFLICT, so they cannot be NULL).
+    INSERT INTO creator_stats AS c (
+        creator_id, videos_count, total_views, total_likes, total_comments,
+        max_views, first_video_at, last_video_at
+    )
+    SELECT
+        d.creator_id,
+        SUM(d.videos_count),
+        SUM(d.total_views),
+        SUM(d.total_likes),
+        SUM(d.total_comments),
+        COALESCE(MAX(d.max_views), 0),
+        COALESCE(MIN(d.first_video_at), 'infinity'),
+        COALESCE(MAX(d.last_video_at), '-infinity')
+    FROM pg_temp.creator_stats_delta AS d
+    GROUP BY d.creator_id
+    ORDER BY d.creator_id
+    ON CONFLICT (creator_id) DO UPDATE SET
+        videos_count = c.videos_count + EXCLUDED.videos_count,
+        total_views = c.total_views + EXCLUDED.total_views,
+        total_likes = c.total_likes + EXCLUDED.total_likes,
+        total_comments = c.total_comments + EXCLUDED.total_comments,
+        max_views = GREATEST(c.max_views, EXCLUDED.max_views),
+        first_video_at = LEAST(c.first_video_at, EXCLUDED.first_video_at),
+        last_video_at = GREATEST(c.last_video_at, EXCLUDED.last_video_at);
+
+    -- A removed row that held an extreme value may have lowered it (or moved to
+    -- another creator). Views normally only grow, so this is rarely needed.
+    UPDATE creator_stats AS c SET
+        max_views = s.max_views,
+        first_video_at = s.first_video_at,
+        last_video_at = s.last_video_at
+    FROM (
+        SELECT
+            v.creator_id,
+            MAX(v.views_count) AS max_views,
+            MIN(v.video_created_at) AS first_video_at,
+            MAX(v.video_created_at) AS last_video_at
+        FROM videos AS v
+        WHERE v.creator_id IN (
+            SELECT d.creator_id
+            FROM pg_temp.creator_stats_delta AS d
+            JOIN creator_stats AS cs ON cs.creator_id = d.creator_id
+            WHERE d.old_max_views >= cs.max_views
+               OR d.old_first_video_at <= cs.first_video_at
+               OR d.old_last_video_at >= cs.last_video_at
+        )
+        GROUP BY v.creator_id
+    ) AS s
+    WHERE c.creator_id = s.creator_id;
+
+    -- Only the creators in the delta can lose videos; the table is not scanned.
+    DELETE FROM creator_stats AS c
+    WHERE c.videos_count = 0
+      AND c.creator_id IN (SELECT d.creator_id FROM pg_temp.creator_stats_delta AS d);
+
+    DELETE FROM pg_temp.creator_stats_delta;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION creator_stats_after_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- INSERT ... ON CONFLICT DO NOTHING may insert nothing.
+    IF NOT EXISTS (SELECT 1 FROM new_videos) THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM creator_stats_delta_table();
+    INSERT INTO pg_temp.creator_stats_delta (
+        creator_id, videos_count, total_views, total_likes, total_comments,
+        max_views, first_video_at, last_video_at
+    )
+    SELECT
+        n.creator_id,
+        COUNT(*),
+        SUM(n.views_count),
+        SUM(n.likes_count),
+        SUM(n.comments_count),
+        MAX(n.views_count),
+        MIN(n.video_created_at),
+        MAX(n.video_created_at)
+    FROM new_videos AS n
+    GROUP BY n.creator_id;
+
+    IF current_setting('video_stats.defer_creator_stats', true) IS DISTINCT FROM 'on' THEN
+        PERFORM apply_creator_stats_delta();
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION creator_stats_after_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- The trigger also fires for UPDATE statements that changed no rows.
+    IF NOT EXISTS (SELECT 1 FROM old_videos) THEN
+        RETURN NULL;
+    END IF;
+
+    -- New rows are added and old rows subtracted.
+    PERFORM creator_stats_delta_table();
+    INSERT INTO pg_temp.creator_stats_delta (
+        creator_id, videos_count, total_views, total_likes, total_comments,
+        max_views, first_video_at, last_video_at,
+        old_max_views, old_first_video_at, old_last_video_at
+    )
+    SELECT
+        d.creator_id,
+        SUM(d.videos_count),
+        SUM(d.views_count),
+        SUM(d.likes_count),
+        SUM(d.comments_count),
+        MAX(d.max_views),
+        MIN(d.video_created_at),
+        MAX(d.video_created_at),
+        MAX(d.old_views_count),
+        MIN(d.old_video_created_at),
+        MAX(d.old_video_created_at)
+    FROM (
+        SELECT n.creator_id, 1 AS videos_count, n.views_count, n.likes_count, n.comments_count,
+               n.views_count AS max_views, n.video_created_at,
+               NULL::BIGINT AS old_views_count, NULL::TIMESTAMPTZ AS old_video_created_at
+        FROM new_videos AS n
+        UNION ALL
+        SELECT o.creator_id, -1, -o.views_count, -o.likes_count, -o.comments_count,
+               NULL, NULL,
+               o.views_count, o.video_created_at
+        FROM old_videos AS o
+    ) AS d
+    GROUP BY d.creator_id;
+
+    IF current_setting('video_stats.defer_creator_stats', true) IS DISTINCT FROM 'on' THEN
+        PERFORM apply_creator_stats_delta();
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_creator_stats_insert ON videos;
+
+CREATE TRIGGER trg_creator_stats_insert
+    AFTER INSERT ON videos
+    REFERENCING NEW TABLE AS new_videos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION creator_stats_after_insert();
+
+DROP TRIGGER IF EXISTS trg_creator_stats_update ON videos;
+
+CREATE TRIGGER trg_creator_stats_update
+    AFTER UPDATE ON videos
+    REFERENCING OLD TABLE AS old_videos NEW TABLE AS new_videos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION creator_stats_after_update();
+
+-- Backfill from already loaded videos. Rebuilding from scratch keeps the
+-- migration idempotent.
+BEGIN;
+
+TRUNCATE creator_stats;
+
+INSERT INTO creator_stats (
+    creator_id, videos_count, total_views, total_likes, total_comments,
+    max_views, first_video_at, last_video_at
+)
+SELECT
+    v.creator_id,
+    COUNT(*),
+    SUM(v.views_count),
+    SUM(v.likes_count),
+    SUM(v.comments_count),
+    MAX(v.views_count),
+    MIN(v.video_created_at),
+    MAX(v.video_created_at)
+FROM videos AS v
+GROUP BY v.creator_id;
+
+COMMIT;
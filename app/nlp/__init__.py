@@ -1 +1 @@
-from .llm_client import parse_user_query  # noqa: F401
+from .llm_client import parse_user_query, parse_user_query_async  # noqa: F401
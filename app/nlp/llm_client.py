@@ -1,16 +1,55 @@
+import asyncio
 import json
-from typing import Any
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-import google.generativeai as genai
+from pydantic import ValidationError
 
+from app import metrics
 from app.config import settings
-from .prompt_builder import build_prompt
+from app.single_flight import SingleFlight
+from .prompt_builder import SYSTEM_INSTRUCTION, build_batch_prompt, build_prompt
+from .query_cache import TemplateQueryCache, normalize_text
 from .query_schema import ParsedQuery
+from .rule_parser import parse_with_rules
 
 
-genai.configure(api_key=settings.llm_api_key)
+logger = logging.getLogger(__name__)
 
-MODEL_NAME = settings.llm_model or "gemini-flash-latest"
+DEFAULT_MODEL_NAME = "gemini-flash-latest"
+
+# google.generativeai импортируется долго, а настройки при импорте модуля
+# ещё могут быть не заданы, поэтому SDK, модель и кэш создаются при первом
+# обращении (_get_genai, _get_model, get_query_cache).
+genai: Optional[Any] = None
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_model: Optional[Any] = None
+
+_usage_lock = threading.Lock()
+_usage: Dict[str, int] = {
+    "requests": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+    "output_tokens": 0,
+}
+
+query_cache: Optional[TemplateQueryCache] = None
+
+# Одинаковые (после нормализации) вопросы, заданные одновременно,
+# разбираются одним обращением к LLM.
+parse_flight = SingleFlight("parse")
+
+
+def get_query_cache() -> TemplateQueryCache:
+    global query_cache
+    if query_cache is None:
+        query_cache = TemplateQueryCache(
+            max_size=settings.query_cache_size,
+            path=settings.query_cache_path,
+        )
+    return query_cache
 
 
 def _extract_json_from_response(raw_content: str) -> Any:
@@ -33,13 +72,22 @@ def _extract_json_from_response(raw_content: str) -> Any:
     return json.loads(text)
 
 
-def parse_user_query(text: str) -> ParsedQuery:
-    prompt = build_prompt(text)
+def _extract_json_array_from_response(raw_content: str) -> Any:
+    """Как _extract_json_from_response, но для JSON-массива (ответ на несколько вопросов)."""
+    text = raw_content.strip()
+
+    if text.startswith("```"):
+        text = text.strip("`")
 
-    model = genai.GenerativeModel(MODEL_NAME)
+    first_bracket = text.find("[")
+    last_bracket = text.rfind("]")
+    if first_bracket != -1 and last_bracket != -1 and last_bracket > first_bracket:
+        text = text[first_bracket : last_bracket + 1]
 
-    response = model.generate_content(prompt)
+    return json.loads(text)
 
+
+def _response_text(response: Any) -> str:
     raw = getattr(response, "text", None)
     if not raw:
         if hasattr(response, "candidates") and response.candidates:
@@ -51,7 +99,290 @@ def parse_user_query(text: str) -> ParsedQuery:
             raw = "\n".join(parts)
         else:
             raise RuntimeError("Gemini response does not contain text")
+    return raw
+
 
-    data = _extract_json_from_response(raw)
+def _response_to_parsed_query(response: Any) -> ParsedQuery:
+    data = _extract_json_from_response(_response_text(response))
 
     return ParsedQuery.model_validate(data)
+
+
+def _response_to_parsed_queries(response: Any, count: int) -> List[Optional[ParsedQuery]]:
+    """
+    ParsedQuery по каждому вопросу из ответа-массива.
+
+    Массив другой длины не сопоставить с вопросами — это ошибка всего
+    запроса; элемент, не прошедший валидацию, даёт None только для
+    своего вопроса.
+    """
+    data = _extract_json_array_from_response(_response_text(response))
+    if not isinstance(data, list) or len(data) != count:
+        raise RuntimeError(f"Expected a JSON array of {count} ParsedQuery objects from Gemini")
+
+    parsed: List[Optional[ParsedQuery]] = []
+    for item in data:
+        try:
+            parsed.append(ParsedQuery.model_validate(item))
+        except ValidationError:
+            logger.warning("Invalid ParsedQuery in batch response: %r", item)
+            parsed.append(None)
+    return parsed
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Семафор, ограничивающий число одновременных запросов к LLM.
+
+    Создаётся лениво, чтобы не привязываться к event loop при импорте.
+    """
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(max(1, settings.llm_max_concurrency))
+    return _llm_semaphore
+
+
+def _parse_with_rules(text: str) -> Optional[ParsedQuery]:
+    """
+    ParsedQuery от быстрого разбора правилами, если он достаточно уверен
+    (settings.rule_parser_min_confidence), иначе None.
+    """
+    result = parse_with_rules(text)
+    if result.parsed is not None and result.confidence >= settings.rule_parser_min_confidence:
+        metrics.PARSE_SOURCE.inc(source="rules")
+        return result.parsed
+    return None
+
+
+def _get_cached(text: str) -> Optional[ParsedQuery]:
+    """Ответ из шаблонного кэша с учётом попаданий и промахов в метриках."""
+    cache = get_query_cache()
+    if cache.max_size <= 0:
+        return None
+    cached = cache.get(text)
+    metrics.CACHE_REQUESTS.inc(cache="query", result="miss" if cached is None else "hit")
+    if cached is not None:
+        metrics.PARSE_SOURCE.inc(source="cache")
+    return cached
+
+
+def _get_genai() -> Any:
+    global genai
+    if genai is None:
+        import google.generativeai
+
+        google.generativeai.configure(api_key=settings.llm_api_key)
+        genai = google.generativeai
+    return genai
+
+
+def model_name() -> str:
+    return settings.llm_model or DEFAULT_MODEL_NAME
+
+
+def _get_model() -> Any:
+    """
+    Модель со статической частью промпта в system instruction.
+
+    Создаётся один раз: схема и правила не пересобираются на каждый
+    вопрос, а одинаковый префикс запроса позволяет Gemini кэшировать его.
+    """
+    global _model
+    if _model is None:
+        _model = _get_genai().GenerativeModel(model_name(), system_instruction=SYSTEM_INSTRUCTION)
+    return _model
+
+
+def _record_usage(response: Any) -> None:
+    """Пишет в лог и суммирует число токенов запроса и ответа."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+
+    metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+    metrics.LLM_TOKENS.inc(cached_tokens, kind="cached")
+    metrics.LLM_TOKENS.inc(output_tokens, kind="output")
+
+    with _usage_lock:
+        _usage["requests"] += 1
+        _usage["prompt_tokens"] += prompt_tokens
+        _usage["cached_tokens"] += cached_tokens
+        _usage["output_tokens"] += output_tokens
+
+    logger.info(
+        "LLM tokens: prompt=%d (cached=%d) output=%d",
+        prompt_tokens,
+        cached_tokens,
+        output_tokens,
+    )
+
+
+def usage_stats() -> Dict[str, int]:
+    """Суммарное число запросов к LLM и токенов с момента запуска."""
+    with _usage_lock:
+        return dict(_usage)
+
+
+def parse_user_query(text: str) -> ParsedQuery:
+    fast = _parse_with_rules(text)
+    if fast is not None:
+        return fast
+
+    cached = _get_cached(text)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(text, k=settings.llm_prompt_examples)
+
+    metrics.PARSE_SOURCE.inc(source="llm")
+    started = time.perf_counter()
+    with metrics.LLM_IN_FLIGHT.track_inprogress():
+        response = _get_model().generate_content(prompt)
+    metrics.LLM_LATENCY.observe(time.perf_counter() - started)
+    _record_usage(response)
+
+    parsed = _response_to_parsed_query(response)
+    get_query_cache().learn(text, parsed)
+    return parsed
+
+
+async def parse_user_query_async(text: str) -> ParsedQuery:
+    """
+    Асинхронный вариант parse_user_query для хендлеров бота.
+
+    Запрос к Gemini не блокирует event loop; число одновременных
+    запросов ограничено settings.llm_max_concurrency, а каждый вызов —
+    таймаутом settings.llm_timeout_seconds (asyncio.TimeoutError).
+    Одновременные одинаковые вопросы ждут один общий вызов (parse_flight).
+    """
+    fast = _parse_with_rules(text)
+    if fast is not None:
+        return fast
+
+    return await parse_flight.do(normalize_text(text), lambda: _parse_with_llm_async(text))
+
+
+async def _parse_with_llm_async(text: str) -> ParsedQuery:
+    cached = _get_cached(text)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(text, k=settings.llm_prompt_examples)
+
+    metrics.PARSE_SOURCE.inc(source="llm")
+    async with _get_llm_semaphore():
+        started = time.perf_counter()
+        with metrics.LLM_IN_FLIGHT.track_inprogress():
+            response = await asyncio.wait_for(
+                _get_model().generate_content_async(prompt),
+                timeout=settings.llm_timeout_seconds,
+            )
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started)
+    _record_usage(response)
+
+    parsed = _response_to_parsed_query(response)
+    get_query_cache().learn(text, parsed)
+    return parsed
+
+
+def _parse_batch_locally(texts: List[str]) -> Tuple[List[Optional[ParsedQuery]], Dict[str, List[int]]]:
+    """
+    Разбор правилами и шаблонным кэшем для каждого вопроса.
+
+    Возвращает результаты (None — не разобран) и вопросы для LLM:
+    нормализованный текст -> номера вопросов, чтобы одинаковые вопросы
+    попали в промпт один раз.
+    """
+    results: List[Optional[ParsedQuery]] = []
+    pending: Dict[str, List[int]] = {}
+    for index, text in enumerate(texts):
+        parsed = _parse_with_rules(text) or _get_cached(text)
+        results.append(parsed)
+        if parsed is None:
+            pending.setdefault(normalize_text(text), []).append(index)
+    return results, pending
+
+
+def _apply_batch_response(
+    texts: List[str],
+    results: List[Optional[ParsedQuery]],
+    pending: Dict[str, List[int]],
+    response: Any,
+) -> List[Optional[ParsedQuery]]:
+    _record_usage(response)
+    parsed_items = _response_to_parsed_queries(response, len(pending))
+    for indexes, parsed in zip(pending.values(), parsed_items):
+        if parsed is None:
+            continue
+        get_query_cache().learn(texts[indexes[0]], parsed)
+        for index in indexes:
+            results[index] = parsed
+    return results
+
+
+def parse_user_queries(texts: List[str]) -> List[Optional[ParsedQuery]]:
+    """
+    Разбор нескольких вопросов одного сообщения.
+
+    Вопросы, которые не разобрали правила и шаблонный кэш, уходят в LLM
+    одним запросом (build_batch_prompt), модель отвечает JSON-массивом.
+    None — ответ модели на этот вопрос не прошёл валидацию или запрос к
+    LLM не удался целиком; ответы правил и кэша при этом сохраняются.
+    """
+    results, pending = _parse_batch_locally(texts)
+    if not pending:
+        return results
+
+    prompt = build_batch_prompt([texts[indexes[0]] for indexes in pending.values()], k=settings.llm_prompt_examples)
+
+    metrics.PARSE_SOURCE.inc(len(pending), source="llm")
+    try:
+        started = time.perf_counter()
+        with metrics.LLM_IN_FLIGHT.track_inprogress():
+            response = _get_model().generate_content(prompt)
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started)
+        return _apply_batch_response(texts, results, pending, response)
+    except Exception:
+        return _batch_llm_failed(results, pending)
+
+
+async def parse_user_queries_async(texts: List[str]) -> List[Optional[ParsedQuery]]:
+    """
+    Асинхронный вариант parse_user_queries: один запрос к LLM на все
+    неразобранные вопросы под общим семафором и таймаутом, как у
+    parse_user_query_async. Таймаут или неверный ответ LLM оставляют
+    None только у вопросов, которые ждали LLM.
+    """
+    results, pending = _parse_batch_locally(texts)
+    if not pending:
+        return results
+
+    prompt = build_batch_prompt([texts[indexes[0]] for indexes in pending.values()], k=settings.llm_prompt_examples)
+
+    metrics.PARSE_SOURCE.inc(len(pending), source="llm")
+    try:
+        async with _get_llm_semaphore():
+            started = time.perf_counter()
+            with metrics.LLM_IN_FLIGHT.track_inprogress():
+                response = await asyncio.wait_for(
+                    _get_model().generate_content_async(prompt),
+                    timeout=settings.llm_timeout_seconds,
+                )
+            metrics.LLM_LATENCY.observe(time.perf_counter() - started)
+        return _apply_batch_response(texts, results, pending, response)
+    except Exception:
+        return _batch_llm_failed(results, pending)
+
+
+def _batch_llm_failed(
+    results: List[Optional[ParsedQuery]],
+    pending: Dict[str, List[int]],
+) -> List[Optional[ParsedQuery]]:
+    """
+    Запрос к LLM за пачкой не удался (таймаут, ошибка API, массив не той
+    длины): вопросы, которые ждали LLM, остаются без ответа, а ответы
+    правил и шаблонного кэша отдаются как есть.
+    """
+    logger.exception("Batch LLM request for %s questions failed", len(pending))
+    return results
@@ -1,9 +1,26 @@
+"""
+Промпт для LLM.
+
+Статическая часть (схема БД, смысл полей ParsedQuery, правила ответа)
+собрана один раз в SYSTEM_INSTRUCTION и передаётся модели как system
+instruction. На каждый вопрос build_prompt добавляет только несколько
+самых похожих примеров из EXAMPLE_BANK и сам вопрос; build_batch_prompt —
+то же для нескольких вопросов сразу.
+"""
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .prompt_examples import EXAMPLE_BANK
+from .query_cache import canonicalize
 from .query_schema import ParsedQuery
 
 
-def build_prompt(user_text: str) -> str:
+DEFAULT_EXAMPLES = 3
 
-    schema_description = f"""
+SYSTEM_INSTRUCTION = """
 You are a system that maps Russian analytics questions about video statistics
 to a strict JSON specification.
 
@@ -141,155 +158,105 @@ You MUST:
    (no time part), inside date_range.start and date_range.end.
 5. If some field is not needed, set it to null (in JSON).
 
-You MUST return ONLY a single JSON object that matches ParsedQuery.
-Do NOT include comments, code fences, explanations, or any extra text.
-
-EXAMPLES (very important):
-
-Example 1:
-Q: "Сколько всего видео есть в системе?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "video",
-  "creator_id": null,
-  "min_views": null,
-  "date_range": null,
-  "time_from": null,
-  "time_to": null,
-  "special": null
-}}
-
-Example 2:
-Q: "Сколько видео у креатора с id 123 вышло с 1 ноября 2025 по 5 ноября 2025 включительно?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "video",
-  "creator_id": "123",
-  "min_views": null,
-  "date_range": {{
-    "start": "2025-11-01",
-    "end": "2025-11-05"
-  }},
-  "time_from": null,
-  "time_to": null,
-  "special": null
-}}
-
-Example 3:
-Q: "Сколько видео набрало больше 100 000 просмотров за всё время?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "video",
-  "creator_id": null,
-  "min_views": 100000,
-  "date_range": null,
-  "time_from": null,
-  "time_to": null,
-  "special": null
-}}
-
-Example 4:
-Q: "На сколько просмотров в сумме выросли все видео 28 ноября 2025?"
-A:
-{{
-  "metric": "sum_views_delta",
-  "entity": "snapshot",
-  "creator_id": null,
-  "min_views": null,
-  "date_range": {{
-    "start": "2025-11-28",
-    "end": "2025-11-28"
-  }},
-  "time_from": null,
-  "time_to": null,
-  "special": null
-}}
-
-Example 5:
-Q: "Сколько разных видео получали новые просмотры 27 ноября 2025?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "snapshot",
-  "creator_id": null,
-  "min_views": null,
-  "date_range": {{
-    "start": "2025-11-27",
-    "end": "2025-11-27"
-  }},
-  "time_from": null,
-  "time_to": null,
-  "special": "distinct_videos_with_positive_delta"
-}}
-
-Example 6:
-Q: "Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 набрали больше 10 000 просмотров по итоговой статистике?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "video",
-  "creator_id": "aca1061a9d324ecf8c3fa2bb32d7be63",
-  "min_views": 10000,
-  "date_range": null,
-  "time_from": null,
-  "time_to": null,
-  "special": null
-}}
-
-Example 7:
-Q: "Сколько всего есть замеров статистики (по всем видео), в которых число просмотров за час оказалось отрицательным — то есть по сравнению с предыдущим замером количество просмотров стало меньше?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "snapshot",
-  "creator_id": null,
-  "min_views": null,
-  "date_range": null,
-  "time_from": null,
-  "time_to": null,
-  "special": "snapshots_with_negative_delta_views"
-}}
-
-Example 8:
-Q: "На сколько просмотров суммарно выросли все видео креатора с id 123 в промежутке с 10:00 до 15:00 (по тому времени, которое хранится в замерах) 28 ноября 2025 года? Нужно сложить изменения просмотров между замерами, попадающими в этот интервал."
-A:
-{{
-  "metric": "sum_views_delta",
-  "entity": "snapshot",
-  "creator_id": "123",
-  "min_views": null,
-  "date_range": {{
-    "start": "2025-11-28",
-    "end": "2025-11-28"
-  }},
-  "time_from": "10:00",
-  "time_to": "15:00",
-  "special": null
-}}
-
-Example 9:
-Q: "Сколько разных креаторов имеют хотя бы одно видео, которое в итоге набрало больше 100 000 просмотров?"
-A:
-{{
-  "metric": "videos_count",
-  "entity": "video",
-  "creator_id": null,
-  "min_views": 100000,
-  "date_range": null,
-  "time_from": null,
-  "time_to": null,
-  "special": "distinct_creators_with_min_views"
-}}
-
-Now the real user question in Russian is:
-
-"{user_text}"
-
-Return ONLY the JSON object for ParsedQuery, with double quotes for all keys
-and string values, and with null instead of missing fields.
+You MUST return ONLY a single JSON object that matches ParsedQuery,
+with double quotes for all keys and string values, and with null instead
+of missing fields. Do NOT include comments, code fences, explanations,
+or any extra text. If the request lists several numbered questions, return
+instead a JSON array with one such object per question, in the same order.
+
+Each request contains a few solved examples followed by the real question.
 """
 
-    return schema_description
+_WORD_RE = re.compile(r"<\w+>|[a-zа-я]+")
+_STEM_LENGTH = 5
+
+
+def _features(text: str) -> FrozenSet[str]:
+    """
+    Признаки вопроса для лексического сходства: усечённые до пяти букв
+    слова шаблона и плейсхолдеры <id>, <date>, <time>, <num>.
+    """
+    template, _ = canonicalize(text)
+    return frozenset(word[:_STEM_LENGTH] for word in _WORD_RE.findall(template) if len(word) > 2)
+
+
+def _render_answer(answer: Dict[str, Any]) -> str:
+    return json.dumps(ParsedQuery.model_validate(answer).model_dump(), ensure_ascii=False)
+
+
+_BANK: List[Tuple[str, str, FrozenSet[str]]] = [
+    (question, _render_answer(answer), _features(question)) for question, answer in EXAMPLE_BANK
+]
+_DOCUMENT_FREQUENCY = Counter(feature for _, _, features in _BANK for feature in features)
+_IDF = {
+    feature: math.log((1 + len(_BANK)) / (1 + count)) + 1.0
+    for feature, count in _DOCUMENT_FREQUENCY.items()
+}
+
+
+def _similarity(query: FrozenSet[str], example: FrozenSet[str]) -> float:
+    # Взвешенный по IDF коэффициент Жаккара: редкие слова ("отриц",
+    # "креат") важнее частых ("сколь", "видео").
+    union = query | example
+    if not union:
+        return 0.0
+    common = sum(_IDF.get(f, 0.0) for f in query & example)
+    total = sum(_IDF.get(f, 1.0) for f in union)
+    return common / total
+
+
+def select_examples(user_text: str, k: Optional[int] = DEFAULT_EXAMPLES) -> List[Tuple[str, str]]:
+    """
+    Возвращает k примеров (вопрос, JSON-ответ), наиболее похожих на
+    вопрос. k=None — весь банк в исходном порядке.
+    """
+    if k is None:
+        return [(question, answer) for question, answer, _ in _BANK]
+    query = _features(user_text)
+    ranked = sorted(
+        range(len(_BANK)),
+        key=lambda i: (-_similarity(query, _BANK[i][2]), i),
+    )
+    return [(_BANK[i][0], _BANK[i][1]) for i in ranked[:max(0, k)]]
+
+
+def build_prompt(user_text: str, k: Optional[int] = DEFAULT_EXAMPLES) -> str:
+    """
+    Пользовательская часть запроса: k похожих примеров и вопрос.
+    Схема и правила передаются отдельно в SYSTEM_INSTRUCTION.
+    """
+    parts = ["EXAMPLES:"]
+    for number, (question, answer) in enumerate(select_examples(user_text, k), start=1):
+        parts.append(f'Example {number}:\nQ: "{question}"\nA:\n{answer}')
+    parts.append(
+        "Now the real user question in Russian is:\n\n"
+        f'"{user_text}"\n\n'
+        "Return ONLY the JSON object for ParsedQuery."
+    )
+    return "\n\n".join(parts)
+
+
+def build_batch_prompt(user_texts: List[str], k: Optional[int] = DEFAULT_EXAMPLES) -> str:
+    """
+    Пользовательская часть запроса для нескольких вопросов: похожие
+    примеры для каждого вопроса (без повторов) и пронумерованные вопросы.
+    Модель отвечает JSON-массивом ParsedQuery в том же порядке.
+    """
+    examples: List[Tuple[str, str]] = []
+    seen = set()
+    for user_text in user_texts:
+        for question, answer in select_examples(user_text, k):
+            if question not in seen:
+                seen.add(question)
+                examples.append((question, answer))
+
+    parts = ["EXAMPLES:"]
+    for number, (question, answer) in enumerate(examples, start=1):
+        parts.append(f'Example {number}:\nQ: "{question}"\nA:\n{answer}')
+    questions = "\n".join(f'{number}. "{text}"' for number, text in enumerate(user_texts, start=1))
+    parts.append(
+        "Now the real user questions in Russian are:\n\n"
+        f"{questions}\n\n"
+        f"Return ONLY a JSON array of {len(user_texts)} ParsedQuery objects, one per question, in the same order."
+    )
+    return "\n\n".join(parts)
@@ -0,0 +1,135 @@
+"""
+Банк примеров «вопрос → ParsedQuery» для промпта.
+
+В промпт попадают не все примеры, а несколько самых похожих на вопрос
+(см. prompt_builder.select_examples), поэтому банк можно расширять
+без роста размера каждого запроса к LLM.
+"""
+from typing import Any, Dict, List, Tuple
+
+
+EXAMPLE_BANK: List[Tuple[str, Dict[str, Any]]] = [
+    (
+        "Сколько всего видео есть в системе?",
+        {"metric": "videos_count", "entity": "video"},
+    ),
+    (
+        "Сколько видео у креатора с id 123 вышло с 1 ноября 2025 по 5 ноября 2025 включительно?",
+        {"metric": "videos_count", "entity": "video",
+         "creator_id": "123",
+         "date_range": {"start": "2025-11-01", "end": "2025-11-05"}},
+    ),
+    (
+        "Сколько видео набрало больше 100 000 просмотров за всё время?",
+        {"metric": "videos_count", "entity": "video",
+         "min_views": 100000},
+    ),
+    (
+        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+        {"metric": "sum_views_delta", "entity": "snapshot",
+         "date_range": {"start": "2025-11-28", "end": "2025-11-28"}},
+    ),
+    (
+        "Сколько разных видео получали новые просмотры 27 ноября 2025?",
+        {"metric": "videos_count", "entity": "snapshot",
+         "date_range": {"start": "2025-11-27", "end": "2025-11-27"},
+         "special": "distinct_videos_with_positive_delta"},
+    ),
+    (
+        "Сколько видео у креатора с id aca1061a9d324ecf8c3fa2bb32d7be63 набрали больше 10 000 просмотров по итоговой статистике?",
+        {"metric": "videos_count", "entity": "video",
+         "creator_id": "aca1061a9d324ecf8c3fa2bb32d7be63",
+         "min_views": 10000},
+    ),
+    (
+        "Сколько всего есть замеров статистики (по всем видео), в которых число просмотров за час оказалось отрицательным — то есть по сравнению с предыдущим замером количество просмотров стало меньше?",
+        {"metric": "videos_count", "entity": "snapshot",
+         "special": "snapshots_with_negative_delta_views"},
+    ),
+    (
+        "На сколько просмотров суммарно выросли все видео креатора с id 123 в промежутке с 10:00 до 15:00 (по тому времени, которое хранится в замерах) 28 ноября 2025 года? Нужно сложить изменения просмотров между замерами, попадающими в этот интервал.",
+        {"metric": "sum_views_delta", "entity": "snapshot",
+         "creator_id": "123",
+         "date_range": {"start": "2025-11-28", "end": "2025-11-28"},
+         "time_from": "10:00",
+         "time_to": "15:00"},
+    ),
+    (
+        "Сколько разных креаторов имеют хотя бы одно видео, которое в итоге набрало больше 100 000 просмотров?",
+        {"metric": "videos_count", "entity": "video",
+         "min_views": 100000,
+         "special": "distinct_creators_with_min_views"},
+    ),
+    (
+        "Сколько всего замеров статистики сделано 1 декабря 2025?",
+        {"metric": "videos_count", "entity": "snapshot",
+         "date_range": {"start": "2025-12-01", "end": "2025-12-01"}},
+    ),
+    (
+        "Сколько просмотров в сумме набрали все видео по итоговой статистике?",
+        {"metric": "sum_views_total", "entity": "video"},
+    ),
+    (
+        "Сколько лайков суммарно у видео креатора с id 456, опубликованных в ноябре 2025?",
+        {"metric": "sum_likes_total", "entity": "video",
+         "creator_id": "456",
+         "date_range": {"start": "2025-11-01", "end": "2025-11-30"}},
+    ),
+    (
+        "Сколько видео вышло за первую неделю декабря 2025?",
+        {"metric": "videos_count", "entity": "video",
+         "date_range": {"start": "2025-12-01", "end": "2025-12-07"}},
+    ),
+    (
+        "На сколько выросли просмотры видео креатора с id 789 с 25 по 30 ноября 2025?",
+        {"metric": "sum_views_delta", "entity": "snapshot",
+         "creator_id": "789",
+         "date_range": {"start": "2025-11-25", "end": "2025-11-30"}},
+    ),
+    (
+        "Сколько замеров с падением просмотров было с 20 по 22 ноября 2025?",
+        {"metric": "videos_count", "entity": "snapshot",
+         "date_range": {"start": "2025-11-20", "end": "2025-11-22"},
+         "special": "snapshots_with_negative_delta_views"},
+    ),
+    (
+        "Сколько креаторов выпустили хотя бы одно видео в октябре 2025?",
+        {"metric": "videos_count", "entity": "video",
+         "date_range": {"start": "2025-10-01", "end": "2025-10-31"},
+         "special": "distinct_creators_with_min_views"},
+    ),
+    (
+        "Какой суммарный прирост просмотров был 3 декабря 2025 между 18:00 и 23:00?",
+        {"metric": "sum_views_delta", "entity": "snapshot",
+         "date_range": {"start": "2025-12-03", "end": "2025-12-03"},
+         "time_from": "18:00",
+         "time_to": "23:00"},
+    ),
+    (
+        "Сколько видео креатора с id 123 собрали более миллиона просмотров?",
+        {"metric": "videos_count", "entity": "video",
+         "creator_id": "123",
+         "min_views": 1000000},
+    ),
+    (
+        "Сколько роликов опубликовано в период с 2025-11-10 по 2025-11-20?",
+        {"metric": "videos_count", "entity": "video",
+         "date_range": {"start": "2025-11-10", "end": "2025-11-20"}},
+    ),
+    (
+        "Сколько разных видео креатора с id 456 прибавили в просмотрах 29 ноября 2025?",
+        {"metric": "videos_count", "entity": "snapshot",
+         "creator_id": "456",
+         "date_range": {"start": "2025-11-29", "end": "2025-11-29"},
+         "special": "distinct_videos_with_positive_delta"},
+    ),
+    (
+        "Какое суммарное количество просмотров у видео, которые вышли 15 ноября 2025?",
+        {"metric": "sum_views_total", "entity": "video",
+         "date_range": {"start": "2025-11-15", "end": "2025-11-15"}},
+    ),
+    (
+        "Сколько всего лайков набрали все видео в системе?",
+        {"metric": "sum_likes_total", "entity": "video"},
+    ),
+]
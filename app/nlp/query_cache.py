@@ -0,0 +1,347 @@
+"""
+Кэш ParsedQuery по «шаблону» вопроса.
+
+Большая часть вопросов отличается только датами, id креатора и числами
+("Сколько видео у креатора X с 1 по 5 ноября 2025"). Такие значения
+вырезаются из текста в слоты, а оставшийся текст служит ключом кэша.
+По ответу LLM запоминается «скелет» ParsedQuery, в котором значения
+фильтров заменены ссылками на слоты; при следующем вопросе того же вида
+слоты подставляются обратно без обращения к LLM.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .query_schema import ParsedQuery
+
+
+_MONTHS_GENITIVE = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+_MONTH_RE = "|".join(_MONTHS_GENITIVE)
+
+_ID_RE = re.compile(r"\b[0-9a-f]{32}\b")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DOTTED_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+_RU_DAY_RANGE_RE = re.compile(rf"\bс (\d{{1,2}}) по (\d{{1,2}}) ({_MONTH_RE}) (\d{{4}})\b")
+_RU_DATE_RE = re.compile(rf"\b(\d{{1,2}}) ({_MONTH_RE}) (\d{{4}})\b")
+_TIME_RE = re.compile(r"\b(\d{1,2}):(\d{2})(?::(\d{2}))?\b")
+_NUMBER_RE = re.compile(r"\b\d{1,3}(?:[ \u00a0\u202f]\d{3})+\b|\b\d+\b")
+
+_SLOT_REF = "$slot"
+
+
+class Slot(NamedTuple):
+    kind: str  # "id" | "date" | "time" | "num"
+    value: Any
+
+
+def _iso(year: str, month: int, day: str) -> Optional[str]:
+    try:
+        return date(int(year), month, int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _canonical_time(value: str) -> str:
+    parts = value.split(":")
+    while len(parts) < 3:
+        parts.append("00")
+    return ":".join(p.zfill(2) for p in parts)
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, ё -> е, схлопнутые пробелы, без завершающих "?!."."""
+    return " ".join(text.lower().replace("ё", "е").split()).rstrip(" ?!.")
+
+
+def canonicalize(text: str) -> Tuple[str, List[Slot]]:
+    """
+    Возвращает (шаблон, слоты) для текста вопроса.
+
+    Шаблон — нормализованный текст, в котором id креаторов, даты, время
+    и числа заменены на <id>, <date>, <time> и <num>. Слоты идут в порядке
+    их извлечения, поэтому у текстов с одинаковым шаблоном они сопоставимы.
+    """
+    template = normalize_text(text)
+    slots: List[Slot] = []
+
+    def _id(m: re.Match) -> str:
+        slots.append(Slot("id", m.group(0)))
+        return "<id>"
+
+    def _iso_date(m: re.Match) -> str:
+        value = _iso(m.group(1), int(m.group(2)), m.group(3))
+        if value is None:
+            return m.group(0)
+        slots.append(Slot("date", value))
+        return "<date>"
+
+    def _dotted_date(m: re.Match) -> str:
+        value = _iso(m.group(3), int(m.group(2)), m.group(1))
+        if value is None:
+            return m.group(0)
+        slots.append(Slot("date", value))
+        return "<date>"
+
+    def _ru_day_range(m: re.Match) -> str:
+        month = _MONTHS_GENITIVE[m.group(3)]
+        start = _iso(m.group(4), month, m.group(1))
+        end = _iso(m.group(4), month, m.group(2))
+        if start is None or end is None:
+            return m.group(0)
+        slots.append(Slot("date", start))
+        slots.append(Slot("date", end))
+        return "с <date> по <date>"
+
+    def _ru_date(m: re.Match) -> str:
+        value = _iso(m.group(3), _MONTHS_GENITIVE[m.group(2)], m.group(1))
+        if value is None:
+            return m.group(0)
+        slots.append(Slot("date", value))
+        return "<date>"
+
+    def _time(m: re.Match) -> str:
+        slots.append(Slot("time", m.group(0)))
+        return "<time>"
+
+    def _number(m: re.Match) -> str:
+        slots.append(Slot("num", int(re.sub(r"\D", "", m.group(0)))))
+        return "<num>"
+
+    template = _ID_RE.sub(_id, template)
+    template = _ISO_DATE_RE.sub(_iso_date, template)
+    template = _DOTTED_DATE_RE.sub(_dotted_date, template)
+    template = _RU_DAY_RANGE_RE.sub(_ru_day_range, template)
+    template = _RU_DATE_RE.sub(_ru_date, template)
+    template = _TIME_RE.sub(_time, template)
+    template = _NUMBER_RE.sub(_number, template)
+
+    return template, slots
+
+
+def _find_slot(slots: List[Slot], field: str, value: Any) -> Optional[int]:
+    """
+    Индекс единственного слота, из которого могло взяться значение поля.
+
+    Возвращает -1, если подходящих слотов несколько (скелет был бы
+    неоднозначным), и None, если ни одного.
+    """
+    if field == "creator_id":
+        matches = [
+            i for i, s in enumerate(slots)
+            if (s.kind == "id" and s.value == value) or (s.kind == "num" and str(s.value) == value)
+        ]
+    elif field == "min_views":
+        matches = [i for i, s in enumerate(slots) if s.kind == "num" and s.value == value]
+    elif field in ("start", "end"):
+        matches = [i for i, s in enumerate(slots) if s.kind == "date" and s.value == value]
+    elif field in ("time_from", "time_to"):
+        canonical = _canonical_time(value)
+        matches = [
+            i for i, s in enumerate(slots)
+            if s.kind == "time" and _canonical_time(s.value) == canonical
+        ]
+    else:
+        matches = []
+
+    if not matches:
+        return None
+    if len(matches) > 1:
+        return -1
+    return matches[0]
+
+
+def _build_skeleton(parsed: ParsedQuery, slots: List[Slot]) -> Optional[Dict[str, Any]]:
+    data = parsed.model_dump()
+    used = set()
+
+    def _to_ref(container: Dict[str, Any], field: str) -> bool:
+        value = container.get(field)
+        if value is None:
+            return True
+        index = _find_slot(slots, field, value)
+        if index is None or index < 0:
+            return False
+        container[field] = {_SLOT_REF: index}
+        used.add(index)
+        return True
+
+    for field in ("creator_id", "min_views", "time_from", "time_to"):
+        if not _to_ref(data, field):
+            return None
+
+    if data.get("date_range") is not None:
+        for field in ("start", "end"):
+            if not _to_ref(data["date_range"], field):
+                return None
+
+    # Слот, не попавший в скелет, всё равно мог повлиять на ответ LLM
+    # (например, «за последние 3 дня») — такие шаблоны не кэшируем.
+    if len(used) != len(slots):
+        return None
+
+    return data
+
+
+def _fill_skeleton(skeleton: Any, slots: List[Slot], field: Optional[str] = None) -> Any:
+    if isinstance(skeleton, dict):
+        if set(skeleton) == {_SLOT_REF}:
+            value = slots[skeleton[_SLOT_REF]].value
+            # creator_id может прийти из числового слота («креатора 123»),
+            # а в ParsedQuery это строка.
+            return str(value) if field == "creator_id" else value
+        return {key: _fill_skeleton(value, slots, key) for key, value in skeleton.items()}
+    return skeleton
+
+
+class TemplateQueryCache:
+    """
+    LRU-кэш «шаблон вопроса -> скелет ParsedQuery».
+
+    max_size=0 отключает кэш. Если задан path, содержимое читается
+    при создании, а новые шаблоны сохраняются на диск фоновым потоком не
+    чаще раза в save_delay секунд: learn() вызывается из хендлеров бота
+    и не должен переписывать файл в event loop. flush() сохраняет
+    несохранённое сразу (при остановке бота).
+    """
+
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None, save_delay: float = 5.0) -> None:
+        self.max_size = max_size
+        self.path = Path(path) if path else None
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
+
+        if self.path is not None and self.path.is_file():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[ParsedQuery]:
+        if self.max_size <= 0:
+            return None
+
+        template, slots = canonicalize(text)
+
+        with self._lock:
+            skeleton = self._entries.get(template)
+            if skeleton is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(template)
+
+        try:
+            parsed = ParsedQuery.model_validate(_fill_skeleton(skeleton, slots))
+        except ValidationError:
+            # Скелет не подходит к новым значениям слотов (или сохранён
+            # старой версией): это промах, вопрос уйдёт в LLM, и его ответ
+            # заменит скелет.
+            with self._lock:
+                self.misses += 1
+                if self._entries.get(template) is skeleton:
+                    del self._entries[template]
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return parsed
+
+    def learn(self, text: str, parsed: ParsedQuery) -> bool:
+        """
+        Запоминает ответ LLM для шаблона текста.
+
+        Возвращает False, если значения фильтров нельзя однозначно
+        сопоставить слотам вопроса — такой ответ не обобщается.
+        """
+        if self.max_size <= 0:
+            return False
+
+        template, slots = canonicalize(text)
+        skeleton = _build_skeleton(parsed, slots)
+        if skeleton is None:
+            return False
+
+        with self._lock:
+            is_new = template not in self._entries
+            self._entries[template] = skeleton
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        if is_new and self.path is not None:
+            self._schedule_save()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _schedule_save(self) -> None:
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._save_scheduled)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_scheduled(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def flush(self) -> None:
+        """Сохраняет отложенные изменения сразу."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                payload = {"templates": list(self._entries.items())}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def load(self) -> None:
+        if self.path is None:
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        with self._lock:
+            self._entries = OrderedDict(
+                (template, skeleton) for template, skeleton in payload.get("templates", [])
+            )
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
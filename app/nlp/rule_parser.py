@@ -0,0 +1,331 @@
+"""
+Быстрый разбор типовых вопросов без обращения к LLM.
+
+Большая часть вопросов повторяет формулировки из примеров промпта
+("Сколько всего видео есть в системе?", "с 1 по 5 ноября 2025",
+"больше 100 000 просмотров"). Такие вопросы разбираются набором
+регулярных выражений: из текста по очереди вырезаются id креатора,
+даты, время и порог просмотров, а по оставшимся словам определяется
+метрика.
+
+Разбор возвращает ParsedQuery вместе с оценкой уверенности от 0 до 1.
+Уверенность снижается, если в тексте остались нераспознанные числа или
+слова, которых нет в словаре правил (_FILLER_WORDS_RE), упомянуты
+лайки, креаторы, просмотры или замеры, которые разбор не использовал
+(«видео с хотя бы одним лайком», «сколько видео и креаторов»), или
+вопрос допускает два прочтения. Неподдерживаемые конструкции (среднее,
+«вчера», отрицание, открытый период «до 1 ноября») сразу отдаются LLM.
+"""
+from __future__ import annotations
+
+import calendar
+import re
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .query_schema import ParsedQuery
+
+
+_MONTHS_GENITIVE = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+# "за ноябрь 2025" и "в ноябре 2025" — весь месяц.
+_MONTHS_WHOLE = {
+    "январь": 1, "февраль": 2, "март": 3, "апрель": 4, "май": 5, "июнь": 6,
+    "июль": 7, "август": 8, "сентябрь": 9, "октябрь": 10, "ноябрь": 11, "декабрь": 12,
+    "январе": 1, "феврале": 2, "марте": 3, "апреле": 4, "мае": 5, "июне": 6,
+    "июле": 7, "августе": 8, "сентябре": 9, "октябре": 10, "ноябре": 11, "декабре": 12,
+}
+
+_GEN_RE = "|".join(_MONTHS_GENITIVE)
+_WHOLE_RE = "|".join(_MONTHS_WHOLE)
+_YEAR_TAIL = r"(?:\s+(?:года|г\.?))?"
+_NUM = r"\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+"
+
+_ID_RE = re.compile(r"\b(?:с\s+)?(?:id|айди)\s*[:=]?\s*[«\"']?([0-9a-z][0-9a-z_-]*)", re.IGNORECASE)
+_HEX_ID_RE = re.compile(r"\b[0-9a-f]{32}\b", re.IGNORECASE)
+
+_RU_RANGE_RE = re.compile(
+    rf"\bс\s+(\d{{1,2}})(?:\s+({_GEN_RE}))?(?:\s+(\d{{4}}){_YEAR_TAIL})?"
+    rf"\s+(?:по|до)\s+(\d{{1,2}})\s+({_GEN_RE})\s+(\d{{4}}){_YEAR_TAIL}"
+)
+_ISO_RANGE_RE = re.compile(r"\bс\s+(\d{4})-(\d{2})-(\d{2})\s+(?:по|до)\s+(\d{4})-(\d{2})-(\d{2})\b")
+_RU_DATE_RE = re.compile(rf"\b(\d{{1,2}})\s+({_GEN_RE})\s+(\d{{4}}){_YEAR_TAIL}")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DOTTED_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+_MONTH_PERIOD_RE = re.compile(rf"\b(?:в|за)\s+({_WHOLE_RE})\s+(\d{{4}}){_YEAR_TAIL}")
+
+_TIME = r"(\d{1,2}):(\d{2})(?::(\d{2}))?"
+_TIME_RANGE_RE = re.compile(rf"\b(?:с|между)\s+{_TIME}\s+(?:до|по|и)\s+{_TIME}\b")
+
+_MIN_VIEWS_RE = re.compile(
+    rf"\b(?:больше|более|свыше)(?:\s+чем)?\s+({_NUM})"
+    r"(?:\s*(тыс\w*|млн|миллион\w*)\.?)?\s+просмотр\w*"
+)
+_MULTIPLIERS = {"тыс": 1000, "млн": 1000000, "мил": 1000000}
+
+_UNSUPPORTED_RE = re.compile(
+    r"средн|медиан|процент|\bдол[яеиюй]\b|\bтоп\b|максим|миним|рейтинг"
+    r"|больше всего|меньше всего|\bсамы[йехм]|коммент|жалоб|репорт"
+    r"|вчера|сегодня|завтра|последн|прошл|текущ|недел|\bэт(?:ом|от|ой) (?:месяц|год)"
+    r"|\bне\b|\bни\b|\bкроме\b|кажд|по дням|по час|сгрупп"
+    r"|лайк.*(?:вырос|прирост|прибав)|(?:вырос|прирост|прибав).*лайк"
+)
+# Дата, оставшаяся после вырезания диапазонов, с предлогом открытого
+# периода: «до 1 ноября», «после», «начиная с», одиночные «с» и «по».
+# Правила понимают только закрытые диапазоны, а не один день.
+_OPEN_PERIOD_RE = re.compile(
+    r"\b(?:до|по|с|после|раньше|позже|позднее|ранее|начиная\s+с)\s+"
+    rf"(?:\d{{1,2}}\s+(?:{_GEN_RE})|\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}\.\d{{1,2}}\.\d{{4}})"
+)
+_QUESTION_WORD_RE = re.compile(r"\bсколько\b")
+_PUBLISHED_RE = re.compile(r"опублик|вышл|вышедш|выпущ|выложен|залит")
+
+
+# Слова, которые встречаются в типовых формулировках и не меняют разбор.
+# Любое другое слово, оставшееся после вырезания id, дат, времени и
+# порога, значит, что правила объяснили вопрос не целиком.
+_FILLER_WORDS_RE = re.compile(
+    r"(?:сколько|на|всего|есть|было|был[аи]?|в|во|у|с|за|по|и|а|из|от|то|это[тм]?|ли"
+    r"|все[хм]?|весь|вся|котор\w*|систем\w*|статистик\w*|включительно|итог\w*|сумм\w*"
+    r"|разн\w*|нов\w*|хотя|бы|одн\w*|имею?т|имел\w*|набрал\w*|получал\w*|каков\w*"
+    r"|вырос\w*|прирост\w*|прибав\w*|рост\w*|отрицательн\w*|положительн\w*|дельт\w*"
+    r"|опублик\w*|вышл\w*|вышедш\w*|выпущ\w*|выложен\w*|залит\w*|сделан\w*"
+    r"|время|времени|промежутк\w*|интервал\w*|час|число|количеств\w*|оказал\w*|стал\w*|меньше"
+    r"|сравнени\w*|предыдущ\w*|том[уы]?|хранит\w*|нужно|сложить|изменени\w*|между|попадающ\w*"
+    r"|видео|ролик\w*)"
+)
+
+# Слова метрик и фильтров допустимы, только если разбор их использовал.
+_FIELD_WORDS: List[Tuple[re.Pattern, Callable[[Dict[str, Any]], bool]]] = [
+    (
+        re.compile(r"креатор\w*|автор\w*"),
+        lambda f: "creator_id" in f or f.get("special") == "distinct_creators_with_min_views",
+    ),
+    (re.compile(r"лайк\w*"), lambda f: f["metric"] == "sum_likes_total"),
+    (
+        re.compile(r"просмотр\w*"),
+        lambda f: f["metric"] in ("sum_views_total", "sum_views_delta") or "min_views" in f or "special" in f,
+    ),
+    (re.compile(r"замер\w*"), lambda f: f["entity"] == "snapshot"),
+]
+
+
+class RuleParseResult(NamedTuple):
+    parsed: Optional[ParsedQuery]
+    confidence: float
+
+
+def _iso(year: str, month: int, day: str) -> Optional[str]:
+    try:
+        return date(int(year), month, int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _hhmm(hours: str, minutes: str, seconds: Optional[str]) -> Optional[str]:
+    if int(hours) > 23 or int(minutes) > 59 or (seconds is not None and int(seconds) > 59):
+        return None
+    value = f"{int(hours):02d}:{minutes}"
+    return f"{value}:{seconds}" if seconds is not None else value
+
+
+class _Scanner:
+    """Текст вопроса, из которого по очереди вырезаются распознанные фрагменты."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def take(self, pattern: re.Pattern, convert: Callable[[re.Match], Any]) -> List[Any]:
+        found: List[Any] = []
+
+        def _cut(m: re.Match) -> str:
+            value = convert(m)
+            if value is None:
+                return m.group(0)
+            found.append(value)
+            return " "
+
+        self.text = pattern.sub(_cut, self.text)
+        return found
+
+
+def _ru_range(m: re.Match) -> Optional[Tuple[str, str]]:
+    end_month = _MONTHS_GENITIVE[m.group(5)]
+    start_month = _MONTHS_GENITIVE[m.group(2)] if m.group(2) else end_month
+    start = _iso(m.group(3) or m.group(6), start_month, m.group(1))
+    end = _iso(m.group(6), end_month, m.group(4))
+    return (start, end) if start and end else None
+
+
+def _iso_range(m: re.Match) -> Optional[Tuple[str, str]]:
+    start = _iso(m.group(1), int(m.group(2)), m.group(3))
+    end = _iso(m.group(4), int(m.group(5)), m.group(6))
+    return (start, end) if start and end else None
+
+
+def _single(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    return (value, value) if value else None
+
+
+def _month_period(m: re.Match) -> Tuple[str, str]:
+    year, month = int(m.group(2)), _MONTHS_WHOLE[m.group(1)]
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1).isoformat(), date(year, month, last_day).isoformat()
+
+
+def _time_range(m: re.Match) -> Optional[Tuple[str, str]]:
+    start = _hhmm(m.group(1), m.group(2), m.group(3))
+    end = _hhmm(m.group(4), m.group(5), m.group(6))
+    return (start, end) if start and end else None
+
+
+def _min_views(m: re.Match) -> int:
+    value = int(re.sub(r"\D", "", m.group(1)))
+    if m.group(2):
+        value *= _MULTIPLIERS[m.group(2)[:3]]
+    return value
+
+
+def _has(*patterns: str) -> Callable[[str], bool]:
+    compiled = [re.compile(p) for p in patterns]
+    return lambda text: all(p.search(text) for p in compiled)
+
+
+# Правила проверяются по порядку, срабатывает первое подходящее:
+# более узкие формулировки (отрицательные замеры, разные видео) стоят
+# раньше общих ("сколько видео").
+_INTENTS: List[Tuple[Callable[[str], bool], Dict[str, Any]]] = [
+    (
+        _has(r"замер", r"отрицательн"),
+        {"metric": "videos_count", "entity": "snapshot", "special": "snapshots_with_negative_delta_views"},
+    ),
+    (
+        _has(r"разн\w*\s+видео", r"нов\w*\s+просмотр|получал\w*\s+просмотр|прирост|вырос|положительн"),
+        {"metric": "videos_count", "entity": "snapshot", "special": "distinct_videos_with_positive_delta"},
+    ),
+    (
+        _has(r"\bсколько\s+(?:всего\s+|разн\w+\s+)*(?:креатор|автор)"),
+        {"metric": "videos_count", "entity": "video", "special": "distinct_creators_with_min_views"},
+    ),
+    (
+        _has(r"вырос|прирост|прибав|\bрост\b", r"просмотр"),
+        {"metric": "sum_views_delta", "entity": "snapshot"},
+    ),
+    (
+        _has(r"\bсколько\s+(?:всего\s+|есть\s+)*замер"),
+        {"metric": "videos_count", "entity": "snapshot"},
+    ),
+    (
+        _has(r"\bсколько\s+(?:всего\s+|в\s+сумме\s+|суммарно\s+|итоговых\s+)*просмотр"),
+        {"metric": "sum_views_total", "entity": "video"},
+    ),
+    (
+        _has(r"\bсколько\s+(?:всего\s+|в\s+сумме\s+|суммарно\s+|итоговых\s+)*лайк"),
+        {"metric": "sum_likes_total", "entity": "video"},
+    ),
+    (
+        _has(r"\bсколько\s+(?:всего\s+|есть\s+)*(?:видео|ролик)"),
+        {"metric": "videos_count", "entity": "video"},
+    ),
+]
+
+
+def parse_with_rules(text: str) -> RuleParseResult:
+    """
+    Разбирает вопрос правилами.
+
+    Возвращает RuleParseResult(parsed, confidence). parsed равен None,
+    если ни одно правило не подошло или вопрос заведомо не поддерживается;
+    иначе confidence == 1.0 означает, что каждое слово вопроса либо вошло
+    в распознанные поля, либо есть в словаре правил, а меньшие значения —
+    что разбор лучше перепроверить в LLM.
+    """
+    normalized = " ".join(text.replace("ё", "е").replace("Ё", "Е").split())
+    lowered = normalized.lower()
+
+    if _UNSUPPORTED_RE.search(lowered):
+        return RuleParseResult(None, 0.0)
+
+    fields: Optional[Dict[str, Any]] = None
+    for matches, intent in _INTENTS:
+        if matches(lowered):
+            fields = dict(intent)
+            break
+    if fields is None:
+        return RuleParseResult(None, 0.0)
+
+    confidence = 1.0
+
+    # id креатора берём из исходного текста, чтобы не менять регистр.
+    scanner = _Scanner(normalized)
+    creator_ids = scanner.take(_ID_RE, lambda m: m.group(1))
+    creator_ids += scanner.take(_HEX_ID_RE, lambda m: m.group(0))
+    if len(set(creator_ids)) > 1:
+        return RuleParseResult(None, 0.0)
+    if creator_ids:
+        fields["creator_id"] = creator_ids[0]
+
+    scanner.text = scanner.text.lower()
+    date_ranges = scanner.take(_RU_RANGE_RE, _ru_range)
+    date_ranges += scanner.take(_ISO_RANGE_RE, _iso_range)
+    if _OPEN_PERIOD_RE.search(scanner.text):
+        return RuleParseResult(None, 0.0)
+    date_ranges += scanner.take(_MONTH_PERIOD_RE, _month_period)
+    date_ranges += scanner.take(_RU_DATE_RE, lambda m: _single(_iso(m.group(3), _MONTHS_GENITIVE[m.group(2)], m.group(1))))
+    date_ranges += scanner.take(_ISO_DATE_RE, lambda m: _single(_iso(m.group(1), int(m.group(2)), m.group(3))))
+    date_ranges += scanner.take(_DOTTED_DATE_RE, lambda m: _single(_iso(m.group(3), int(m.group(2)), m.group(1))))
+    if len(date_ranges) > 1:
+        return RuleParseResult(None, 0.0)
+    if date_ranges:
+        start, end = date_ranges[0]
+        fields["date_range"] = {"start": start, "end": end}
+        if end < start:
+            confidence *= 0.3
+
+    time_ranges = scanner.take(_TIME_RANGE_RE, _time_range)
+    if len(time_ranges) > 1:
+        return RuleParseResult(None, 0.0)
+    if time_ranges:
+        fields["time_from"], fields["time_to"] = time_ranges[0]
+        if fields["entity"] != "snapshot" or not date_ranges:
+            confidence *= 0.5
+
+    thresholds = scanner.take(_MIN_VIEWS_RE, _min_views)
+    if len(thresholds) > 1:
+        return RuleParseResult(None, 0.0)
+    if thresholds:
+        fields["min_views"] = thresholds[0]
+        if fields["entity"] != "video":
+            confidence *= 0.5
+
+    # Числа, которые не удалось отнести ни к одному полю: год без даты,
+    # "28 ноября" без года, порог лайков и т.п.
+    if re.search(r"\d", scanner.text):
+        confidence *= 0.3
+
+    # Слова, которые правила не объяснили: «после», «лайком» у вопроса
+    # про число видео, «и креаторов» после «сколько видео».
+    for word in re.findall(r"[a-zа-я]+", scanner.text):
+        if _FILLER_WORDS_RE.fullmatch(word):
+            continue
+        if any(pattern.fullmatch(word) and used(fields) for pattern, used in _FIELD_WORDS):
+            continue
+        confidence *= 0.3
+        break
+
+    # Несколько вопросов в одном сообщении.
+    if len(_QUESTION_WORD_RE.findall(lowered)) > 1:
+        confidence *= 0.3
+
+    # "Сколько просмотров набрали видео 28 ноября" можно понять и как
+    # итог по видео, опубликованным в этот день, и как прирост за день.
+    if (
+        fields["metric"] in ("sum_views_total", "sum_likes_total")
+        and date_ranges
+        and not _PUBLISHED_RE.search(lowered)
+    ):
+        confidence *= 0.5
+
+    return RuleParseResult(ParsedQuery.model_validate(fields), confidence)
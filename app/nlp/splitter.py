@@ -0,0 +1,65 @@
+"""
+Разбиение сообщения на отдельные вопросы.
+
+Аналитики присылают списки вопросов одним сообщением: по вопросу на
+строку, часто с нумерацией («1. …», «2) …») или маркерами («- …»), а
+иногда несколько вопросов подряд в одной строке. Новый вопрос
+начинается со строки с маркером списка или с вопросительного слова
+(«сколько», «какое», …), а также со строки, которая заканчивается на
+«?», если предыдущая строка закончила предложение («?», «.» или «!»).
+Остальные строки относятся к предыдущему вопросу: это перенос длинного
+вопроса («Сколько всего видео,\nопубликованных в июне 2025 года?») или
+пояснение к нему («Сколько видео у креатора X?\nЗа ноябрь.»).
+
+Внутри строки текст делится после «?», если следующая часть тоже
+заканчивается на «?». Иначе это пояснение к вопросу («…28 ноября 2025?
+Нужно сложить изменения…»), и оно остаётся с ним.
+"""
+import re
+from typing import List
+
+
+_LIST_MARKER_RE = re.compile(r"^(?:\d{1,2}[.)]|[-–—•*])\s+")
+_AFTER_QUESTION_MARK_RE = re.compile(r"(?<=\?)\s+")
+_QUESTION_WORD_RE = re.compile(
+    r"^(?:на\s+|во\s+|в\s+)?(?:сколько|как(?:ой|ая|ое|ие|ов\w*)|кто|что|когда|где)\b",
+    re.IGNORECASE,
+)
+
+
+def split_questions(text: str) -> List[str]:
+    """
+    Вопросы из текста сообщения в исходном порядке.
+
+    Сообщение с одним вопросом возвращается как есть (одним элементом),
+    даже если в нём есть маркер списка.
+    """
+    questions: List[str] = []
+    sentence_ended = True
+    for line in text.splitlines():
+        line = line.strip()
+        marked = _LIST_MARKER_RE.match(line) is not None
+        line = _LIST_MARKER_RE.sub("", line)
+        if not line:
+            continue
+        parts = _AFTER_QUESTION_MARK_RE.split(line)
+        starts_question = (
+            not questions
+            or marked
+            or _QUESTION_WORD_RE.match(line) is not None
+            or (sentence_ended and parts[0].endswith("?"))
+        )
+        if starts_question:
+            questions.append(parts[0])
+        else:
+            questions[-1] += " " + parts[0]
+        for part in parts[1:]:
+            if part.endswith("?"):
+                questions.append(part)
+            else:
+                questions[-1] += " " + part
+        sentence_ended = line.endswith(("?", ".", "!"))
+
+    if len(questions) <= 1:
+        return [text.strip()] if text.strip() else []
+    return questions
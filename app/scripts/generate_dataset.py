@@ -0,0 +1,216 @@
+"""
+Детерминированный генератор синтетических данных.
+
+Пишет файл(ы) в формате входа load_json ({"videos": [...]} с вложенными
+snapshots) или сразу загружает данные в БД теми же писателями, что и
+load_json. Результат зависит только от параметров и seed: у каждого
+креатора свой генератор случайных чисел, поэтому один и тот же креатор
+получается одинаковым при любом разбиении на файлы.
+
+Распределения приближены к реальной выгрузке: число видео у креатора и
+итоговые просмотры — с тяжёлым хвостом, замеры раз в час, прирост
+просмотров затухает со временем, изредка встречаются отрицательные
+дельты (списание накруток).
+
+    python -m app.scripts.generate_dataset --creators 20000 --snapshots 72 --output data/synthetic.json --files 8
+    python -m app.scripts.generate_dataset --creators 1000 --load
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+from sqlalchemy import text
+
+from app.db import get_engine
+from .load_json import (
+    BUMP_DATA_VERSION_SQL,
+    LOAD_MODES,
+    _make_writer,
+    _snapshot_params,
+    _video_params,
+    create_future_partitions,
+)
+
+
+DEFAULT_START = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+
+class DatasetSpec(NamedTuple):
+    creators: int = 1000
+    videos_per_creator: float = 5.0
+    snapshots_per_video: int = 48
+    start: datetime = DEFAULT_START
+    days: int = 60
+    seed: int = 42
+
+
+def _hex_id(rng: random.Random) -> str:
+    return uuid.UUID(int=rng.getrandbits(128)).hex
+
+
+def _videos_count(rng: random.Random, mean: float) -> int:
+    # Парето с alpha=1.5 имеет среднее 3: большинство креаторов публикует
+    # несколько видео, единицы — на порядки больше.
+    if mean <= 1:
+        return 1
+    count = 1 + int(rng.paretovariate(1.5) * (mean - 1) / 3)
+    return min(count, int(mean * 50))
+
+
+def _snapshots(rng: random.Random, video_id: str, published: datetime, hours: int) -> List[Dict[str, Any]]:
+    final_views = int(rng.lognormvariate(8.0, 2.0))
+    like_rate = rng.uniform(0.01, 0.08)
+    tau = rng.uniform(6.0, 48.0)
+    first = published.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    snapshots = []
+    previous = {"views_count": 0, "likes_count": 0, "comments_count": 0, "reports_count": 0}
+    for hour in range(hours):
+        views = int(final_views * (1.0 - math.exp(-(hour + 1) / tau)))
+        if rng.random() < 0.02:
+            views = max(0, previous["views_count"] - rng.randint(1, 50))
+        else:
+            views = max(views, previous["views_count"])
+        current = {
+            "views_count": views,
+            "likes_count": int(views * like_rate),
+            "comments_count": int(views * like_rate / 10),
+            "reports_count": previous["reports_count"] + (1 if rng.random() < 0.001 else 0),
+        }
+        created_at = (first + timedelta(hours=hour, seconds=rng.randint(0, 59))).isoformat()
+        snapshot = {"id": _hex_id(rng), "video_id": video_id}
+        snapshot.update(current)
+        for column, value in current.items():
+            snapshot[f"delta_{column}"] = value - previous[column]
+        snapshot["created_at"] = created_at
+        snapshot["updated_at"] = created_at
+        snapshots.append(snapshot)
+        previous = current
+    return snapshots
+
+
+def iter_creator_videos(spec: DatasetSpec, creator_index: int) -> Iterator[Dict[str, Any]]:
+    """Видео одного креатора в формате load_json (с вложенными snapshots)."""
+    rng = random.Random(f"{spec.seed}:{creator_index}")
+    creator_id = _hex_id(rng)
+    span_seconds = max(1, spec.days * 86400)
+
+    for _ in range(_videos_count(rng, spec.videos_per_creator)):
+        video_id = _hex_id(rng)
+        published = spec.start + timedelta(seconds=rng.randrange(span_seconds))
+        snapshots = _snapshots(rng, video_id, published, spec.snapshots_per_video)
+        last = snapshots[-1] if snapshots else {}
+        updated_at = last.get("created_at", published.isoformat())
+        yield {
+            "id": video_id,
+            "creator_id": creator_id,
+            "video_created_at": published.isoformat(),
+            "views_count": last.get("views_count", 0),
+            "likes_count": last.get("likes_count", 0),
+            "comments_count": last.get("comments_count", 0),
+            "reports_count": last.get("reports_count", 0),
+            "created_at": published.isoformat(),
+            "updated_at": updated_at,
+            "snapshots": snapshots,
+        }
+
+
+def iter_videos(spec: DatasetSpec, part: int = 0, parts: int = 1) -> Iterator[Dict[str, Any]]:
+    """Видео креаторов part, part + parts, part + 2 * parts, ..."""
+    for creator_index in range(part, spec.creators, parts):
+        yield from iter_creator_videos(spec, creator_index)
+
+
+def write_json(spec: DatasetSpec, path: Path, part: int = 0, parts: int = 1) -> Dict[str, int]:
+    """Потоково пишет часть набора в файл и возвращает число видео и замеров."""
+    videos = snapshots = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        f.write('{"videos": [')
+        for video in iter_videos(spec, part, parts):
+            if videos:
+                f.write(",\n")
+            f.write(json.dumps(video, separators=(",", ":")))
+            videos += 1
+            snapshots += len(video["snapshots"])
+        f.write("]}\n")
+    return {"videos": videos, "snapshots": snapshots}
+
+
+def output_paths(output: Path, files: int) -> List[Path]:
+    if files <= 1:
+        return [output]
+    return [output.with_name(f"{output.stem}-{i:03d}{output.suffix}") for i in range(files)]
+
+
+def load_dataset(spec: DatasetSpec, mode: str = "copy", batch_size: int = 5000) -> Dict[str, int]:
+    """Загружает набор прямо в БД одной транзакцией, без промежуточного файла."""
+    videos = snapshots = 0
+    create_future_partitions()
+    with get_engine().begin() as conn:
+        writer = _make_writer(conn, mode, batch_size)
+        for video in iter_videos(spec):
+            writer.add_video(_video_params(video))
+            videos += 1
+            for snap in video["snapshots"]:
+                writer.add_snapshot(_snapshot_params(video["id"], snap))
+                snapshots += 1
+        writer.finish()
+        conn.execute(text(BUMP_DATA_VERSION_SQL))
+    return {"videos": videos, "snapshots": snapshots}
+
+
+def main() -> None:
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--creators", type=int, default=defaults.creators)
+    parser.add_argument("--videos-per-creator", type=float, default=defaults.videos_per_creator,
+                        help="mean number of videos per creator (heavy-tailed)")
+    parser.add_argument("--snapshots", type=int, default=defaults.snapshots_per_video,
+                        help="hourly snapshots per video")
+    parser.add_argument("--start", default=DEFAULT_START.date().isoformat(),
+                        help="first publication date (UTC), YYYY-MM-DD")
+    parser.add_argument("--days", type=int, default=defaults.days, help="publication period length")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", type=Path, help="JSON file in load_json format")
+    target.add_argument("--load", action="store_true", help="load straight into DATABASE_URL")
+    parser.add_argument("--files", type=int, default=1,
+                        help="split creators over N files (name-000.json, ...) for load_json --workers")
+    parser.add_argument("--mode", choices=LOAD_MODES, default="copy", help="load mode for --load")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(
+        creators=args.creators,
+        videos_per_creator=args.videos_per_creator,
+        snapshots_per_video=args.snapshots,
+        start=datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc),
+        days=args.days,
+        seed=args.seed,
+    )
+
+    started = time.perf_counter()
+    if args.load:
+        counts = load_dataset(spec, mode=args.mode, batch_size=args.batch_size)
+        print(f"Loaded {counts['videos']} videos and {counts['snapshots']} snapshots "
+              f"in {time.perf_counter() - started:.2f} s")
+        return
+
+    paths = output_paths(args.output, args.files)
+    for part, path in enumerate(paths):
+        counts = write_json(spec, path, part, len(paths))
+        print(f"{path}: {counts['videos']} videos, {counts['snapshots']} snapshots")
+    print(f"Done in {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
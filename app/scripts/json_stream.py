@@ -0,0 +1,253 @@
+"""
+Потоковое чтение JSON-выгрузки с видео.
+
+json.load держит в памяти весь файл и все объекты сразу, поэтому на
+многогигабайтных выгрузках загрузчик падает по памяти. Здесь файл
+читается кусками, а каждый элемент массива videos разбирается отдельно
+через json.JSONDecoder.raw_decode, так что в памяти одновременно
+находятся только текущий буфер и одно видео с его замерами.
+
+Поддерживаются обе структуры верхнего уровня:
+- массив видео: [{...}, {...}];
+- объект с ключом "videos": {"videos": [{...}, ...], ...}.
+
+iter_videos_shard читает только свой диапазон байт файла: границы
+диапазонов сдвигаются к началу ближайшего видео, так что шарды файла
+не пересекаются и вместе дают все видео.
+"""
+from __future__ import annotations
+
+import io
+import json
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, TextIO, Union
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+# В корректном JSON «{» с ключом "id" сразу за ним не может оказаться
+# внутри строки: кавычка в строке экранируется, а закрывающая кавычка
+# не может стоять перед id". Поэтому совпадение — начало объекта.
+_ID_KEY = '"id"'
+
+
+class _ChunkedJsonReader:
+
+    def __init__(self, f: TextIO, chunk_size: int) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, got {found!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Значение не поместилось в буфер: дочитываем не меньше,
+                # чем уже накоплено, чтобы число повторных разборов
+                # росло логарифмически от размера значения.
+                if not self._fill(max(self._chunk_size, len(self._buf) - self._pos)):
+                    raise
+                continue
+            # Число или литерал в самом конце буфера мог оборваться.
+            if end == len(self._buf) and self._fill(self._chunk_size):
+                continue
+            self._pos = end
+            return obj
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed JSON array: unexpected {separator!r}")
+
+
+class _ByteRange(io.RawIOBase):
+    """Не больше size байт файла f, начиная с его текущей позиции."""
+
+    def __init__(self, f: BinaryIO, size: int) -> None:
+        self._f = f
+        self._left = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._left)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+
+def _starts_with_id(buf: str, pos: int) -> Optional[bool]:
+    """
+    Начинается ли с buf[pos] объект с первым ключом "id"; None — буфера
+    не хватает, чтобы решить.
+    """
+    key = _WHITESPACE_RE.match(buf, pos + 1).end()
+    if key + len(_ID_KEY) > len(buf):
+        return None
+    if buf[key:key + len(_ID_KEY)] != _ID_KEY:
+        return False
+    colon = _WHITESPACE_RE.match(buf, key + len(_ID_KEY)).end()
+    if colon >= len(buf):
+        return None
+    return buf[colon] == ":"
+
+
+def find_video_start(path: Union[str, Path], offset: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Байтовое смещение первого видео, которое начинается не раньше
+    offset, или размер файла, если таких нет.
+
+    Видео отличается от вложенных замеров ключом creator_id. Просматривается
+    не больше одного видео после offset.
+    """
+    with Path(path).open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        # Смещение могло попасть внутрь многобайтового символа UTF-8.
+        f.seek(offset)
+        while offset < size and f.read(1)[0] & 0xC0 == 0x80:
+            offset += 1
+        f.seek(offset)
+
+        reader = _ChunkedJsonReader(io.TextIOWrapper(f, encoding="utf-8"), chunk_size)
+        # Буфер читателя не обрезается (pos остаётся 0), поэтому
+        # смещение кандидата считается от offset.
+        buf_pos = 0
+        while True:
+            candidate = reader._buf.find("{", buf_pos)
+            if candidate < 0:
+                buf_pos = len(reader._buf)
+                if not reader._fill(chunk_size):
+                    return size
+                continue
+            is_object = _starts_with_id(reader._buf, candidate)
+            if is_object is None:
+                if reader._fill(chunk_size):
+                    continue
+                return size
+            if not is_object:
+                buf_pos = candidate + 1
+                continue
+            try:
+                obj, end = _decoder.raw_decode(reader._buf, candidate)
+            except json.JSONDecodeError:
+                if not reader._fill(max(chunk_size, len(reader._buf) - candidate)):
+                    raise
+                continue
+            if isinstance(obj, dict) and "creator_id" in obj:
+                return offset + len(reader._buf[:candidate].encode("utf-8"))
+            buf_pos = end
+
+
+def iter_videos_shard(
+    path: Union[str, Path],
+    shard_index: int,
+    shard_count: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Отдаёт видео, которые начинаются в shard_index-й из shard_count
+    равных частей файла.
+
+    Каждый шард разбирает только свои байты (плюс по одному видео на
+    границах, чтобы найти их), поэтому воркеры не читают файл целиком.
+    Структура файла вне диапазона не проверяется — это делает
+    iter_videos.
+    """
+    size = Path(path).stat().st_size
+    start = find_video_start(path, size * shard_index // shard_count, chunk_size)
+    end = find_video_start(path, size * (shard_index + 1) // shard_count, chunk_size)
+    if start >= end:
+        return
+
+    with Path(path).open("rb") as f:
+        f.seek(start)
+        text = io.TextIOWrapper(io.BufferedReader(_ByteRange(f, end - start)), encoding="utf-8")
+        reader = _ChunkedJsonReader(text, chunk_size)
+        # Диапазон заканчивается запятой перед следующим видео или «]»
+        # после последнего.
+        while reader.peek() == "{":
+            yield reader.value()
+            if reader.peek() == ",":
+                reader.expect(",")
+
+
+def iter_videos(
+    path: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Отдаёт видео из выгрузки по одному, вместе с вложенными
+    snapshots / video_snapshots.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        reader = _ChunkedJsonReader(f, chunk_size)
+        first = reader.peek()
+
+        if first == "[":
+            yield from reader.iter_array()
+            return
+
+        if first == "{":
+            reader.expect("{")
+            found = False
+            while reader.peek() != "}":
+                key = reader.value()
+                reader.expect(":")
+                if key == "videos" and reader.peek() == "[":
+                    yield from reader.iter_array()
+                    found = True
+                else:
+                    reader.value()
+                if reader.peek() == ",":
+                    reader.expect(",")
+            reader.expect("}")
+            if found:
+                return
+
+        raise ValueError("Unsupported JSON structure: expected list or object with 'videos' key")
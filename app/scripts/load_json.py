@@ -1,134 +1,698 @@
+import argparse
+import csv
+import glob
+import hashlib
+import io
 import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
-from app.db import engine
-
-
-VIDEO_INSERT_SQL = """
-INSERT INTO videos (
-    id,
-    creator_id,
-    video_created_at,
-    views_count,
-    likes_count,
-    comments_count,
-    reports_count,
-    created_at,
-    updated_at
-) VALUES (
-    :id,
-    :creator_id,
-    :video_created_at,
-    :views_count,
-    :likes_count,
-    :comments_count,
-    :reports_count,
-    :created_at,
-    :updated_at
+from app.db import get_engine
+from .json_stream import iter_videos, iter_videos_shard
+
+
+VIDEO_COLUMNS = (
+    "id",
+    "creator_id",
+    "video_created_at",
+    "views_count",
+    "likes_count",
+    "comments_count",
+    "reports_count",
+    "created_at",
+    "updated_at",
+    "content_hash",
 )
-ON CONFLICT (id) DO NOTHING;
-"""
 
-SNAPSHOT_INSERT_SQL = """
-INSERT INTO video_snapshots (
-    id,
-    video_id,
-    views_count,
-    likes_count,
-    comments_count,
-    reports_count,
-    delta_views_count,
-    delta_likes_count,
-    delta_comments_count,
-    delta_reports_count,
-    created_at,
-    updated_at
-) VALUES (
-    :id,
-    :video_id,
-    :views_count,
-    :likes_count,
-    :comments_count,
-    :reports_count,
-    :delta_views_count,
-    :delta_likes_count,
-    :delta_comments_count,
-    :delta_reports_count,
-    :created_at,
-    :updated_at
+SNAPSHOT_COLUMNS = (
+    "id",
+    "video_id",
+    "views_count",
+    "likes_count",
+    "comments_count",
+    "reports_count",
+    "delta_views_count",
+    "delta_likes_count",
+    "delta_comments_count",
+    "delta_reports_count",
+    "created_at",
+    "updated_at",
 )
+
+VIDEO_HASHES_SQL = """
+SELECT id, content_hash, creator_id
+FROM videos
+WHERE id = ANY(:ids);
+"""
+
+SNAPSHOT_IDS_SQL = """
+SELECT id
+FROM video_snapshots
+WHERE video_id = ANY(:ids);
+"""
+
+# Сбрасывает кэш результатов (app.services.result_cache) после загрузки.
+BUMP_DATA_VERSION_SQL = """
+UPDATE data_version
+SET version = version + 1,
+    updated_at = now()
+WHERE id = 1;
+"""
+
+# Staging-таблицы: живут до конца транзакции. Во всех режимах строки
+# сначала пишутся сюда, а в videos и video_snapshots попадают в finish()
+# одной командой на таблицу (_merge_staged). Так триггер rollup-таблиц
+# (миграция 003) срабатывает один раз за загрузку, а строки rollup-таблиц
+# блокируются только между слиянием и коммитом: параллельные шарды не
+# ждут друг друга всю загрузку.
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS videos_stage
+    (LIKE videos INCLUDING DEFAULTS) ON COMMIT DROP;
+CREATE TEMP TABLE IF NOT EXISTS video_snapshots_stage
+    (LIKE video_snapshots INCLUDING DEFAULTS) ON COMMIT DROP;
+"""
+
+VIDEO_STAGE_INSERT_SQL = f"""
+INSERT INTO videos_stage ({", ".join(VIDEO_COLUMNS)})
+VALUES ({", ".join(":" + column for column in VIDEO_COLUMNS)});
+"""
+
+SNAPSHOT_STAGE_INSERT_SQL = f"""
+INSERT INTO video_snapshots_stage ({", ".join(SNAPSHOT_COLUMNS)})
+VALUES ({", ".join(":" + column for column in SNAPSHOT_COLUMNS)});
+"""
+
+# Видео сливаются в порядке id: загрузки пересекающихся выгрузок ждут
+# друг друга на одних и тех же ключах в одном порядке.
+VIDEO_MERGE_SQL = f"""
+INSERT INTO videos ({", ".join(VIDEO_COLUMNS)})
+SELECT {", ".join(VIDEO_COLUMNS)}
+FROM videos_stage
+ORDER BY id
 ON CONFLICT (id) DO NOTHING;
 """
 
+# Инкрементальный режим: изменённые видео перезаписываются целиком,
+# кроме creator_id. Замеры в rollup-таблицах (миграция 003) отнесены к
+# креатору при вставке и не переносятся, поэтому смену креатора в
+# выгрузке загрузчик не применяет, а сообщает о ней (_IncrementalWriter).
+# DISTINCT ON: ON CONFLICT DO UPDATE не может изменить строку дважды,
+# поэтому из повторов видео в выгрузке берётся последний (staging-таблица
+# только дописывается, ctid растёт в порядке вставки).
+VIDEO_UPSERT_SQL = f"""
+INSERT INTO videos ({", ".join(VIDEO_COLUMNS)})
+SELECT DISTINCT ON (id) {", ".join(VIDEO_COLUMNS)}
+FROM videos_stage
+ORDER BY id, ctid DESC
+ON CONFLICT (id) DO UPDATE SET
+    {", ".join(f"{column} = EXCLUDED.{column}" for column in VIDEO_COLUMNS if column not in ("id", "creator_id"))};
+"""
+
+SNAPSHOT_MERGE_SQL = f"""
+INSERT INTO video_snapshots ({", ".join(SNAPSHOT_COLUMNS)})
+SELECT {", ".join(SNAPSHOT_COLUMNS)}
+FROM video_snapshots_stage
+ON CONFLICT DO NOTHING;
+"""
+
+# creator_stats (миграция 007): триггеры на videos копят изменения, а
+# загрузчик применяет их один раз после слияния, строками в порядке
+# creator_id. Иначе каждая команда загрузки блокировала бы строки своих
+# креаторов, шарды брали бы их в разном порядке и взаимно блокировались.
+DEFER_CREATOR_STATS_SQL = "SET LOCAL video_stats.defer_creator_stats = on;"
+
+APPLY_CREATOR_STATS_SQL = "SELECT apply_creator_stats_delta();"
+
+# Партиции video_snapshots (миграция 005). До неё таблица не секционирована
+# и _SnapshotPartitions ничего не делает.
+PARTITIONING_SQL = """
+SELECT granularity
+FROM video_snapshot_partitioning
+WHERE id = 1;
+"""
+
+ENSURE_PARTITIONS_SQL = "SELECT ensure_video_snapshot_partitions(:from_ts, :to_ts);"
+
+FUTURE_PARTITIONS_SQL = "SELECT create_future_video_snapshot_partitions();"
+
+LOAD_MODES = ("row", "batch", "copy", "incremental")
+
+
+def _video_snapshots(video: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return video.get("snapshots", []) or video.get("video_snapshots", [])
+
+
+def content_hash(video: Dict[str, Any]) -> str:
+    """
+    Хэш видео вместе с его замерами по тем полям, что пишутся в БД.
+
+    Порядок замеров в выгрузке не влияет на хэш.
+    """
+    snapshots = sorted(
+        [snap[column] for column in SNAPSHOT_COLUMNS if column != "video_id"]
+        for snap in _video_snapshots(video)
+    )
+    payload = [[video[column] for column in VIDEO_COLUMNS if column != "content_hash"], snapshots]
+    encoded = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _video_params(video: Dict[str, Any]) -> Dict[str, Any]:
+    params = {column: video[column] for column in VIDEO_COLUMNS if column != "content_hash"}
+    params["content_hash"] = content_hash(video)
+    return params
+
+
+def _snapshot_params(video_id: str, snap: Dict[str, Any]) -> Dict[str, Any]:
+    params = {column: snap[column] for column in SNAPSHOT_COLUMNS if column != "video_id"}
+    params["video_id"] = video_id
+    return params
+
+
+def _partition_granularity(conn: Connection) -> Optional[str]:
+    """day / month для секционированной video_snapshots, None — до миграции 005."""
+    if conn.execute(text("SELECT to_regclass('video_snapshot_partitioning')")).scalar() is None:
+        return None
+    return conn.execute(text(PARTITIONING_SQL)).scalar()
+
+
+def create_future_partitions() -> int:
+    """
+    Создаёт партиции video_snapshots на premake вперёд от текущего момента.
+
+    Вызывается перед загрузкой отдельной короткой транзакцией, чтобы в
+    обычной загрузке свежих данных партиции уже существовали и транзакция
+    загрузки не выполняла DDL.
+    """
+    with get_engine().begin() as conn:
+        if _partition_granularity(conn) is None:
+            return 0
+        return conn.execute(text(FUTURE_PARTITIONS_SQL)).scalar() or 0
+
+
+class _SnapshotPartitions:
+    """
+    Недостающие партиции video_snapshots для загружаемых замеров.
+
+    Писатели передают сюда created_at каждого замера (add) и вызывают
+    ensure() перед вставкой в video_snapshots; дальше строки по партициям
+    раскладывает сам Postgres. Проверенные периоды запоминаются, так что
+    запрос к БД делается один раз на новый день (месяц).
+
+    Партиции создаются в транзакции загрузки, а не отдельным соединением:
+    ATTACH PARTITION ждёт блокировку на videos (внешний ключ), а её до
+    коммита держит сама загрузка. Поэтому ensure() вызывается до записи в
+    videos (_merge_staged): иначе две загрузки, создающие одну партицию,
+    ждали бы друг друга. Если загрузка откатится, откатятся и созданные
+    ею партиции.
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+        self.granularity = _partition_granularity(conn)
+        self._checked: Set[date] = set()
+        self._pending: Set[date] = set()
+
+    def add(self, created_at: Any) -> None:
+        if self.granularity is None:
+            return
+        ts = created_at if isinstance(created_at, datetime) else datetime.fromisoformat(created_at)
+        if ts.tzinfo is None:
+            # В выгрузке время всегда со смещением; без него считаем UTC.
+            ts = ts.replace(tzinfo=timezone.utc)
+        day = ts.astimezone(timezone.utc).date()
+        period = day if self.granularity == "day" else day.replace(day=1)
+        if period not in self._checked:
+            self._pending.add(period)
+
+    def ensure(self) -> None:
+        if not self._pending:
+            return
+        first, last = min(self._pending), max(self._pending)
+        self.conn.execute(text(ENSURE_PARTITIONS_SQL), {
+            "from_ts": datetime(first.year, first.month, first.day, tzinfo=timezone.utc),
+            "to_ts": datetime(last.year, last.month, last.day, tzinfo=timezone.utc),
+        })
+        self._checked |= self._pending
+        self._pending = set()
+
+
+def _begin_staging(conn: Connection) -> None:
+    conn.exec_driver_sql(CREATE_STAGING_SQL)
+    conn.exec_driver_sql(DEFER_CREATOR_STATS_SQL)
+
+
+def _merge_staged(conn: Connection, partitions: _SnapshotPartitions, video_sql: str = VIDEO_MERGE_SQL) -> None:
+    """
+    Staging в основные таблицы: по одной команде на videos и
+    video_snapshots (сначала videos — так соблюдается внешний ключ),
+    затем накопленные изменения creator_stats.
+    """
+    partitions.ensure()
+    conn.execute(text(video_sql))
+    conn.execute(text(SNAPSHOT_MERGE_SQL))
+    conn.execute(text(APPLY_CREATOR_STATS_SQL))
+
+
+class _RowWriter:
+    """Одна INSERT-команда на строку (исходное поведение загрузчика), в staging."""
+
+    def __init__(self, conn: Connection, batch_size: int) -> None:
+        self.conn = conn
+        self.partitions = _SnapshotPartitions(conn)
+
+        _begin_staging(conn)
+
+    def add_video(self, params: Dict[str, Any]) -> None:
+        self.conn.execute(text(VIDEO_STAGE_INSERT_SQL), params)
+
+    def add_snapshot(self, params: Dict[str, Any]) -> None:
+        self.partitions.add(params["created_at"])
+        self.conn.execute(text(SNAPSHOT_STAGE_INSERT_SQL), params)
+
+    def finish(self) -> None:
+        _merge_staged(self.conn, self.partitions)
+
+
+class _BatchWriter:
+    """Пачки строк через executemany в staging-таблицы."""
+
+    def __init__(self, conn: Connection, batch_size: int) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self.partitions = _SnapshotPartitions(conn)
+        self._videos: List[Dict[str, Any]] = []
+        self._snapshots: List[Dict[str, Any]] = []
+
+        _begin_staging(conn)
+
+    def add_video(self, params: Dict[str, Any]) -> None:
+        self._videos.append(params)
+        if len(self._videos) >= self.batch_size:
+            self._flush_videos()
 
-def _normalize_videos_container(raw):
-    if isinstance(raw, list):
-        return raw
-    if isinstance(raw, dict) and "videos" in raw and isinstance(raw["videos"], list):
-        return raw["videos"]
-    raise ValueError("Unsupported JSON structure: expected list or object with 'videos' key")
+    def add_snapshot(self, params: Dict[str, Any]) -> None:
+        self.partitions.add(params["created_at"])
+        self._snapshots.append(params)
+        if len(self._snapshots) >= self.batch_size:
+            self._flush_snapshots()
 
+    def _flush_videos(self) -> None:
+        if self._videos:
+            self.conn.execute(text(VIDEO_STAGE_INSERT_SQL), self._videos)
+            self._videos = []
 
-def load(path: str) -> None:
+    def _flush_snapshots(self) -> None:
+        if self._snapshots:
+            self.conn.execute(text(SNAPSHOT_STAGE_INSERT_SQL), self._snapshots)
+            self._snapshots = []
+
+    def finish(self) -> None:
+        self._flush_videos()
+        self._flush_snapshots()
+        _merge_staged(self.conn, self.partitions)
+
+
+class _CopyWriter:
+    """
+    Потоковая загрузка через COPY ... FROM STDIN в staging-таблицы.
+
+    Строки копятся в CSV-буфере и отправляются пачками по batch_size;
+    в конце staging сливается в основные таблицы через
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING (_merge_staged).
+    """
+
+    def __init__(self, conn: Connection, batch_size: int) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self.partitions = _SnapshotPartitions(conn)
+        self._cursor = conn.connection.dbapi_connection.cursor()
+        self._videos = io.StringIO()
+        self._snapshots = io.StringIO()
+        self._videos_rows = 0
+        self._snapshots_rows = 0
+
+        _begin_staging(conn)
+
+    @staticmethod
+    def is_supported(conn: Connection) -> bool:
+        return hasattr(conn.connection.dbapi_connection.cursor(), "copy_expert")
+
+    def add_video(self, params: Dict[str, Any]) -> None:
+        csv.writer(self._videos).writerow([params[c] for c in VIDEO_COLUMNS])
+        self._videos_rows += 1
+        if self._videos_rows >= self.batch_size:
+            self._flush_videos()
+
+    def add_snapshot(self, params: Dict[str, Any]) -> None:
+        self.partitions.add(params["created_at"])
+        csv.writer(self._snapshots).writerow([params[c] for c in SNAPSHOT_COLUMNS])
+        self._snapshots_rows += 1
+        if self._snapshots_rows >= self.batch_size:
+            self._flush_snapshots()
+
+    def _copy(self, table: str, columns, buffer: io.StringIO) -> None:
+        buffer.seek(0)
+        self._cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+    def _flush_videos(self) -> None:
+        if self._videos_rows:
+            self._copy("videos_stage", VIDEO_COLUMNS, self._videos)
+            self._videos = io.StringIO()
+            self._videos_rows = 0
+
+    def _flush_snapshots(self) -> None:
+        if self._snapshots_rows:
+            self._copy("video_snapshots_stage", SNAPSHOT_COLUMNS, self._snapshots)
+            self._snapshots = io.StringIO()
+            self._snapshots_rows = 0
+
+    def finish(self) -> None:
+        self._flush_videos()
+        self._flush_snapshots()
+        _merge_staged(self.conn, self.partitions)
+
+
+class _IncrementalWriter:
+    """
+    Инкрементальная загрузка повторной выгрузки.
+
+    Видео копятся пачкой примерно по batch_size строк; для пачки одним
+    запросом читаются сохранённые content_hash. Видео с тем же хэшем
+    пропускаются без записи в БД, новые и изменённые в finish() пишутся
+    upsert'ом в videos, а из их замеров вставляются только те, чьих id ещё
+    нет в video_snapshots. Замеры видео всегда идут сразу за ним, поэтому
+    пачка сбрасывается только перед следующим видео.
+
+    Если у сохранённого видео в выгрузке другой creator_id, креатор
+    остаётся прежним (см. VIDEO_UPSERT_SQL): такие видео печатаются и
+    считаются в counts["creator_kept"].
+    """
+
+    def __init__(self, conn: Connection, batch_size: int) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self.partitions = _SnapshotPartitions(conn)
+        self.counts = {"inserted": 0, "updated": 0, "skipped": 0, "snapshots_inserted": 0, "creator_kept": 0}
+        self._videos: List[Dict[str, Any]] = []
+        self._snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        self._rows = 0
+
+        _begin_staging(conn)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.counts["inserted"] or self.counts["updated"] or self.counts["snapshots_inserted"])
+
+    def add_video(self, params: Dict[str, Any]) -> None:
+        if self._rows >= self.batch_size:
+            self._flush()
+        self._videos.append(params)
+        # Видео может повториться в выгрузке: замеры обоих вхождений нужны.
+        self._snapshots.setdefault(params["id"], [])
+        self._rows += 1
+
+    def add_snapshot(self, params: Dict[str, Any]) -> None:
+        self._snapshots[params["video_id"]].append(params)
+        self._rows += 1
+
+    def _flush(self) -> None:
+        videos, snapshots = self._videos, self._snapshots
+        self._videos, self._snapshots, self._rows = [], {}, 0
+        if not videos:
+            return
+
+        rows = self.conn.execute(text(VIDEO_HASHES_SQL), {"ids": [v["id"] for v in videos]}).all()
+        stored = {video_id: stored_hash for video_id, stored_hash, _ in rows}
+        creators = {video_id: creator_id for video_id, _, creator_id in rows}
+        changed = [v for v in videos if v["id"] not in stored or stored[v["id"]] != v["content_hash"]]
+        self.counts["skipped"] += len(videos) - len(changed)
+        if not changed:
+            return
+
+        self.conn.execute(text(VIDEO_STAGE_INSERT_SQL), changed)
+        changed_ids = list(dict.fromkeys(v["id"] for v in changed))
+        existing = [video_id for video_id in changed_ids if video_id in stored]
+        self.counts["updated"] += len(existing)
+        self.counts["inserted"] += len(changed_ids) - len(existing)
+
+        for video in changed:
+            kept = creators.get(video["id"])
+            if kept is not None and kept != video["creator_id"]:
+                print(f"Video {video['id']}: creator_id {video['creator_id']!r} in the export, keeping {kept!r}")
+                self.counts["creator_kept"] += 1
+
+        known = set(self.conn.execute(text(SNAPSHOT_IDS_SQL), {"ids": existing}).scalars()) if existing else set()
+        fresh = list({
+            snap["id"]: snap for video_id in changed_ids for snap in snapshots[video_id] if snap["id"] not in known
+        }.values())
+        if fresh:
+            for snap in fresh:
+                self.partitions.add(snap["created_at"])
+            self.conn.execute(text(SNAPSHOT_STAGE_INSERT_SQL), fresh)
+            self.counts["snapshots_inserted"] += len(fresh)
+
+    def finish(self) -> None:
+        self._flush()
+        _merge_staged(self.conn, self.partitions, VIDEO_UPSERT_SQL)
+
+
+def _make_writer(conn: Connection, mode: str, batch_size: int):
+    if mode == "copy":
+        if _CopyWriter.is_supported(conn):
+            return _CopyWriter(conn, batch_size)
+        print("COPY is not supported by the DB driver, falling back to batch mode")
+        return _BatchWriter(conn, batch_size)
+    if mode == "batch":
+        return _BatchWriter(conn, batch_size)
+    if mode == "row":
+        return _RowWriter(conn, batch_size)
+    if mode == "incremental":
+        return _IncrementalWriter(conn, batch_size)
+    raise ValueError(f"Unsupported load mode: {mode!r}, expected one of {LOAD_MODES}")
+
+
+class LoadStats(NamedTuple):
+    path: str
+    shard_index: int
+    shard_count: int
+    videos: int
+    snapshots: int
+    seconds: float
+    pid: int
+    # Только для режима incremental: inserted / updated / skipped видео,
+    # snapshots_inserted и creator_kept.
+    changes: Optional[Dict[str, int]] = None
+
+
+def load_file(
+    path: str,
+    mode: str = "copy",
+    batch_size: int = 5000,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> LoadStats:
+    """
+    Загружает один файл (или его шард) в отдельной транзакции.
+
+    Шард — видео, которые начинаются в shard_index-й из shard_count
+    равных частей файла по байтам (iter_videos_shard): каждый шард
+    разбирает только свою часть, а видео всегда попадает в тот же шард,
+    что и его замеры.
+    """
     json_path = Path(path)
     if not json_path.is_file():
         raise FileNotFoundError(f"JSON file not found: {json_path}")
 
-    with json_path.open("r", encoding="utf-8") as f:
-        raw_data = json.load(f)
-
-    videos = _normalize_videos_container(raw_data)
+    started = time.perf_counter()
 
     total_videos = 0
     total_snapshots = 0
 
-    with engine.begin() as conn:
+    create_future_partitions()
+    with get_engine().begin() as conn:
+        writer = _make_writer(conn, mode, batch_size)
+
+        if shard_count > 1:
+            videos = iter_videos_shard(json_path, shard_index, shard_count)
+        else:
+            videos = iter_videos(json_path)
+
         for video in videos:
-            video_params = {
-                "id": video["id"],
-                "creator_id": video["creator_id"],
-                "video_created_at": video["video_created_at"],
-                "views_count": video["views_count"],
-                "likes_count": video["likes_count"],
-                "comments_count": video["comments_count"],
-                "reports_count": video["reports_count"],
-                "created_at": video["created_at"],
-                "updated_at": video["updated_at"],
-            }
-
-            conn.execute(text(VIDEO_INSERT_SQL), video_params)
+            writer.add_video(_video_params(video))
             total_videos += 1
 
-            snapshots = video.get("snapshots", []) or video.get("video_snapshots", [])
+            snapshots = _video_snapshots(video)
             video_id = video["id"]
 
             for snap in snapshots:
-                snap_params = {
-                    "id": snap["id"],
-                    "video_id": video_id,
-                    "views_count": snap["views_count"],
-                    "likes_count": snap["likes_count"],
-                    "comments_count": snap["comments_count"],
-                    "reports_count": snap["reports_count"],
-                    "delta_views_count": snap["delta_views_count"],
-                    "delta_likes_count": snap["delta_likes_count"],
-                    "delta_comments_count": snap["delta_comments_count"],
-                    "delta_reports_count": snap["delta_reports_count"],
-                    "created_at": snap["created_at"],
-                    "updated_at": snap["updated_at"],
-                }
-                conn.execute(text(SNAPSHOT_INSERT_SQL), snap_params)
+                writer.add_snapshot(_snapshot_params(video_id, snap))
                 total_snapshots += 1
 
-    print(f"Loaded {total_videos} videos and {total_snapshots} snapshots from {json_path}")
+        writer.finish()
+        changes = writer.counts if isinstance(writer, _IncrementalWriter) else None
+        # Без изменений кэш результатов остаётся действительным.
+        if changes is None or writer.changed:
+            conn.execute(text(BUMP_DATA_VERSION_SQL))
+
+    return LoadStats(
+        path=str(json_path),
+        shard_index=shard_index,
+        shard_count=shard_count,
+        videos=total_videos,
+        snapshots=total_snapshots,
+        seconds=time.perf_counter() - started,
+        pid=os.getpid(),
+        changes=changes,
+    )
+
+
+def _rows_per_sec(rows: int, seconds: float) -> float:
+    return rows / seconds if seconds > 0 else 0.0
+
+
+def _format_changes(changes: Dict[str, int]) -> str:
+    line = (
+        f"{changes['inserted']} inserted, {changes['updated']} updated, {changes['skipped']} skipped videos, "
+        f"{changes['snapshots_inserted']} new snapshots"
+    )
+    if changes.get("creator_kept"):
+        line += f", {changes['creator_kept']} creator changes not applied"
+    return line
+
+
+def load(path: str, mode: str = "copy", batch_size: int = 5000) -> None:
+    stats = load_file(path, mode=mode, batch_size=batch_size)
+
+    rows_per_sec = _rows_per_sec(stats.videos + stats.snapshots, stats.seconds)
+    print(f"Loaded {stats.videos} videos and {stats.snapshots} snapshots from {stats.path}")
+    if stats.changes is not None:
+        print(_format_changes(stats.changes))
+    print(f"Mode {mode}: {stats.seconds:.2f} s, {rows_per_sec:,.0f} rows/sec")
+
+
+def expand_paths(patterns: Sequence[str]) -> List[str]:
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No JSON files match: {pattern}")
+        paths.extend(matches)
+    return paths
+
+
+def _init_worker() -> None:
+    # Соединения пула, унаследованные от родителя через fork, использовать
+    # нельзя: каждый воркер открывает свои.
+    get_engine().dispose(close=False)
+
+
+def _load_task(task: Tuple[str, int, int, str, int]) -> LoadStats:
+    path, shard_index, shard_count, mode, batch_size = task
+    return load_file(path, mode=mode, batch_size=batch_size, shard_index=shard_index, shard_count=shard_count)
+
+
+def load_many(
+    patterns: Sequence[str],
+    workers: int = 1,
+    shards: int = 1,
+    mode: str = "copy",
+    batch_size: int = 5000,
+) -> List[LoadStats]:
+    """
+    Загружает несколько файлов (пути или glob-шаблоны) пулом процессов.
+
+    Каждый файл делится на shards шардов; каждый шард — отдельная задача
+    со своим соединением и транзакцией.
+    """
+    paths = expand_paths(patterns)
+    tasks = [(path, shard, shards, mode, batch_size) for path in paths for shard in range(shards)]
+    workers = max(1, min(workers, len(tasks)))
+
+    started = time.perf_counter()
+    results: List[LoadStats] = []
+
+    def _report(stats: LoadStats) -> None:
+        results.append(stats)
+        rows_per_sec = _rows_per_sec(stats.videos + stats.snapshots, stats.seconds)
+        print(
+            f"[{len(results)}/{len(tasks)}] {stats.path} shard {stats.shard_index + 1}/{stats.shard_count}: "
+            f"{stats.videos} videos, {stats.snapshots} snapshots in {stats.seconds:.2f} s "
+            f"({rows_per_sec:,.0f} rows/sec, pid {stats.pid})"
+        )
+        if stats.changes is not None:
+            print(f"    {_format_changes(stats.changes)}")
+
+    if workers == 1:
+        for task in tasks:
+            _report(_load_task(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_load_task, task) for task in tasks]
+            for future in as_completed(futures):
+                _report(future.result())
+
+    elapsed = time.perf_counter() - started
+    per_worker: Dict[int, List[int]] = {}
+    for stats in results:
+        counts = per_worker.setdefault(stats.pid, [0, 0])
+        counts[0] += stats.videos
+        counts[1] += stats.snapshots
+    for pid, (videos, snapshots) in sorted(per_worker.items()):
+        print(f"Worker {pid}: {videos} videos, {snapshots} snapshots")
+
+    total_rows = sum(s.videos + s.snapshots for s in results)
+    print(
+        f"Loaded {sum(s.videos for s in results)} videos and {sum(s.snapshots for s in results)} snapshots "
+        f"from {len(paths)} files with {workers} workers"
+    )
+    if mode == "incremental":
+        totals: Dict[str, int] = {}
+        for stats in results:
+            for key, value in (stats.changes or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        print(_format_changes(totals))
+    print(f"Mode {mode}: {elapsed:.2f} s, {_rows_per_sec(total_rows, elapsed):,.0f} rows/sec")
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load videos JSON export into PostgreSQL")
+    parser.add_argument("paths", nargs="+", help="paths or glob patterns of videos JSON files")
+    parser.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="copy",
+        help="row: INSERT per row; batch: executemany; copy: COPY into staging + merge (default); "
+             "incremental: skip unchanged videos, upsert changed ones, insert only new snapshots",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per batch / COPY chunk")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--shards", type=int, default=1, help="split every file into N shards (default 1)")
+    args = parser.parse_args(argv)
+
+    if len(args.paths) == 1 and args.workers == 1 and args.shards == 1 and not glob.has_magic(args.paths[0]):
+        load(args.paths[0], mode=args.mode, batch_size=args.batch_size)
+        return
+
+    load_many(args.paths, workers=args.workers, shards=args.shards, mode=args.mode, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python -m app.scripts.load_json path/to/videos.json")
+        print("Usage: python -m app.scripts.load_json path/to/videos.json [more.json ...] "
+              "[--mode row|batch|copy|incremental] [--workers N] [--shards N]")
         sys.exit(1)
 
-    load(sys.argv[1])
+    main()
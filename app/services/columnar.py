@@ -0,0 +1,361 @@
+"""
+Колоночный in-memory исполнитель ParsedQuery на NumPy.
+
+videos и video_snapshots держатся в памяти массивами-колонками,
+отсортированными по времени (video_created_at / created_at), а
+creator_id и video_id закодированы словарём в целые коды. Фильтр по
+датам — двоичный поиск по отсортированной колонке времени, остальные
+фильтры — векторные маски над найденным срезом, поэтому ответ
+считается без обращения к Postgres.
+
+Семантика фильтров повторяет build_sql без rollup-таблиц: границы дней
+в часовом поясе отчётов, полуинтервал для дат, включительный интервал
+для вопросов со временем, special-режимы учитывают только свои фильтры.
+
+Данные обновляются при смене data_version (её увеличивает каждая
+загрузка): videos небольшие и перечитываются целиком, а из
+video_snapshots, куда строки только добавляются, дочитываются замеры
+новее уже загруженных. Если число замеров после этого не сходится
+(загружены данные задним числом), снимок перечитывается полностью.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.nlp.query_schema import DateRange, ParsedQuery
+from .query_builder import DEFAULT_TIMEZONE, _date_bounds, _time_window
+
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_FETCH_SIZE = 100_000
+
+DATA_VERSION_SQL = "SELECT version FROM data_version WHERE id = 1"
+
+# Число замеров по rollup-таблице (миграция 003): дешевле COUNT(*) по video_snapshots.
+SNAPSHOTS_TOTAL_SQL = "SELECT COALESCE(SUM(snapshots_count), 0) FROM snapshot_rollup_daily"
+
+VIDEOS_SQL = """
+SELECT id, creator_id, (extract(epoch FROM video_created_at) * 1000000)::bigint, views_count, likes_count
+FROM videos
+"""
+
+SNAPSHOTS_SQL = """
+SELECT video_id, (extract(epoch FROM created_at) * 1000000)::bigint, delta_views_count
+FROM video_snapshots
+"""
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+class ColumnarTables(NamedTuple):
+    """Неизменяемый снимок данных; обновление создаёт новый снимок."""
+
+    data_version: int
+    creator_codes: Dict[str, int]
+    video_codes: Dict[str, int]
+    video_creator: np.ndarray   # код креатора по коду видео
+    v_created: np.ndarray       # videos, по возрастанию video_created_at (мкс от эпохи)
+    v_creator: np.ndarray
+    v_views: np.ndarray
+    v_likes: np.ndarray
+    s_created: np.ndarray       # video_snapshots, по возрастанию created_at (мкс от эпохи)
+    s_video: np.ndarray
+    s_delta_views: np.ndarray
+
+    @property
+    def snapshots_total(self) -> int:
+        return int(self.s_created.size)
+
+
+def _encode(codes: Dict[str, int], value: str) -> int:
+    code = codes.get(value)
+    if code is None:
+        code = len(codes)
+        codes[value] = code
+    return code
+
+
+def build_tables(
+    data_version: int,
+    videos: Iterable[Tuple[str, str, int, int, int]],
+    snapshots: Iterable[Tuple[str, int, int]],
+    previous: Optional[ColumnarTables] = None,
+) -> ColumnarTables:
+    """
+    Собирает снимок из строк videos (id, creator_id, video_created_at в мкс,
+    views_count, likes_count) и video_snapshots (video_id, created_at в мкс,
+    delta_views_count).
+
+    С previous videos заменяются целиком, а snapshots дописываются к уже
+    загруженным; коды видео и креаторов при этом сохраняются.
+    """
+    creator_codes = dict(previous.creator_codes) if previous else {}
+    video_codes = dict(previous.video_codes) if previous else {}
+
+    v_code: List[int] = []
+    v_creator: List[int] = []
+    v_created: List[int] = []
+    v_views: List[int] = []
+    v_likes: List[int] = []
+    for video_id, creator_id, created, views, likes in videos:
+        v_code.append(_encode(video_codes, video_id))
+        v_creator.append(_encode(creator_codes, creator_id))
+        v_created.append(created)
+        v_views.append(views)
+        v_likes.append(likes)
+
+    video_creator = np.full(len(video_codes), -1, dtype=np.int32)
+    if previous is not None:
+        video_creator[: previous.video_creator.size] = previous.video_creator
+    video_creator[np.asarray(v_code, dtype=np.int64)] = v_creator
+
+    order = np.argsort(np.asarray(v_created, dtype=np.int64), kind="stable")
+
+    s_video: List[int] = []
+    s_created: List[int] = []
+    s_delta: List[int] = []
+    for video_id, created, delta in snapshots:
+        s_video.append(video_codes[video_id])
+        s_created.append(created)
+        s_delta.append(delta)
+
+    new_created = np.asarray(s_created, dtype=np.int64)
+    s_order = np.argsort(new_created, kind="stable")
+    new_created = new_created[s_order]
+    new_video = np.asarray(s_video, dtype=np.int32)[s_order]
+    new_delta = np.asarray(s_delta, dtype=np.int64)[s_order]
+    if previous is not None:
+        new_created = np.concatenate([previous.s_created, new_created])
+        new_video = np.concatenate([previous.s_video, new_video])
+        new_delta = np.concatenate([previous.s_delta_views, new_delta])
+
+    return ColumnarTables(
+        data_version=data_version,
+        creator_codes=creator_codes,
+        video_codes=video_codes,
+        video_creator=video_creator,
+        v_created=np.asarray(v_created, dtype=np.int64)[order],
+        v_creator=np.asarray(v_creator, dtype=np.int32)[order],
+        v_views=np.asarray(v_views, dtype=np.int64)[order],
+        v_likes=np.asarray(v_likes, dtype=np.int64)[order],
+        s_created=new_created,
+        s_video=new_video,
+        s_delta_views=new_delta,
+    )
+
+
+def _time_slice(
+    column: np.ndarray,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    end_inclusive: bool = False,
+) -> slice:
+    lo = 0 if start is None else int(np.searchsorted(column, _micros(start), side="left"))
+    if end is None:
+        hi = column.size
+    else:
+        hi = int(np.searchsorted(column, _micros(end), side="right" if end_inclusive else "left"))
+    return slice(lo, max(lo, hi))
+
+
+def _date_slice(column: np.ndarray, date_range: Optional[DateRange], tz) -> slice:
+    if date_range is None:
+        return slice(0, column.size)
+    start, end = _date_bounds(date_range, tz)
+    return _time_slice(column, start, end)
+
+
+def _count_distinct(codes: np.ndarray, size: int) -> int:
+    seen = np.zeros(size, dtype=bool)
+    seen[codes] = True
+    return int(np.count_nonzero(seen))
+
+
+def execute(tables: ColumnarTables, parsed: ParsedQuery, timezone: str = DEFAULT_TIMEZONE) -> int:
+    """Ответ на ParsedQuery по снимку; тот же результат, что у SQL из build_sql."""
+    tz = ZoneInfo(timezone)
+
+    if parsed.special == "distinct_videos_with_positive_delta":
+        if parsed.entity != "snapshot":
+            raise ValueError(
+                'special="distinct_videos_with_positive_delta" поддерживается только при entity="snapshot"'
+            )
+        rows = _date_slice(tables.s_created, parsed.date_range, tz)
+        positive = tables.s_video[rows][tables.s_delta_views[rows] > 0]
+        return _count_distinct(positive, tables.video_creator.size)
+
+    if parsed.special == "snapshots_with_negative_delta_views":
+        if parsed.entity != "snapshot":
+            raise ValueError(
+                'special="snapshots_with_negative_delta_views" поддерживается только при entity="snapshot"'
+            )
+        rows = _date_slice(tables.s_created, parsed.date_range, tz)
+        return int(np.count_nonzero(tables.s_delta_views[rows] < 0))
+
+    creator_code = None
+    if parsed.creator_id is not None:
+        # Неизвестный креатор получает код -1: ни одна строка не подойдёт.
+        creator_code = tables.creator_codes.get(parsed.creator_id, -1)
+
+    if parsed.special == "distinct_creators_with_min_views" or parsed.entity == "video":
+        if parsed.special is not None and parsed.entity != "video":
+            raise ValueError(
+                'special="distinct_creators_with_min_views" поддерживается только при entity="video"'
+            )
+        if parsed.special is None and parsed.metric not in ("videos_count", "sum_views_total", "sum_likes_total"):
+            raise ValueError(f"Unsupported metric {parsed.metric!r} for entity 'video'")
+
+        rows = _date_slice(tables.v_created, parsed.date_range, tz)
+        mask = np.ones(rows.stop - rows.start, dtype=bool)
+        if creator_code is not None:
+            mask &= tables.v_creator[rows] == creator_code
+        if parsed.min_views is not None:
+            mask &= tables.v_views[rows] > parsed.min_views
+
+        if parsed.special is not None:
+            return _count_distinct(tables.v_creator[rows][mask], len(tables.creator_codes))
+        if parsed.metric == "videos_count":
+            return int(np.count_nonzero(mask))
+        column = tables.v_views if parsed.metric == "sum_views_total" else tables.v_likes
+        return int(column[rows][mask].sum())
+
+    if parsed.entity == "snapshot":
+        if parsed.metric not in ("sum_views_delta", "videos_count"):
+            raise ValueError(f"Unsupported metric {parsed.metric!r} for entity 'snapshot' without special mode")
+
+        rows = slice(0, tables.s_created.size)
+        if parsed.date_range is not None:
+            if parsed.time_from is None and parsed.time_to is None:
+                rows = _date_slice(tables.s_created, parsed.date_range, tz)
+            else:
+                window = _time_window(parsed, tz)
+                if window is not None:
+                    rows = _time_slice(tables.s_created, window[0], window[1], end_inclusive=True)
+
+        deltas = tables.s_delta_views[rows]
+        if creator_code is not None:
+            mask = tables.video_creator[tables.s_video[rows]] == creator_code
+            deltas = deltas[mask]
+        if parsed.metric == "videos_count":
+            return int(deltas.size)
+        return int(deltas.sum())
+
+    raise ValueError(f"Unsupported entity: {parsed.entity!r}")
+
+
+def _fetch(conn: Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> Iterable[Tuple]:
+    result = conn.execution_options(stream_results=True).execute(text(sql), params or {})
+    for partition in result.partitions(_FETCH_SIZE):
+        yield from partition
+
+
+class ColumnarStore:
+    """
+    Снимок данных в памяти и его обновление.
+
+    Запросы читают текущий снимок без блокировок; обновление строит
+    новый снимок в отдельном потоке и подменяет ссылку целиком. Версия
+    данных проверяется не чаще refresh_interval секунд, и проверка не
+    задерживает запрос: он отвечает по текущему снимку, пока новый
+    строится в фоне.
+    """
+
+    def __init__(self, engine_factory, refresh_interval: float = 30.0,
+                 clock=time.monotonic) -> None:
+        self._engine_factory = engine_factory
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._tables: Optional[ColumnarTables] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Future] = None
+        self.last_refresh: Dict[str, Any] = {}
+
+    @property
+    def tables(self) -> Optional[ColumnarTables]:
+        return self._tables
+
+    def refresh(self) -> ColumnarTables:
+        """Синхронно приводит снимок к текущей data_version."""
+        with self._lock:
+            engine: Engine = self._engine_factory()
+            started = time.perf_counter()
+            # Все чтения в одной транзакции REPEATABLE READ: videos и
+            # snapshots соответствуют одному моменту.
+            with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+                with conn.begin():
+                    tables, kind = self._refresh(conn, self._tables)
+            self._tables = tables
+            self._checked_at = self._clock()
+            if kind != "unchanged":
+                self.last_refresh = {
+                    "kind": kind,
+                    "data_version": tables.data_version,
+                    "videos": int(tables.v_created.size),
+                    "snapshots": tables.snapshots_total,
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+                logger.info("Columnar store refreshed: %s", self.last_refresh)
+            return tables
+
+    @staticmethod
+    def _refresh(conn: Connection, current: Optional[ColumnarTables]) -> Tuple[ColumnarTables, str]:
+        version = int(conn.execute(text(DATA_VERSION_SQL)).scalar() or 0)
+        if current is not None and current.data_version == version:
+            return current, "unchanged"
+
+        videos = list(_fetch(conn, VIDEOS_SQL))
+        if current is not None and current.snapshots_total:
+            total = int(conn.execute(text(SNAPSHOTS_TOTAL_SQL)).scalar() or 0)
+            watermark = _EPOCH + timedelta(microseconds=int(current.s_created[-1]))
+            fresh = list(_fetch(conn, SNAPSHOTS_SQL + " WHERE created_at > :after", {"after": watermark}))
+            if current.snapshots_total + len(fresh) == total:
+                return build_tables(version, videos, fresh, previous=current), "incremental"
+
+        return build_tables(version, videos, _fetch(conn, SNAPSHOTS_SQL)), "full"
+
+    def ensure_fresh(self) -> ColumnarTables:
+        tables = self._tables
+        if tables is None or self._clock() - self._checked_at >= self.refresh_interval:
+            tables = self.refresh()
+        return tables
+
+    async def ensure_fresh_async(self) -> ColumnarTables:
+        """
+        Первый вызов ждёт загрузки снимка; дальше проверка версии
+        запускается в фоне, а ответ даётся по текущему снимку.
+        """
+        tables = self._tables
+        if tables is not None and self._clock() - self._checked_at < self.refresh_interval:
+            return tables
+
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(asyncio.to_thread(self.refresh))
+            self._refreshing.add_done_callback(self._log_refresh_error)
+        if tables is None:
+            return await asyncio.shield(self._refreshing)
+        return tables
+
+    @staticmethod
+    def _log_refresh_error(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Columnar store refresh failed", exc_info=future.exception())
+
+    def execute(self, parsed: ParsedQuery, timezone: str = DEFAULT_TIMEZONE) -> int:
+        if self._tables is None:
+            raise RuntimeError("Columnar store is not loaded")
+        return execute(self._tables, parsed, timezone)
@@ -1,26 +1,132 @@
+"""
+Разбор дат из текста.
+
+Типовые формы ("2025-11-28", "28.11.2025", "28 ноября 2025",
+"с 1 по 5 ноября 2025") разбираются регулярными выражениями. dateparser
+медленный и долго импортируется, поэтому он подключается лениво и
+только для строк, которые быстрый разбор не понял. Результаты
+запоминаются в LRU-кэше с ключом (строка, сегодняшняя дата): от текущей
+даты зависят строки без года и относительные даты.
+"""
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from datetime import date, datetime
+from functools import lru_cache
 from typing import Tuple, Optional
 
-import dateparser
+
+DATE_CACHE_SIZE = 4096
+
+MONTHS_GENITIVE = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+_MONTH_RE = "|".join(MONTHS_GENITIVE)
+_YEAR_TAIL = r"(?:\s+(?:года|г\.?))?"
+
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:z|[+-]\d{2}:?\d{2})?")
+_DOTTED_RE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+_RU_DATE_RE = re.compile(rf"(\d{{1,2}})\s+({_MONTH_RE})(?:\s+(\d{{4}}))?{_YEAR_TAIL}")
+_RU_RANGE_RE = re.compile(
+    rf"(?:с\s+)?(\d{{1,2}})(?:\s+({_MONTH_RE}))?(?:\s+(\d{{4}}){_YEAR_TAIL})?"
+    rf"\s+по\s+(\d{{1,2}})\s+({_MONTH_RE})(?:\s+(\d{{4}}))?{_YEAR_TAIL}"
+)
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.lower().replace("ё", "е").split()).rstrip(" .,")
+
+
+def _fast_parse(text: str, today: date) -> Optional[datetime]:
+    """Разбирает нормализованную строку без dateparser или возвращает None."""
+    if _ISO_RE.fullmatch(text):
+        try:
+            return datetime.fromisoformat(text.upper().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+    m = _DOTTED_RE.fullmatch(text)
+    if m:
+        day, month, year = m.groups()
+    else:
+        m = _RU_DATE_RE.fullmatch(text)
+        if not m:
+            return None
+        day, month, year = m.group(1), MONTHS_GENITIVE[m.group(2)], m.group(3) or today.year
+
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _parse_with_dateparser(text: str) -> Optional[datetime]:
+    import dateparser
+
+    return dateparser.parse(text, languages=["ru", "en"])
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_cached(text: str, today: date) -> Optional[datetime]:
+    parsed = _fast_parse(text, today)
+    if parsed is None:
+        parsed = _parse_with_dateparser(text)
+    return parsed
 
 
 def parse_date_string(value: str) -> datetime:
     if not value:
         raise ValueError("Empty date string")
 
-    dt = dateparser.parse(value, languages=["ru", "en"])
+    dt = _parse_cached(_normalize(value), date.today())
     if dt is None:
         raise ValueError(f"Could not parse date from string: {value!r}")
     return dt
 
 
+def _fast_parse_range(text: str, today: date) -> Optional[Tuple[datetime, datetime]]:
+    """
+    "с 1 по 5 ноября 2025", "с 28 ноября по 2 декабря": месяц и год
+    левой границы, если они не указаны, берутся из правой.
+    """
+    m = _RU_RANGE_RE.fullmatch(text)
+    if not m:
+        return None
+    start_day, start_month, start_year, end_day, end_month, end_year = m.groups()
+    end_year = int(end_year) if end_year else today.year
+    end_month = MONTHS_GENITIVE[end_month]
+    try:
+        start = datetime(
+            int(start_year) if start_year else end_year,
+            MONTHS_GENITIVE[start_month] if start_month else end_month,
+            int(start_day),
+        )
+        end = datetime(end_year, end_month, int(end_day))
+    except ValueError:
+        return None
+    return start, end
+
+
 def parse_date_range(natural_text: str) -> Tuple[datetime, datetime]:
     text = natural_text.strip()
     if not text:
         raise ValueError("Empty natural_text for date range")
 
+    fast = _fast_parse_range(_normalize(text), date.today())
+    if fast is not None:
+        return fast
+
     if text.lower().startswith("с "):
         text = text[2:].strip()
 
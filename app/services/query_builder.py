@@ -1,12 +1,35 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import re
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
 
 from app.nlp.query_schema import ParsedQuery, DateRange
 
 
 SqlWithParams = Tuple[str, Dict[str, Any]]
 
+DEFAULT_TIMEZONE = "UTC"
+
+# Параметр вида :name; "::" (приведение типа) не параметр. Строковых
+# литералов с двоеточиями build_sql не строит.
+_PARAM_RE = re.compile(r"(?<![:\w]):(?!:)(\w+)")
+
+
+def _date_bounds(date_range: DateRange, tz: tzinfo) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Границы диапазона дат как полуинтервал [start, end) в часовом поясе tz.
+
+    end — начало дня, следующего за date_range.end.
+    """
+    start = end = None
+    if date_range.start:
+        start = datetime.combine(date.fromisoformat(date_range.start), time.min, tzinfo=tz)
+    if date_range.end:
+        end = datetime.combine(date.fromisoformat(date_range.end) + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
 
 def _apply_date_range(
     where: List[str],
@@ -14,20 +37,19 @@ def _apply_date_range(
     alias: str,
     column: str,
     date_range: DateRange,
+    tz: tzinfo,
 ) -> None:
-    start = date_range.start
-    end = date_range.end
+    # Сравнение самой колонки с константами (без column::date) позволяет
+    # Postgres использовать индексы по created_at / video_created_at, а
+    # границы дня задаются часовым поясом отчётов, а не сессии БД.
+    start_ts, end_ts = _date_bounds(date_range, tz)
 
-    if start and end:
-        where.append(f"{alias}.{column}::date BETWEEN :start_date AND :end_date")
-        params["start_date"] = start
-        params["end_date"] = end
-    elif start:
-        where.append(f"{alias}.{column}::date >= :start_date")
-        params["start_date"] = start
-    elif end:
-        where.append(f"{alias}.{column}::date <= :end_date")
-        params["end_date"] = end
+    if start_ts is not None:
+        where.append(f"{alias}.{column} >= :start_ts")
+        params["start_ts"] = start_ts
+    if end_ts is not None:
+        where.append(f"{alias}.{column} < :end_ts")
+        params["end_ts"] = end_ts
 
 
 def _build_where_clause(where: List[str]) -> str:
@@ -36,7 +58,7 @@ def _build_where_clause(where: List[str]) -> str:
     return " WHERE " + " AND ".join(where)
 
 
-def _build_special_distinct_videos_with_positive_delta(parsed: ParsedQuery) -> SqlWithParams:
+def _build_special_distinct_videos_with_positive_delta(parsed: ParsedQuery, tz: tzinfo) -> SqlWithParams:
     if parsed.entity != "snapshot":
         raise ValueError(
             'special="distinct_videos_with_positive_delta" поддерживается только при entity="snapshot"'
@@ -46,7 +68,7 @@ def _build_special_distinct_videos_with_positive_delta(parsed: ParsedQuery) -> S
     where: List[str] = ["s.delta_views_count > 0"]
 
     if parsed.date_range is not None:
-        _apply_date_range(where, params, alias="s", column="created_at", date_range=parsed.date_range)
+        _apply_date_range(where, params, alias="s", column="created_at", date_range=parsed.date_range, tz=tz)
 
 
     where_sql = _build_where_clause(where)
@@ -58,7 +80,7 @@ FROM video_snapshots AS s
 
     return sql, params
 
-def _build_special_snapshots_with_negative_delta_views(parsed: ParsedQuery) -> SqlWithParams:
+def _build_special_snapshots_with_negative_delta_views(parsed: ParsedQuery, tz: tzinfo) -> SqlWithParams:
     if parsed.entity != "snapshot":
         raise ValueError(
             'special="snapshots_with_negative_delta_views" поддерживается только при entity="snapshot"'
@@ -68,7 +90,7 @@ def _build_special_snapshots_with_negative_delta_views(parsed: ParsedQuery) -> S
     where: List[str] = ["s.delta_views_count < 0"]
 
     if parsed.date_range is not None:
-        _apply_date_range(where, params, alias="s", column="created_at", date_range=parsed.date_range)
+        _apply_date_range(where, params, alias="s", column="created_at", date_range=parsed.date_range, tz=tz)
 
     where_sql = _build_where_clause(where)
     sql = f"""
@@ -79,7 +101,7 @@ FROM video_snapshots AS s
 
     return sql, params
 
-def _build_special_distinct_creators_with_min_views(parsed: ParsedQuery) -> SqlWithParams:
+def _build_special_distinct_creators_with_min_views(parsed: ParsedQuery, tz: tzinfo) -> SqlWithParams:
     if parsed.entity != "video":
         raise ValueError(
             'special="distinct_creators_with_min_views" поддерживается только при entity="video"'
@@ -98,7 +120,7 @@ def _build_special_distinct_creators_with_min_views(parsed: ParsedQuery) -> SqlW
         params["creator_id"] = parsed.creator_id
 
     if parsed.date_range is not None:
-        _apply_date_range(where, params, alias=alias, column="video_created_at", date_range=parsed.date_range)
+        _apply_date_range(where, params, alias=alias, column="video_created_at", date_range=parsed.date_range, tz=tz)
 
     where_sql = _build_where_clause(where)
     sql = f"""
@@ -110,13 +132,263 @@ FROM videos AS {alias}
     return sql, params
 
 
-def build_sql(parsed: ParsedQuery) -> SqlWithParams:
+# ---------------------
+# rollups (migration 003_create_snapshot_rollups.sql)
+# ---------------------
+
+# metric -> (колонка rollup-таблицы, выражение по сырым video_snapshots)
+_ROLLUP_SNAPSHOT_METRICS = {
+    "sum_views_delta": ("delta_views_sum", "COALESCE(SUM(s.delta_views_count), 0)"),
+    "videos_count": ("snapshots_count", "COUNT(*)"),
+}
+
+
+def _apply_rollup_date_range(
+    where: List[str],
+    params: Dict[str, Any],
+    date_range: Optional[DateRange],
+    tz: tzinfo,
+    hourly_allowed: bool = True,
+) -> Optional[str]:
+    """
+    Добавляет фильтр по датам для rollup-таблиц и возвращает таблицу.
+
+    Дневные rollup-таблицы построены по суткам UTC, поэтому подходят,
+    только если границы дня в tz совпадают с полуночью UTC; иначе при
+    целочасовом смещении используется часовой rollup. None — rollup не
+    подходит.
+    """
+    if date_range is None:
+        return "snapshot_rollup_daily"
+
+    start_ts, end_ts = _date_bounds(date_range, tz)
+    bounds = [ts for ts in (start_ts, end_ts) if ts is not None]
+
+    if all(ts.utcoffset() == timedelta(0) for ts in bounds):
+        if date_range.start:
+            where.append("r.bucket_date >= :start_date")
+            params["start_date"] = date.fromisoformat(date_range.start)
+        if date_range.end:
+            where.append("r.bucket_date <= :end_date")
+            params["end_date"] = date.fromisoformat(date_range.end)
+        return "snapshot_rollup_daily"
+
+    if hourly_allowed and all(ts.utcoffset() % timedelta(hours=1) == timedelta(0) for ts in bounds):
+        if start_ts is not None:
+            where.append("r.bucket_start >= :start_ts")
+            params["start_ts"] = start_ts
+        if end_ts is not None:
+            where.append("r.bucket_start < :end_ts")
+            params["end_ts"] = end_ts
+        return "snapshot_rollup_hourly"
+
+    return None
+
+
+def _is_hour_aligned(value: datetime) -> bool:
+    return (
+        value.minute == 0
+        and value.second == 0
+        and value.microsecond == 0
+        and value.utcoffset() % timedelta(hours=1) == timedelta(0)
+    )
+
+
+def _time_window(parsed: ParsedQuery, tz: tzinfo) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Интервал [start_ts, end_ts] (обе границы включительно) для вопросов
+    с time_from / time_to. Применяется, только если заданы обе даты.
+    """
+    date_range = parsed.date_range
+    if date_range is None or (parsed.time_from is None and parsed.time_to is None):
+        return None
+    if not (date_range.start and date_range.end):
+        return None
+
+    time_from = parsed.time_from or "00:00:00"
+    time_to = parsed.time_to or "23:59:59"
+    start_ts = datetime.fromisoformat(f"{date_range.start} {time_from}").replace(tzinfo=tz)
+    end_ts = datetime.fromisoformat(f"{date_range.end} {time_to}").replace(tzinfo=tz)
+    return start_ts, end_ts
+
+
+def _build_from_rollups(parsed: ParsedQuery, tz: tzinfo) -> Optional[SqlWithParams]:
+    """
+    SQL по rollup-таблицам, если вопрос на них ложится без потери точности.
+
+    Возвращает None, если нужен проход по сырым video_snapshots. Фильтры
+    повторяют семантику основного построителя: в том числе special-режимы
+    по замерам не учитывают creator_id и время, а интервал по времени
+    применяется только при заданных обеих датах.
+    """
+    if parsed.entity != "snapshot":
+        return None
+
+    params: Dict[str, Any] = {}
+    where: List[str] = []
+
+    if parsed.special == "distinct_videos_with_positive_delta":
+        where.append("r.positive_delta_count > 0")
+        table = _apply_rollup_date_range(where, params, parsed.date_range, tz, hourly_allowed=False)
+        if table is None:
+            return None
+
+        where_sql = _build_where_clause(where)
+        sql = f"""
+SELECT COUNT(DISTINCT r.video_id) AS value
+FROM snapshot_rollup_video_daily AS r
+{where_sql}
+""".strip()
+        return sql, params
+
+    if parsed.special == "snapshots_with_negative_delta_views":
+        table = _apply_rollup_date_range(where, params, parsed.date_range, tz)
+        if table is None:
+            return None
+
+        where_sql = _build_where_clause(where)
+        sql = f"""
+SELECT COALESCE(SUM(r.negative_delta_count), 0) AS value
+FROM {table} AS r
+{where_sql}
+""".strip()
+        return sql, params
+
+    if parsed.special is not None or parsed.metric not in _ROLLUP_SNAPSHOT_METRICS:
+        return None
+
+    column, raw_expr = _ROLLUP_SNAPSHOT_METRICS[parsed.metric]
+
+    has_time = parsed.time_from is not None or parsed.time_to is not None
+    window = _time_window(parsed, tz)
+
+    if window is None:
+        table = _apply_rollup_date_range(where, params, None if has_time else parsed.date_range, tz)
+        if table is None:
+            return None
+        if parsed.creator_id is not None:
+            where.append("r.creator_id = :creator_id")
+            params["creator_id"] = parsed.creator_id
+
+        where_sql = _build_where_clause(where)
+        sql = f"""
+SELECT COALESCE(SUM(r.{column}), 0) AS value
+FROM {table} AS r
+{where_sql}
+""".strip()
+        return sql, params
+
+    # Интервал по времени: часовые бакеты [start_ts, end_ts) плюс замеры ровно
+    # в end_ts, т.к. исходный BETWEEN включает правую границу.
+    start_ts, end_ts = window
+    if parsed.time_to is None or not (_is_hour_aligned(start_ts) and _is_hour_aligned(end_ts)):
+        return None
+
+    params["start_ts"] = start_ts
+    params["end_ts"] = end_ts
+    where.append("r.bucket_start >= :start_ts")
+    where.append("r.bucket_start < :end_ts")
+    tail_from = "video_snapshots AS s"
+    tail_where = ["s.created_at = :end_ts", "s.created_at >= :start_ts"]
+
+    if parsed.creator_id is not None:
+        where.append("r.creator_id = :creator_id")
+        tail_from += " JOIN videos AS v ON v.id = s.video_id"
+        tail_where.append("v.creator_id = :creator_id")
+        params["creator_id"] = parsed.creator_id
+
+    where_sql = _build_where_clause(where)
+    tail_where_sql = _build_where_clause(tail_where)
+    sql = f"""
+SELECT COALESCE(SUM(r.{column}), 0) + (
+    SELECT {raw_expr}
+    FROM {tail_from}
+    {tail_where_sql}
+) AS value
+FROM snapshot_rollup_hourly AS r
+{where_sql}
+""".strip()
+    return sql, params
+
+
+# ---------------------
+# creator_stats (migration 007_create_creator_stats.sql)
+# ---------------------
+
+# metric -> колонка creator_stats
+_CREATOR_STATS_METRICS = {
+    "videos_count": "videos_count",
+    "sum_views_total": "total_views",
+    "sum_likes_total": "total_likes",
+}
+
+
+def _build_from_creator_stats(parsed: ParsedQuery) -> Optional[SqlWithParams]:
+    """
+    SQL по creator_stats для итогов по видео без фильтра по датам.
+
+    Итоги по метрикам считаются, если нет и min_views; для
+    distinct_creators_with_min_views условие «хотя бы одно видео с
+    views_count > min_views» равносильно max_views > min_views.
+    Возвращает None, если нужен проход по videos.
+    """
+    if parsed.entity != "video" or parsed.date_range is not None:
+        return None
+
+    params: Dict[str, Any] = {}
+    where: List[str] = []
+
+    if parsed.special == "distinct_creators_with_min_views":
+        if parsed.min_views is not None:
+            where.append("c.max_views > :min_views")
+            params["min_views"] = parsed.min_views
+        select_expr = "COUNT(*)"
+    elif parsed.special is None and parsed.min_views is None and parsed.metric in _CREATOR_STATS_METRICS:
+        select_expr = f"COALESCE(SUM(c.{_CREATOR_STATS_METRICS[parsed.metric]}), 0)"
+    else:
+        return None
+
+    if parsed.creator_id is not None:
+        where.append("c.creator_id = :creator_id")
+        params["creator_id"] = parsed.creator_id
+
+    where_sql = _build_where_clause(where)
+    sql = f"""
+SELECT {select_expr} AS value
+FROM creator_stats AS c
+{where_sql}
+""".strip()
+    return sql, params
+
+
+def build_sql(
+    parsed: ParsedQuery,
+    use_rollups: bool = False,
+    timezone: str = DEFAULT_TIMEZONE,
+) -> SqlWithParams:
+    """
+    Строит SQL и параметры для ParsedQuery.
+
+    Даты и время из запроса трактуются в часовом поясе timezone.
+    При use_rollups=True вопросы по замерам, которые ложатся на границы
+    часов/дней, считаются по rollup-таблицам вместо video_snapshots, а
+    итоги по видео без фильтра по датам — по creator_stats вместо videos.
+    """
+    tz = ZoneInfo(timezone)
+
+    if use_rollups:
+        routed = _build_from_rollups(parsed, tz)
+        if routed is None:
+            routed = _build_from_creator_stats(parsed)
+        if routed is not None:
+            return routed
+
     if parsed.special == "distinct_videos_with_positive_delta":
-        return _build_special_distinct_videos_with_positive_delta(parsed)
+        return _build_special_distinct_videos_with_positive_delta(parsed, tz)
     if parsed.special == "snapshots_with_negative_delta_views":
-        return _build_special_snapshots_with_negative_delta_views(parsed)
+        return _build_special_snapshots_with_negative_delta_views(parsed, tz)
     if parsed.special == "distinct_creators_with_min_views":
-        return _build_special_distinct_creators_with_min_views(parsed)
+        return _build_special_distinct_creators_with_min_views(parsed, tz)
 
 
     params: Dict[str, Any] = {}
@@ -138,7 +410,8 @@ def build_sql(parsed: ParsedQuery) -> SqlWithParams:
             params["min_views"] = parsed.min_views
 
         if parsed.date_range is not None:
-            _apply_date_range(where, params, alias=table_alias, column="video_created_at", date_range=parsed.date_range)
+            _apply_date_range(where, params, alias=table_alias, column="video_created_at",
+                              date_range=parsed.date_range, tz=tz)
 
         where_sql = _build_where_clause(where)
 
@@ -169,15 +442,11 @@ FROM {table_name} AS {table_alias}
         if parsed.date_range is not None:
             if parsed.time_from is None and parsed.time_to is None:
                 _apply_date_range(where, params, alias=table_alias, column="created_at",
-                                      date_range=parsed.date_range)
+                                  date_range=parsed.date_range, tz=tz)
             else:
-                start_date = parsed.date_range.start
-                end_date = parsed.date_range.end
-                if start_date and end_date:
-                    time_from = parsed.time_from or "00:00:00"
-                    time_to = parsed.time_to or "23:59:59"
-                    params["start_ts"] = f"{start_date} {time_from}"
-                    params["end_ts"] = f"{end_date} {time_to}"
+                window = _time_window(parsed, tz)
+                if window is not None:
+                    params["start_ts"], params["end_ts"] = window
                     where.append(f"{table_alias}.created_at BETWEEN :start_ts AND :end_ts")
 
         from_clause = base_from
@@ -204,3 +473,200 @@ FROM {table_name} AS {table_alias}
         return sql, params
 
     raise ValueError(f"Unsupported entity: {parsed.entity!r}")
+
+
+def prefix_params(sql: str, params: Dict[str, Any], prefix: str) -> SqlWithParams:
+    """
+    SQL и параметры с префиксом prefix у имён параметров: запросы из
+    build_sql можно вкладывать в один SELECT без пересечения имён.
+    """
+    renamed = _PARAM_RE.sub(lambda m: ":" + prefix + m.group(1), sql)
+    return renamed, {prefix + name: value for name, value in params.items()}
+
+
+# ---------------------
+# пакет запросов в один проход по таблице (build_batch_sql)
+# ---------------------
+
+class _Condition(NamedTuple):
+    """Условие фильтра; "{}" в sql — место параметра param со значением value."""
+
+    sql: str
+    param: str = ""
+    value: Any = None
+
+
+def _batch_date_conditions(column: str, date_range: DateRange, tz: tzinfo) -> List[_Condition]:
+    start_ts, end_ts = _date_bounds(date_range, tz)
+    conditions = []
+    if start_ts is not None:
+        conditions.append(_Condition(f"{column} >= {{}}", "start_ts", start_ts))
+    if end_ts is not None:
+        conditions.append(_Condition(f"{column} < {{}}", "end_ts", end_ts))
+    return conditions
+
+
+def _batch_video_column(parsed: ParsedQuery, tz: tzinfo) -> Tuple[str, List[_Condition]]:
+    """Агрегат ("{filter}" — место FILTER) и условия запроса по videos."""
+    if parsed.special == "distinct_creators_with_min_views":
+        aggregate = "COUNT(DISTINCT v.creator_id){filter}"
+    elif parsed.special is not None:
+        raise ValueError(f'special="{parsed.special}" поддерживается только при entity="snapshot"')
+    elif parsed.metric == "videos_count":
+        aggregate = "COUNT(*){filter}"
+    elif parsed.metric == "sum_views_total":
+        aggregate = "COALESCE(SUM(v.views_count){filter}, 0)"
+    elif parsed.metric == "sum_likes_total":
+        aggregate = "COALESCE(SUM(v.likes_count){filter}, 0)"
+    else:
+        raise ValueError(f"Unsupported metric {parsed.metric!r} for entity 'video'")
+
+    conditions = []
+    if parsed.creator_id is not None:
+        conditions.append(_Condition("v.creator_id = {}", "creator_id", parsed.creator_id))
+    if parsed.min_views is not None:
+        conditions.append(_Condition("v.views_count > {}", "min_views", parsed.min_views))
+    if parsed.date_range is not None:
+        conditions.extend(_batch_date_conditions("v.video_created_at", parsed.date_range, tz))
+    return aggregate, conditions
+
+
+def _batch_snapshot_column(parsed: ParsedQuery, tz: tzinfo) -> Tuple[str, List[_Condition]]:
+    """
+    Агрегат и условия запроса по video_snapshots. Как и в build_sql,
+    special-режимы учитывают только date_range (без времени и креатора).
+    """
+    if parsed.special in ("distinct_videos_with_positive_delta", "snapshots_with_negative_delta_views"):
+        if parsed.special == "distinct_videos_with_positive_delta":
+            aggregate, delta = "COUNT(DISTINCT s.video_id){filter}", "s.delta_views_count > 0"
+        else:
+            aggregate, delta = "COUNT(*){filter}", "s.delta_views_count < 0"
+        conditions = [_Condition(delta)]
+        if parsed.date_range is not None:
+            conditions.extend(_batch_date_conditions("s.created_at", parsed.date_range, tz))
+        return aggregate, conditions
+
+    if parsed.special is not None:
+        raise ValueError(f'special="{parsed.special}" поддерживается только при entity="video"')
+    if parsed.metric == "sum_views_delta":
+        aggregate = "COALESCE(SUM(s.delta_views_count){filter}, 0)"
+    elif parsed.metric == "videos_count":
+        aggregate = "COUNT(*){filter}"
+    else:
+        raise ValueError(f"Unsupported metric {parsed.metric!r} for entity 'snapshot' without special mode")
+
+    conditions = []
+    if parsed.date_range is not None:
+        if parsed.time_from is None and parsed.time_to is None:
+            conditions.extend(_batch_date_conditions("s.created_at", parsed.date_range, tz))
+        else:
+            window = _time_window(parsed, tz)
+            if window is not None:
+                conditions.append(_Condition("s.created_at >= {}", "start_ts", window[0]))
+                conditions.append(_Condition("s.created_at <= {}", "end_ts", window[1]))
+    if parsed.creator_id is not None:
+        conditions.append(_Condition("v.creator_id = {}", "creator_id", parsed.creator_id))
+    return aggregate, conditions
+
+
+def _render_conditions(conditions: List[_Condition], params: Dict[str, Any]) -> List[str]:
+    """
+    SQL условий; одинаковые значения одного параметра делят одно имя,
+    разные получают суффикс (min_views, min_views_1, ...).
+    """
+    rendered = []
+    for condition in conditions:
+        if not condition.param:
+            rendered.append(condition.sql)
+            continue
+        name = condition.param
+        suffix = 0
+        while name in params and params[name] != condition.value:
+            suffix += 1
+            name = f"{condition.param}_{suffix}"
+        params[name] = condition.value
+        rendered.append(condition.sql.format(":" + name))
+    return rendered
+
+
+def _build_table_pass(
+    columns: List[Tuple[int, str, List[_Condition]]],
+    from_clause: str,
+    params: Dict[str, Any],
+) -> str:
+    """
+    Один SELECT по таблице: условия, общие для всех запросов, идут в
+    WHERE, остальные — в FILTER агрегата своего запроса.
+    """
+    shared = [c for c in columns[0][2] if all(c in conditions for _, _, conditions in columns[1:])]
+    select = []
+    for index, aggregate, conditions in columns:
+        own = _render_conditions([c for c in conditions if c not in shared], params)
+        filter_sql = f" FILTER (WHERE {' AND '.join(own)})" if own else ""
+        select.append(f"    {aggregate.format(filter=filter_sql)} AS q{index}")
+    where_sql = _build_where_clause(_render_conditions(shared, params))
+    return "SELECT\n" + ",\n".join(select) + f"\nFROM {from_clause}\n{where_sql}".rstrip()
+
+
+def build_batch_sql(
+    queries: List[ParsedQuery],
+    use_rollups: bool = False,
+    timezone: str = DEFAULT_TIMEZONE,
+) -> SqlWithParams:
+    """
+    Один запрос на несколько ParsedQuery: одна строка, колонка q<i> —
+    ответ на i-й запрос (как у build_sql с теми же аргументами).
+
+    Запросы по одной таблице сливаются в один SELECT с агрегатами
+    COUNT/SUM ... FILTER (WHERE ...), поэтому video_snapshots и videos
+    читаются не больше чем по одному разу; проходы по двум таблицам
+    соединяются CROSS JOIN. При use_rollups=True запросы, которые
+    build_sql считает по rollup-таблицам или creator_stats, остаются
+    отдельными скалярными подзапросами: они дешевле прохода по таблице.
+    """
+    if not queries:
+        raise ValueError("Empty batch")
+    tz = ZoneInfo(timezone)
+
+    params: Dict[str, Any] = {}
+    subqueries: Dict[int, str] = {}
+    video_columns: List[Tuple[int, str, List[_Condition]]] = []
+    snapshot_columns: List[Tuple[int, str, List[_Condition]]] = []
+    for index, parsed in enumerate(queries):
+        routed = None
+        if use_rollups:
+            routed = _build_from_rollups(parsed, tz) or _build_from_creator_stats(parsed)
+        if routed is not None:
+            sql, routed_params = prefix_params(*routed, prefix=f"q{index}_")
+            subqueries[index] = f"(\n{sql}\n) AS q{index}"
+            params.update(routed_params)
+        elif parsed.entity == "video":
+            video_columns.append((index, *_batch_video_column(parsed, tz)))
+        elif parsed.entity == "snapshot":
+            snapshot_columns.append((index, *_batch_snapshot_column(parsed, tz)))
+        else:
+            raise ValueError(f"Unsupported entity: {parsed.entity!r}")
+
+    passes: List[Tuple[str, str, List[int]]] = []
+    if snapshot_columns:
+        from_clause = "video_snapshots AS s"
+        if any(c.sql.startswith("v.") for _, _, conditions in snapshot_columns for c in conditions):
+            from_clause += " JOIN videos AS v ON v.id = s.video_id"
+        sql = _build_table_pass(snapshot_columns, from_clause, params)
+        passes.append(("snapshot_pass", sql, [index for index, _, _ in snapshot_columns]))
+    if video_columns:
+        sql = _build_table_pass(video_columns, "videos AS v", params)
+        passes.append(("video_pass", sql, [index for index, _, _ in video_columns]))
+
+    if len(passes) == 1 and not subqueries:
+        return passes[0][1], params
+
+    owner = {index: alias for alias, _, indexes in passes for index in indexes}
+    select = ",\n".join(
+        subqueries[index] if index in subqueries else f"{owner[index]}.q{index}"
+        for index in range(len(queries))
+    )
+    if not passes:
+        return f"SELECT\n{select}", params
+    from_sql = "\nCROSS JOIN ".join(f"(\n{sql}\n) AS {alias}" for alias, sql, _ in passes)
+    return f"SELECT\n{select}\nFROM {from_sql}", params
@@ -0,0 +1,95 @@
+"""
+Панель показателей за период (команда /report).
+
+Шесть вопросов, которые аналитики задают про каждый период, собраны в
+список ParsedQuery и считаются одним запросом build_batch_sql: один
+проход по video_snapshots и один по videos вместо шести запросов.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from app.nlp.query_schema import DateRange, ParsedQuery
+from .date_utils import MONTHS_GENITIVE, parse_date_range
+
+
+REPORT_USAGE = (
+    "Использование: /report <период> [id креатора]\n"
+    "Например: /report с 1 по 5 ноября 2025 или /report 2025-11-28 aca1061a9d324ecf8c3fa2bb32d7be63"
+)
+
+_CREATOR_ID_RE = re.compile(r"[0-9a-f]{32}")
+# Слова, которыми может заканчиваться дата: год, «года», «г.», ISO и 28.11.2025.
+_DATE_WORD_RE = re.compile(r"\d{4}|года|г\.?|\d{4}-\d{2}-\d{2}|\d{1,2}\.\d{1,2}\.\d{4}")
+
+
+def _to_date_range(text: str) -> DateRange:
+    start, end = parse_date_range(text)
+    if end < start:
+        raise ValueError(f"Period ends before it starts: {text!r}")
+    return DateRange(start=start.date().isoformat(), end=end.date().isoformat())
+
+
+def _is_date_word(word: str) -> bool:
+    return bool(_DATE_WORD_RE.fullmatch(word)) or word in MONTHS_GENITIVE
+
+
+def parse_report_args(args: Optional[str]) -> Tuple[DateRange, Optional[str]]:
+    """
+    Период и креатор из аргументов команды.
+
+    Креатор — последнее слово, если это id из 32 hex-символов или если
+    оно не может быть частью даты (год, месяц, «года»), а остальное
+    разбирается как период. ValueError — период не разобран.
+    """
+    text = " ".join((args or "").split())
+    if not text:
+        raise ValueError("Empty period")
+
+    head, _, last = text.rpartition(" ")
+    if head and (_CREATOR_ID_RE.fullmatch(last) or not _is_date_word(last.lower())):
+        try:
+            return _to_date_range(head), last
+        except ValueError:
+            pass
+    return _to_date_range(text), None
+
+
+def report_queries(
+    date_range: DateRange,
+    creator_id: Optional[str],
+    min_views: int,
+) -> List[Tuple[str, ParsedQuery]]:
+    """
+    Строки панели: (подпись, запрос). special-режимы по замерам не
+    фильтруются по креатору (как и в build_sql), это видно в подписи.
+    """
+    all_creators = " (все креаторы)" if creator_id is not None else ""
+    return [
+        ("Прирост просмотров", ParsedQuery(
+            metric="sum_views_delta", entity="snapshot", creator_id=creator_id, date_range=date_range,
+        )),
+        ("Замеров статистики", ParsedQuery(
+            metric="videos_count", entity="snapshot", creator_id=creator_id, date_range=date_range,
+        )),
+        ("Замеров с отрицательным приростом просмотров" + all_creators, ParsedQuery(
+            metric="videos_count", entity="snapshot", date_range=date_range,
+            special="snapshots_with_negative_delta_views",
+        )),
+        ("Видео с ростом просмотров" + all_creators, ParsedQuery(
+            metric="videos_count", entity="snapshot", date_range=date_range,
+            special="distinct_videos_with_positive_delta",
+        )),
+        ("Опубликовано видео", ParsedQuery(
+            metric="videos_count", entity="video", creator_id=creator_id, date_range=date_range,
+        )),
+        (f"Креаторов с видео больше {min_views} просмотров", ParsedQuery(
+            metric="videos_count", entity="video", creator_id=creator_id, date_range=date_range,
+            min_views=min_views, special="distinct_creators_with_min_views",
+        )),
+    ]
+
+
+def format_report(date_range: DateRange, creator_id: Optional[str], lines: List[Tuple[str, int]]) -> str:
+    period = date_range.start if date_range.start == date_range.end else f"{date_range.start} — {date_range.end}"
+    title = f"Отчёт за {period}" + (f", креатор {creator_id}" if creator_id else "") + ":"
+    return "\n".join([title] + [f"{label}: {value}" for label, value in lines])
@@ -0,0 +1,85 @@
+"""
+Кэш результатов аналитических запросов.
+
+build_sql детерминирован, поэтому пара (sql, params) однозначно задаёт
+ответ, пока в БД не загружены новые данные. Каждая загрузка увеличивает
+счётчик в таблице data_version; кэш хранит версию, при которой были
+посчитаны значения, и сбрасывается целиком, как только версия меняется.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+
+CacheKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+# Число или, для панели /report (build_batch_sql), кортеж чисел.
+CachedValue = Union[int, Tuple[int, ...]]
+
+
+class ResultCache:
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._data_version: Optional[int] = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, CachedValue]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(sql: str, params: Dict[str, Any]) -> CacheKey:
+        return " ".join(sql.split()), tuple(sorted(params.items()))
+
+    def _sync_version(self, data_version: int) -> None:
+        if data_version != self._data_version:
+            self._entries.clear()
+            self._data_version = data_version
+
+    def get(self, key: CacheKey, data_version: int) -> Optional[CachedValue]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self._sync_version(data_version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: CacheKey, data_version: int, value: CachedValue) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._sync_version(data_version)
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._data_version = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
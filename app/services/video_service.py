@@ -1,15 +1,260 @@
 from __future__ import annotations
 
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
 from sqlalchemy import text
 
-from app.db import get_session
+from app import metrics
+from app.config import settings
+from app.db import get_async_session, get_engine, get_session
+from app.single_flight import SingleFlight
 from app.nlp.query_schema import ParsedQuery
-from .query_builder import build_sql
+from .query_builder import build_batch_sql, build_sql, prefix_params
+from .result_cache import CacheKey, CachedValue, ResultCache
+
+if TYPE_CHECKING:
+    from .columnar import ColumnarStore
+
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_SQL = "SELECT version FROM data_version WHERE id = 1"
+
+result_cache: Optional[ResultCache] = None
+
+# Колоночный исполнитель (QUERY_EXECUTOR=columnar); NumPy импортируется
+# только при его выборе.
+columnar_store: Optional[ColumnarStore] = None
+
+# Одновременные запросы с одинаковыми SQL и параметрами выполняются один раз.
+query_flight = SingleFlight("query")
+
+
+def get_result_cache() -> ResultCache:
+    global result_cache
+    if result_cache is None:
+        result_cache = ResultCache(
+            max_size=settings.result_cache_size,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+        )
+    return result_cache
+
+
+def get_columnar_store() -> ColumnarStore:
+    global columnar_store
+    if columnar_store is None:
+        from .columnar import ColumnarStore
+
+        columnar_store = ColumnarStore(get_engine, refresh_interval=settings.columnar_refresh_seconds)
+    return columnar_store
+
+
+def _build_sql(parsed: ParsedQuery) -> Tuple[str, Dict[str, Any]]:
+    with metrics.BUILD_SQL_LATENCY.time():
+        return build_sql(
+            parsed,
+            use_rollups=settings.query_use_rollups,
+            timezone=settings.reporting_timezone,
+        )
+
+
+def _sql_labels(parsed: ParsedQuery) -> Dict[str, Any]:
+    return {"metric": parsed.metric, "entity": parsed.entity, "special": parsed.special}
+
+
+def _cache_lookup(cache: ResultCache, key: CacheKey, data_version: int) -> Optional[CachedValue]:
+    cached = cache.get(key, data_version)
+    metrics.CACHE_REQUESTS.inc(cache="result", result="miss" if cached is None else "hit")
+    return cached
 
 
 def execute_analytics_query(parsed: ParsedQuery) -> int:
-    sql, params = build_sql(parsed)
+    if settings.query_executor == "columnar":
+        store = get_columnar_store()
+        store.ensure_fresh()
+        return store.execute(parsed, timezone=settings.reporting_timezone)
+
+    sql, params = _build_sql(parsed)
+    key = ResultCache.make_key(sql, params)
+    cache = get_result_cache()
 
     with get_session() as session:
-        result = session.execute(text(sql), params).scalar()
-        return int(result or 0)
+        # Версию читаем до основного запроса: если загрузка завершится
+        # между ними, значение попадёт в кэш под старой версией и будет
+        # сброшено при следующем обращении.
+        data_version = None
+        if cache.enabled:
+            data_version = int(session.execute(text(DATA_VERSION_SQL)).scalar() or 0)
+            cached = _cache_lookup(cache, key, data_version)
+            if cached is not None:
+                return cached
+
+        with metrics.SQL_IN_FLIGHT.track_inprogress(), metrics.SQL_LATENCY.time(**_sql_labels(parsed)):
+            result = session.execute(text(sql), params).scalar()
+        value = int(result or 0)
+
+        if data_version is not None:
+            cache.set(key, data_version, value)
+        return value
+
+
+async def execute_analytics_query_async(parsed: ParsedQuery) -> int:
+    if settings.query_executor == "columnar":
+        store = get_columnar_store()
+        await store.ensure_fresh_async()
+        return store.execute(parsed, timezone=settings.reporting_timezone)
+
+    sql, params = _build_sql(parsed)
+    key = ResultCache.make_key(sql, params)
+    labels = _sql_labels(parsed)
+    return await query_flight.do(key, lambda: _execute_async(sql, params, key, labels))
+
+
+async def _execute_async(sql: str, params: Dict[str, Any], key: CacheKey, labels: Dict[str, Any]) -> int:
+    cache = get_result_cache()
+
+    async with get_async_session() as session:
+        data_version = None
+        if cache.enabled:
+            data_version = int((await session.execute(text(DATA_VERSION_SQL))).scalar() or 0)
+            cached = _cache_lookup(cache, key, data_version)
+            if cached is not None:
+                return cached
+
+        with metrics.SQL_IN_FLIGHT.track_inprogress(), metrics.SQL_LATENCY.time(**labels):
+            result = (await session.execute(text(sql), params)).scalar()
+        value = int(result or 0)
+
+        if data_version is not None:
+            cache.set(key, data_version, value)
+        return value
+
+
+def _batch_sql(statements: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Один SELECT со скалярным подзапросом на каждый запрос: все ответы
+    приходят одной строкой за один обмен с БД. Параметры i-го запроса
+    переименовываются с префиксом q<i>_, чтобы не пересекаться.
+    """
+    columns: List[str] = []
+    params: Dict[str, Any] = {}
+    for index, (sql, query_params) in enumerate(statements):
+        sql, query_params = prefix_params(sql, query_params, prefix=f"q{index}_")
+        columns.append(f"({sql}) AS q{index}")
+        params.update(query_params)
+    return "SELECT\n" + ",\n".join(columns), params
+
+
+def _build_batch(queries: List[ParsedQuery]) -> List[Optional[Tuple[str, Dict[str, Any]]]]:
+    built: List[Optional[Tuple[str, Dict[str, Any]]]] = []
+    for parsed in queries:
+        try:
+            built.append(_build_sql(parsed))
+        except ValueError:
+            logger.warning("Unsupported query in batch: %s", parsed.model_dump(exclude_none=True))
+            built.append(None)
+    return built
+
+
+async def execute_analytics_queries_async(queries: List[ParsedQuery]) -> List[Optional[int]]:
+    """
+    Ответы на несколько вопросов одного сообщения.
+
+    Запросы, которых нет в кэше результатов, выполняются одним SELECT
+    (по подзапросу на запрос, одинаковые — один раз), так что десять
+    вопросов стоят одного обмена с БД. None — запрос, который не
+    поддерживает build_sql (ValueError), остальные при этом считаются.
+    """
+    if settings.query_executor == "columnar":
+        store = get_columnar_store()
+        await store.ensure_fresh_async()
+        values: List[Optional[int]] = []
+        for parsed in queries:
+            try:
+                values.append(store.execute(parsed, timezone=settings.reporting_timezone))
+            except ValueError:
+                logger.warning("Unsupported query in batch: %s", parsed.model_dump(exclude_none=True))
+                values.append(None)
+        return values
+
+    if not queries:
+        return []
+
+    built = _build_batch(queries)
+    values = [None] * len(queries)
+    cache = get_result_cache()
+
+    async with get_async_session() as session:
+        data_version = None
+        if cache.enabled:
+            data_version = int((await session.execute(text(DATA_VERSION_SQL))).scalar() or 0)
+
+        # Ключ кэша -> номера запросов с этим ключом.
+        pending: Dict[CacheKey, List[int]] = {}
+        for index, statement in enumerate(built):
+            if statement is None:
+                continue
+            key = ResultCache.make_key(*statement)
+            if key not in pending and data_version is not None:
+                cached = _cache_lookup(cache, key, data_version)
+                if cached is not None:
+                    values[index] = cached
+                    continue
+            pending.setdefault(key, []).append(index)
+
+        if not pending:
+            return values
+
+        sql, params = _batch_sql([built[indexes[0]] for indexes in pending.values()])
+        with metrics.SQL_IN_FLIGHT.track_inprogress(), metrics.SQL_LATENCY.time(
+            metric="batch", entity=None, special=None
+        ):
+            row = (await session.execute(text(sql), params)).one()
+
+        for column, (key, indexes) in enumerate(pending.items()):
+            value = int(row[column] or 0)
+            for index in indexes:
+                values[index] = value
+            if data_version is not None:
+                cache.set(key, data_version, value)
+        return values
+
+
+async def execute_batch_query_async(queries: List[ParsedQuery]) -> List[int]:
+    """
+    Ответы на запросы панели (/report) одним запросом build_batch_sql:
+    по одному проходу по каждой таблице, агрегаты с FILTER. Ответ
+    целиком кэшируется в кэше результатов, как обычный запрос.
+    """
+    if settings.query_executor == "columnar":
+        store = get_columnar_store()
+        await store.ensure_fresh_async()
+        return [store.execute(parsed, timezone=settings.reporting_timezone) for parsed in queries]
+
+    with metrics.BUILD_SQL_LATENCY.time():
+        sql, params = build_batch_sql(
+            queries,
+            use_rollups=settings.query_use_rollups,
+            timezone=settings.reporting_timezone,
+        )
+    key = ResultCache.make_key(sql, params)
+    cache = get_result_cache()
+
+    async with get_async_session() as session:
+        data_version = None
+        if cache.enabled:
+            data_version = int((await session.execute(text(DATA_VERSION_SQL))).scalar() or 0)
+            cached = _cache_lookup(cache, key, data_version)
+            if cached is not None:
+                return list(cached)
+
+        with metrics.SQL_IN_FLIGHT.track_inprogress(), metrics.SQL_LATENCY.time(
+            metric="report", entity=None, special=None
+        ):
+            row = (await session.execute(text(sql), params)).one()
+        values = [int(row[index] or 0) for index in range(len(queries))]
+
+        if data_version is not None:
+            cache.set(key, data_version, tuple(values))
+        return values
@@ -0,0 +1,69 @@
+"""
+Объединение одинаковых одновременных запросов (single-flight).
+
+Когда ссылку на отчёт разошлют в чат, десятки пользователей за секунды
+задают один и тот же вопрос. Вместо десятков одинаковых вызовов LLM и
+запросов к БД первый вызов с данным ключом выполняется, а остальные
+ждут его результат (или исключение).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from app import metrics
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Выполняет не больше одного вызова на ключ одновременно.
+
+    Работа идёт в отдельной задаче, которую ждут все вызвавшие через
+    asyncio.shield: отмена одного ожидающего (например, первого) не
+    отменяет вызов для остальных.
+
+    Если задано имя, каждый вызов do считается в
+    bot_single_flight_requests_total{flight=name} как leader (выполнил
+    func) или coalesced (дождался чужого вызова).
+    """
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            result = "coalesced"
+        else:
+            self._calls += 1
+            result = "leader"
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        if self.name is not None:
+            metrics.SINGLE_FLIGHT.inc(flight=self.name, result=result)
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Если все ожидающие отменены, исключение задачи никто не заберёт.
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the video analytics bot.
+
+Each module is runnable with ``python -m benchmarks.<name> --help``.
+"""
@@ -0,0 +1,133 @@
+"""
+Cold start of the bot process: import time and time to the first answer.
+
+Each run starts a fresh interpreter that imports app.main, builds the
+Dispatcher with the real handlers and middleware and feeds it Telegram
+updates through a recording Bot session. The LLM and the database are
+replaced by in-process fakes (benchmarks.fakes), so the numbers show
+the cost of our own start-up path, not of the network.
+
+Two messages are timed: one the rule parser answers and one that goes
+to the (fake) LLM. With --real-sdk the LLM message also pays for
+importing google.generativeai, as it does in production.
+
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --max-import-ms 6000 --max-first-message-ms 500
+
+Exits with status 1 if a median exceeds a given budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+FAKE_ENV = {
+    "TELEGRAM_BOT_TOKEN": "42:FAKE-TOKEN",
+    "DATABASE_URL": "postgresql+psycopg2://bench@localhost/bench",
+    "LLM_API_KEY": "bench",
+}
+
+
+def _child(real_sdk: bool) -> None:
+    started = time.perf_counter()
+    import app.main  # noqa: F401
+
+    import_seconds = time.perf_counter() - started
+
+    import asyncio
+
+    from aiogram import Dispatcher
+
+    from app.bot import register_handlers
+    from benchmarks import fakes
+
+    async def run() -> dict:
+        if real_sdk:
+            from app.nlp import llm_client
+
+            fake = fakes.FakeGenai()
+            import_sdk = llm_client._get_genai
+
+            def _get_genai():
+                genai = import_sdk()
+                genai.GenerativeModel = fake.GenerativeModel
+                return genai
+
+            llm_client._get_genai = _get_genai
+        else:
+            fakes.install_fake_llm()
+        fakes.install_fake_db(value=42)
+
+        session = fakes.RecordingSession()
+        bot = fakes.make_bot(session)
+        dp = Dispatcher()
+        register_handlers(dp)
+
+        timings = {}
+        for update_id, (name, text) in enumerate(
+            [
+                ("first_message_rules_ms", "Сколько всего видео есть в системе?"),
+                ("first_message_llm_ms", "Какая у нас статистика по видео?"),
+            ],
+            start=1,
+        ):
+            t = time.perf_counter()
+            await dp.feed_update(bot, fakes.make_update(update_id, text))
+            timings[name] = (time.perf_counter() - t) * 1000
+            assert session.replies and session.replies[-1][1] == "42", session.replies
+        return timings
+
+    result = {"import_ms": import_seconds * 1000}
+    result.update(asyncio.run(run()))
+    result["total_ms"] = (time.perf_counter() - started) * 1000
+    print(json.dumps(result))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--real-sdk", action="store_true", help="import google.generativeai on the LLM message")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-message-ms", type=float, help="budget for the rule-parsed first message")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.real_sdk)
+        return
+
+    env = dict(os.environ, **{k: os.environ.get(k, v) for k, v in FAKE_ENV.items()})
+    command = [sys.executable, "-m", "benchmarks.cold_start", "--child"]
+    if args.real_sdk:
+        command.append("--real-sdk")
+
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run(command, cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    for key, value in medians.items():
+        print(f"{key:<24} {value:8.1f}")
+
+    failed = False
+    if args.max_import_ms is not None and medians["import_ms"] > args.max_import_ms:
+        print(f"import_ms over budget: {medians['import_ms']:.1f} > {args.max_import_ms}")
+        failed = True
+    if args.max_first_message_ms is not None and medians["first_message_rules_ms"] > args.max_first_message_ms:
+        print(f"first_message_rules_ms over budget: {medians['first_message_rules_ms']:.1f} > {args.max_first_message_ms}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Fast date parser vs dateparser on typical phrasings.
+
+Times every phrasing of the corpus through the regex fast path (memo
+disabled), through dateparser.parse and through parse_date_string with a
+warm LRU memo, and measures how long importing dateparser takes in a
+fresh interpreter.
+
+    python -m benchmarks.date_parsing --repeat 200
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date
+from typing import Callable, List
+
+
+CORPUS = [
+    "2025-11-28",
+    "2025-11-28T10:00:00+00:00",
+    "28.11.2025",
+    "28 ноября 2025",
+    "28 ноября 2025 года",
+    "1 декабря 2025 г.",
+    "5 ноября",
+    "27 ноября 2025",
+    "3 мая 2024",
+    "31 декабря 2025",
+]
+RANGE_CORPUS = [
+    "с 1 по 5 ноября 2025",
+    "с 28 ноября по 2 декабря 2025",
+    "с 1 ноября 2025 по 5 ноября 2025",
+]
+
+
+def _same(a, b) -> bool:
+    # dateparser returns its own tzinfo class, so compare ISO strings.
+    return a is not None and b is not None and a.isoformat() == b.isoformat()
+
+
+def _time_per_call(func: Callable[[str], object], corpus: List[str], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        for value in corpus:
+            started = time.perf_counter()
+            func(value)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(name: str, seconds: List[float]) -> None:
+    micros = sorted(s * 1e6 for s in seconds)
+    p95 = micros[min(len(micros) - 1, int(0.95 * len(micros)))]
+    print(f"{name:<22} mean={statistics.fmean(micros):9.1f}us p50={micros[len(micros) // 2]:9.1f}us p95={p95:9.1f}us")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    import_seconds = float(subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import dateparser; print(time.perf_counter() - t)"],
+        check=True, capture_output=True, text=True,
+    ).stdout)
+    print(f"import dateparser: {import_seconds * 1000:.0f}ms")
+
+    from app.services import date_utils
+
+    today = date.today()
+    mismatches = [
+        value for value in CORPUS
+        if not _same(date_utils._fast_parse(date_utils._normalize(value), today), date_utils._parse_with_dateparser(value))
+    ]
+    print(f"fast path agrees with dateparser on {len(CORPUS) - len(mismatches)}/{len(CORPUS)} phrasings")
+    for value in mismatches:
+        print(f"  mismatch: {value!r}")
+
+    _report("fast (no memo)", _time_per_call(
+        lambda v: date_utils._fast_parse(date_utils._normalize(v), today), CORPUS, args.repeat))
+    _report("dateparser", _time_per_call(date_utils._parse_with_dateparser, CORPUS, max(1, args.repeat // 10)))
+    date_utils._parse_cached.cache_clear()
+    _report("parse_date_string", _time_per_call(date_utils.parse_date_string, CORPUS, args.repeat))
+    _report("parse_date_range", _time_per_call(date_utils.parse_date_range, RANGE_CORPUS, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Fakes for driving the bot without Telegram, Gemini or Postgres.
+
+RecordingSession is an aiogram session that records outgoing messages
+instead of calling the Bot API; install_fake_llm / install_fake_db
+replace the Gemini SDK and the async DB session with in-process stubs
+with configurable latency. Used by the start-up and load benchmarks.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update, User
+
+
+FAKE_BOT_TOKEN = "42:FAKE-TOKEN"
+
+DEFAULT_LLM_ANSWER: Dict[str, Any] = {
+    "metric": "videos_count",
+    "entity": "video",
+    "creator_id": None,
+    "min_views": None,
+    "date_range": None,
+    "time_from": None,
+    "time_to": None,
+    "special": None,
+}
+
+
+class RecordingSession(BaseSession):
+    """Сессия aiogram, которая запоминает ответы бота вместо отправки в Telegram."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.replies: List[Tuple[int, str]] = []
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        if isinstance(method, SendMessage):
+            self.replies.append((int(method.chat_id), method.text))
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=int(method.chat_id), type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+        yield b""  # pragma: no cover
+
+
+_dispatcher = None
+
+
+def shared_dispatcher():
+    """
+    Dispatcher приложения (app.main.build_dispatcher), один на процесс:
+    роутер хендлеров можно подключить только к одному Dispatcher.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        from app.main import build_dispatcher
+
+        _dispatcher = build_dispatcher()
+    return _dispatcher
+
+
+def make_bot(session: Optional[RecordingSession] = None) -> Bot:
+    return Bot(FAKE_BOT_TOKEN, session=session or RecordingSession())
+
+
+def make_update(update_id: int, text: str, user_id: int = 1000) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="Bench"),
+            text=text,
+        ),
+    )
+
+
+class _FakeUsage:
+    prompt_token_count = 0
+    cached_content_token_count = 0
+    candidates_token_count = 0
+
+
+class _FakeResponse:
+    usage_metadata = _FakeUsage()
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+_QUESTION_RE = re.compile(r'Now the real user question in Russian is:\n\n"(.*)"\n\n', re.DOTALL)
+_BATCH_QUESTIONS_RE = re.compile(r"Now the real user questions in Russian are:\n\n(.*?)\n\nReturn", re.DOTALL)
+_BATCH_ITEM_RE = re.compile(r'^\d+\. "(.*)"$', re.MULTILINE)
+
+
+class FakeGenai:
+    """
+    Заменяет модуль google.generativeai: отвечает JSON через latency секунд.
+
+    Ответ берётся из answers по вопросу из промпта (app.nlp.prompt_builder),
+    для остальных вопросов — answer; на промпт с несколькими вопросами
+    (build_batch_prompt) — JSON-массив таких ответов.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        answer: Optional[Dict[str, Any]] = None,
+        answers: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        self.latency = latency
+        self.answer = json.dumps(answer or DEFAULT_LLM_ANSWER)
+        self.answers = {question: json.dumps(value) for question, value in (answers or {}).items()}
+        self.calls = 0
+        fake = self
+
+        class GenerativeModel:
+            def __init__(self, name: str, system_instruction: Optional[str] = None) -> None:
+                self.name = name
+
+            def generate_content(self, prompt: str) -> _FakeResponse:
+                fake.calls += 1
+                time.sleep(fake.latency)
+                return _FakeResponse(fake.respond(prompt))
+
+            async def generate_content_async(self, prompt: str) -> _FakeResponse:
+                fake.calls += 1
+                await asyncio.sleep(fake.latency)
+                return _FakeResponse(fake.respond(prompt))
+
+        self.GenerativeModel = GenerativeModel
+
+    def respond(self, prompt: str) -> str:
+        batch = _BATCH_QUESTIONS_RE.search(prompt)
+        if batch:
+            questions = _BATCH_ITEM_RE.findall(batch.group(1))
+            return "[" + ",".join(self.answers.get(question, self.answer) for question in questions) + "]"
+        if self.answers:
+            m = _QUESTION_RE.search(prompt)
+            if m and m.group(1) in self.answers:
+                return self.answers[m.group(1)]
+        return self.answer
+
+
+def install_fake_llm(latency: float = 0.0, answer: Optional[Dict[str, Any]] = None) -> FakeGenai:
+    from app.nlp import llm_client
+
+    fake = FakeGenai(latency=latency, answer=answer)
+    llm_client.genai = fake
+    llm_client._model = None
+    return fake
+
+
+class _FakeRow:
+    """Строка объединённого запроса: value в любой колонке."""
+
+    def __init__(self, value: int) -> None:
+        self._value = value
+
+    def __getitem__(self, index: int) -> int:
+        return self._value
+
+
+class _FakeResult:
+    def __init__(self, value: int) -> None:
+        self._value = value
+
+    def scalar(self) -> int:
+        return self._value
+
+    def one(self) -> _FakeRow:
+        return _FakeRow(self._value)
+
+
+class _FakeAsyncSession:
+    def __init__(
+        self,
+        value: int,
+        latency: float,
+        executed: Optional[List[str]] = None,
+        gate: Optional[asyncio.Event] = None,
+    ) -> None:
+        self._value = value
+        self._latency = latency
+        self._executed = executed
+        self._gate = gate
+
+    async def execute(self, statement: Any, params: Any = None) -> _FakeResult:
+        if self._executed is not None:
+            self._executed.append(str(statement))
+        if self._gate is not None:
+            await self._gate.wait()
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return _FakeResult(self._value)
+
+
+def fake_async_session(
+    value: int = 42,
+    latency: float = 0.0,
+    executed: Optional[List[str]] = None,
+    gate: Optional[asyncio.Event] = None,
+):
+    """
+    Замена app.db.get_async_session: любой запрос возвращает value через
+    latency секунд; текст запросов дописывается в executed, если он задан.
+    С gate запрос сначала ждёт, пока событие не будет установлено.
+    """
+
+    @asynccontextmanager
+    async def _session():
+        yield _FakeAsyncSession(value, latency, executed, gate)
+
+    return _session
+
+
+def install_fake_db(value: int = 42, latency: float = 0.0) -> None:
+    from app.services import video_service
+
+    video_service.get_async_session = fake_async_session(value, latency)
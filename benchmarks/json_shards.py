@@ -0,0 +1,68 @@
+"""
+Parse time of one export split into shards, without the database.
+
+Every shard is parsed in its own worker process, as load_json --shards
+does. "index" is the old scheme, where each worker parses the whole file
+and keeps every N-th video; "bytes" is iter_videos_shard, where each
+worker parses only its own byte range. Parse time is CPU time of the
+worker, so it does not depend on how many cores the machine has.
+
+    python -m benchmarks.json_shards --videos 20000 --shards 1,2,4,8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Tuple
+
+from app.scripts.json_stream import iter_videos, iter_videos_shard
+from benchmarks.json_stream_memory import write_synthetic_export
+
+
+def _parse_shard(task: Tuple[str, str, int, int]) -> Tuple[int, float]:
+    scheme, path, index, count = task
+    started = time.process_time()
+    if scheme == "index":
+        videos = sum(1 for position, _ in enumerate(iter_videos(path)) if position % count == index)
+    else:
+        videos = sum(1 for _ in iter_videos_shard(path, index, count))
+    return videos, time.process_time() - started
+
+
+def _run(scheme: str, path: Path, shards: int) -> None:
+    tasks = [(scheme, str(path), index, shards) for index in range(shards)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        results = list(pool.map(_parse_shard, tasks))
+    wall = time.perf_counter() - started
+    videos = sum(count for count, _ in results)
+    parse = [seconds for _, seconds in results]
+    print(
+        f"{scheme:>5} x{shards:<2}: {videos} videos, wall {wall:.2f} s, "
+        f"parse CPU per shard max {max(parse):.2f} s, total {sum(parse):.2f} s"
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--snapshots", type=int, default=100, help="snapshots per video")
+    parser.add_argument("--shards", default="1,2,4,8", help="comma-separated shard counts")
+    parser.add_argument("--path", default="/tmp/synthetic_shards.json")
+    args = parser.parse_args(argv)
+
+    path = Path(args.path)
+    if not path.is_file():
+        write_synthetic_export(path, args.videos, args.snapshots)
+    print(f"File: {path} ({os.path.getsize(path) / 2**20:.0f} MiB), {os.cpu_count()} CPUs")
+
+    for shards in (int(value) for value in args.shards.split(",")):
+        for scheme in ("index", "bytes"):
+            _run(scheme, path, shards)
+
+
+if __name__ == "__main__":
+    main()
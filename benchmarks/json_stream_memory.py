@@ -0,0 +1,128 @@
+"""
+Peak RSS of the streaming JSON reader vs json.load.
+
+Writes a synthetic export of the requested size (the writer itself is
+streaming, so the file can be much larger than RAM) and then reads it in
+a child process, reporting the child's peak resident set size.
+
+    python -m benchmarks.json_stream_memory --videos 200000 --snapshots 100
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+def write_synthetic_export(path: Path, videos: int, snapshots: int) -> None:
+    base = datetime(2025, 11, 1, tzinfo=timezone.utc)
+    with path.open("w", encoding="utf-8") as f:
+        f.write('{"videos": [')
+        for i in range(videos):
+            created = base + timedelta(minutes=i)
+            views = 0
+            snaps = []
+            for j in range(snapshots):
+                delta = (i * 7 + j * 13) % 101 - 5
+                views += delta
+                ts = (created + timedelta(hours=j + 1)).isoformat()
+                snaps.append({
+                    "id": f"{i:016x}{j:016x}",
+                    "video_id": f"{i:032x}",
+                    "views_count": views,
+                    "likes_count": views // 10,
+                    "comments_count": views // 100,
+                    "reports_count": 0,
+                    "delta_views_count": delta,
+                    "delta_likes_count": delta // 10,
+                    "delta_comments_count": 0,
+                    "delta_reports_count": 0,
+                    "created_at": ts,
+                    "updated_at": ts,
+                })
+            video = {
+                "id": f"{i:032x}",
+                "creator_id": f"{i % 1000:032x}",
+                "video_created_at": created.isoformat(),
+                "views_count": views,
+                "likes_count": views // 10,
+                "comments_count": views // 100,
+                "reports_count": 0,
+                "created_at": created.isoformat(),
+                "updated_at": created.isoformat(),
+                "snapshots": snaps,
+            }
+            if i:
+                f.write(",")
+            f.write(json.dumps(video))
+        f.write("]}")
+
+
+def _measure(reader: str, path: str) -> None:
+    started = time.perf_counter()
+    videos = snapshots = 0
+    if reader == "stream":
+        from app.scripts.json_stream import iter_videos
+
+        for video in iter_videos(path):
+            videos += 1
+            snapshots += len(video.get("snapshots", []))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for video in json.load(f)["videos"]:
+                videos += 1
+                snapshots += len(video.get("snapshots", []))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"videos": videos, "snapshots": snapshots, "seconds": round(elapsed, 2)}))
+
+
+def _run_child(reader: str, path: Path) -> None:
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.json_stream_memory", "--measure", reader, str(path)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    result = json.loads(out)
+    note = "" if peak_kb > before else " (peak RSS not above a previous child)"
+    print(
+        f"{reader:>9}: {result['videos']} videos, {result['snapshots']} snapshots, "
+        f"{result['seconds']} s, peak RSS {peak_kb / 1024:.0f} MiB{note}"
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--snapshots", type=int, default=100, help="snapshots per video")
+    parser.add_argument("--path", default="/tmp/synthetic_videos.json")
+    parser.add_argument("--with-json-load", action="store_true", help="also measure json.load (needs RAM)")
+    parser.add_argument("--measure", nargs=2, metavar=("READER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        _measure(*args.measure)
+        return
+
+    path = Path(args.path)
+    if not path.is_file():
+        write_synthetic_export(path, args.videos, args.snapshots)
+    print(f"File: {path} ({os.path.getsize(path) / 2**30:.2f} GiB)")
+
+    # json.load измеряем вторым: ru_maxrss у RUSAGE_CHILDREN — максимум
+    # по всем дочерним процессам, а потоковое чтение заведомо легче.
+    _run_child("stream", path)
+    if args.with_json_load:
+        _run_child("json.load", path)
+
+
+if __name__ == "__main__":
+    main()
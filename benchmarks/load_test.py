@@ -0,0 +1,244 @@
+"""
+End-to-end load test of the message path without Telegram or Gemini.
+
+Replays a question corpus (tests/data/questions.json by default) at a
+target rate through the real Dispatcher with the production middleware
+(logging, admission control) and handle_any_message. Telegram is a
+recording Bot session, the LLM is benchmarks.fakes.FakeGenai answering
+the corpus' reference JSON after --llm-latency, and the database is an
+in-process fake with --db-latency (or the real DATABASE_URL with
+--real-db).
+
+Arrivals are open-loop: message i is sent at i / rate seconds whether
+or not earlier ones have finished, as Telegram delivers them. Latency is
+measured from the scheduled arrival to the end of handling (the reply is
+sent inside it). A probe task measures event-loop lag: anything that
+blocks the loop (synchronous I/O, heavy CPU in a handler) shows up as
+lag far above the probe interval.
+
+    python -m benchmarks.load_test --rate 200 --duration 10
+    python -m benchmarks.load_test --rate 50 --llm-latency 1.5 --no-rules --no-cache
+    python -m benchmarks.load_test --max-p95-ms 200 --max-loop-lag-ms 50 --max-error-rate 0.01
+
+Exits with status 1 if a given budget is exceeded.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[1] / "tests" / "data" / "questions.json"
+LAG_PROBE_INTERVAL = 0.01
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_corpus(path: Path, include_unsupported: bool = False) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """(question, reference LLM answer); unsupported questions have no answer."""
+    items = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        (item["question"], item.get("llm"))
+        for item in items
+        if include_unsupported or item.get("llm") is not None
+    ]
+
+
+def _classify(text: str) -> str:
+    from app.bot.handlers import ERROR_REPLY
+    from app.bot.middleware import OVERLOADED_REPLY, RATE_LIMITED_REPLY
+
+    if text == ERROR_REPLY:
+        return "error"
+    if text == OVERLOADED_REPLY:
+        return "shed"
+    if text == RATE_LIMITED_REPLY:
+        return "rate_limited"
+    return "ok"
+
+
+async def _probe_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_PROBE_INTERVAL
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(
+    corpus: List[Tuple[str, Optional[Dict[str, Any]]]],
+    rate: float,
+    duration: float,
+    users: int = 1000,
+    llm_latency: float = 0.5,
+    db_latency: float = 0.005,
+    real_db: bool = False,
+) -> Dict[str, Any]:
+    """Replays the corpus for duration seconds at rate messages/s and returns the report."""
+    from app.nlp import llm_client
+    from app.services import video_service
+    from benchmarks import fakes
+
+    fake_llm = fakes.FakeGenai(
+        latency=llm_latency,
+        answers={question: answer for question, answer in corpus if answer is not None},
+    )
+    llm_client.genai = fake_llm
+    llm_client._model = None
+    if not real_db:
+        video_service.get_async_session = fakes.fake_async_session(value=42, latency=db_latency)
+
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+    dp = fakes.shared_dispatcher()
+
+    total = max(1, int(rate * duration))
+    latencies: List[float] = []
+    failures = 0
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(stop, lags))
+
+    async def _send(index: int, scheduled: float) -> None:
+        nonlocal failures
+        question = corpus[index % len(corpus)][0]
+        update = fakes.make_update(index + 1, question, user_id=1 + index % users)
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - scheduled)
+
+    started = time.perf_counter()
+    tasks = []
+    for index in range(total):
+        scheduled = started + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(index, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+
+    outcomes: Dict[str, int] = {}
+    for _, text in session.replies:
+        kind = _classify(text)
+        outcomes[kind] = outcomes.get(kind, 0) + 1
+    outcomes["exception"] = failures
+    outcomes["no_reply"] = max(0, total - len(session.replies) - failures)
+    errors = outcomes.get("error", 0) + failures + outcomes["no_reply"]
+
+    ms = [value * 1000 for value in latencies]
+    lag_ms = [value * 1000 for value in lags]
+    return {
+        "messages": total,
+        "target_rate": rate,
+        "seconds": round(elapsed, 3),
+        "throughput": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "outcomes": outcomes,
+        "error_rate": round(errors / total, 4),
+        "latency_ms": {
+            "p50": round(_percentile(ms, 50), 2),
+            "p95": round(_percentile(ms, 95), 2),
+            "p99": round(_percentile(ms, 99), 2),
+            "max": round(max(ms, default=0.0), 2),
+            "mean": round(statistics.fmean(ms), 2) if ms else 0.0,
+        },
+        "loop_lag_ms": {
+            "p99": round(_percentile(lag_ms, 99), 2),
+            "max": round(max(lag_ms, default=0.0), 2),
+        },
+        "llm_calls": fake_llm.calls,
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_ms"]
+    print(
+        f"{report['messages']} messages in {report['seconds']} s: {report['throughput']} msg/s "
+        f"(target {report['target_rate']})"
+    )
+    print(f"outcomes: {report['outcomes']}, error rate {report['error_rate']:.2%}, LLM calls {report['llm_calls']}")
+    print(
+        f"latency: p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms max={latency['max']}ms"
+    )
+    print(f"event loop lag: p99={report['loop_lag_ms']['p99']}ms max={report['loop_lag_ms']['max']}ms")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--include-unsupported", action="store_true",
+                        help="also replay questions without a reference answer (the fake LLM gives them a default query)")
+    parser.add_argument("--rate", type=float, default=100.0, help="messages per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--users", type=int, default=1000, help="distinct Telegram users sending the messages")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--real-db", action="store_true", help="query DATABASE_URL instead of the fake DB")
+    parser.add_argument("--no-rules", action="store_true", help="send every question to the (fake) LLM")
+    parser.add_argument("--no-cache", action="store_true", help="disable the query and result caches")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--max-loop-lag-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.config import settings
+
+    if args.no_rules:
+        settings.rule_parser_min_confidence = 2.0
+    if args.no_cache:
+        settings.query_cache_size = 0
+        settings.result_cache_size = 0
+
+    corpus = load_corpus(args.corpus, args.include_unsupported)
+    report = asyncio.run(run_load(
+        corpus,
+        rate=args.rate,
+        duration=args.duration,
+        users=args.users,
+        llm_latency=args.llm_latency,
+        db_latency=args.db_latency,
+        real_db=args.real_db,
+    ))
+    _print_report(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    over_budget = [
+        name
+        for name, budget, value in [
+            ("p95 latency", args.max_p95_ms, report["latency_ms"]["p95"]),
+            ("event loop lag", args.max_loop_lag_ms, report["loop_lag_ms"]["max"]),
+            ("error rate", args.max_error_rate, report["error_rate"]),
+        ]
+        if budget is not None and value > budget
+    ]
+    if over_budget:
+        print("Over budget: " + ", ".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cost of a message with several questions vs the same questions one by one.
+
+Takes --questions questions from the corpus (tests/data/questions.json by
+default) and sends them through the real Dispatcher twice: as separate
+messages, each answered before the next is sent, and as one message with
+a question per line. The LLM and the database are the fakes from
+benchmarks.fakes with --llm-latency / --db-latency; the rule parser and
+both caches are disabled, so every question goes to the (fake) LLM and
+every query to the (fake) database. Reports wall time, LLM requests and
+DB statements for both ways.
+
+    python -m benchmarks.multi_question --questions 10 --llm-latency 1.0 --db-latency 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.load_test import DEFAULT_CORPUS, load_corpus
+
+
+async def _run(questions: List[str], answers: Dict[str, Any], llm_latency: float, db_latency: float) -> Dict[str, Any]:
+    from app.nlp import llm_client
+    from app.services import video_service
+    from benchmarks import fakes
+
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+    dp = fakes.shared_dispatcher()
+    report: Dict[str, Any] = {}
+
+    for way, messages in (("separate", questions), ("one_message", ["\n".join(questions)])):
+        fake_llm = fakes.FakeGenai(latency=llm_latency, answers=answers)
+        llm_client.genai = fake_llm
+        llm_client._model = None
+        executed: List[str] = []
+        video_service.get_async_session = fakes.fake_async_session(latency=db_latency, executed=executed)
+
+        started = time.perf_counter()
+        for index, text in enumerate(messages, start=1):
+            # Разные пользователи: ограничение частоты сообщений здесь ни при чём.
+            await dp.feed_update(bot, fakes.make_update(index, text, user_id=len(report) * len(questions) + index))
+        report[way] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "llm_calls": fake_llm.calls,
+            "db_statements": len(executed),
+            "last_reply": session.replies[-1][1],
+        }
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.config import settings
+
+    settings.rule_parser_min_confidence = 2.0
+    settings.query_cache_size = 0
+    settings.result_cache_size = 0
+
+    corpus = load_corpus(args.corpus)
+    questions = [question for question, _ in corpus[:args.questions]]
+    report = asyncio.run(_run(questions, dict(corpus), args.llm_latency, args.db_latency))
+
+    for way, result in report.items():
+        print(f"{way:<12} {result['seconds']:7.3f} s, LLM requests {result['llm_calls']}, "
+              f"DB statements {result['db_statements']}")
+    print("\nReply to the one message:\n" + report["one_message"]["last_reply"])
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
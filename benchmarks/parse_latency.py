@@ -0,0 +1,112 @@
+"""
+Parse latency of the rule-based parser and its agreement with the LLM.
+
+Runs every question of the corpus (tests/data/questions.json by default)
+through app.nlp.rule_parser and reports per-question latency, the share
+of questions answered without the LLM and how many of those answers
+match the recorded LLM reference.
+
+With --llm the same questions are also sent to the live model (rule
+parser and template cache bypassed) to measure its latency and compare
+the rule answers against fresh LLM output.
+
+    python -m benchmarks.parse_latency --repeat 1000
+    python -m benchmarks.parse_latency --llm
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[1] / "tests" / "data" / "questions.json"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(name: str, seconds: List[float]) -> None:
+    micros = [s * 1e6 for s in seconds]
+    print(
+        f"{name}: n={len(micros)} mean={statistics.fmean(micros):.1f}us "
+        f"p50={_percentile(micros, 50):.1f}us p95={_percentile(micros, 95):.1f}us "
+        f"max={max(micros):.1f}us"
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus for timing")
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--llm", action="store_true", help="also query the live LLM")
+    args = parser.parse_args(argv)
+
+    from app.nlp.query_schema import ParsedQuery
+    from app.nlp.rule_parser import parse_with_rules
+
+    corpus = json.loads(args.corpus.read_text(encoding="utf-8"))
+    questions = [item["question"] for item in corpus]
+
+    timings: List[float] = []
+    for _ in range(args.repeat):
+        for question in questions:
+            started = time.perf_counter()
+            parse_with_rules(question)
+            timings.append(time.perf_counter() - started)
+    _report("rules", timings)
+
+    answered = agreed = 0
+    rule_answers = {}
+    for item in corpus:
+        result = parse_with_rules(item["question"])
+        if result.confidence < args.min_confidence:
+            continue
+        answered += 1
+        rule_answers[item["question"]] = result.parsed
+        if item["llm"] is not None and ParsedQuery.model_validate(item["llm"]) == result.parsed:
+            agreed += 1
+    print(f"answered without LLM: {answered}/{len(corpus)} ({answered / len(corpus):.0%})")
+    print(f"agreement with recorded LLM answers: {agreed}/{answered}")
+
+    if not args.llm:
+        return
+
+    from app.nlp import llm_client
+    from app.nlp.query_cache import TemplateQueryCache
+
+    llm_client.settings.rule_parser_min_confidence = float("inf")
+    llm_client.query_cache = TemplateQueryCache(max_size=0)
+
+    llm_timings: List[float] = []
+    live_agreed = 0
+    for question in questions:
+        started = time.perf_counter()
+        try:
+            live = llm_client.parse_user_query(question)
+        except Exception as exc:  # noqa: BLE001
+            print(f"LLM error for {question!r}: {exc}")
+            continue
+        finally:
+            llm_timings.append(time.perf_counter() - started)
+        expected = rule_answers.get(question)
+        if expected is None:
+            continue
+        if live == expected:
+            live_agreed += 1
+        else:
+            print(f"disagree: {question!r}\n  rules: {expected.model_dump(exclude_none=True)}"
+                  f"\n  llm:   {live.model_dump(exclude_none=True)}")
+    _report("llm", llm_timings)
+    print(f"agreement with live LLM: {live_agreed}/{len(rule_answers)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Range queries on partitioned vs unpartitioned video_snapshots.
+
+Needs a database with migration 005 applied and data loaded. The
+"unpartitioned" layout is a plain copy of video_snapshots with the same
+indexes in a scratch schema (--schema) that shadows the partitioned table
+through search_path, so both layouts answer the same build_sql queries
+over the same rows. For every snapshot shape (raw SQL, no rollups) the
+report has p50/p95 per layout and the number of partitions the plan
+reads, i.e. whether the date filter was pruned.
+
+    python -m benchmarks.partition_pruning --output results/partitions.json
+    python -m benchmarks.partition_pruning --keep   # reuse the copy next time
+
+Uses DATABASE_URL unless --database-url is given.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, make_url
+
+from app.nlp.query_schema import DateRange, ParsedQuery
+from app.services.query_builder import build_sql
+from benchmarks.sql_shapes import _data_anchors, _name, _percentile, _time_calls, iter_shapes
+
+
+LAYOUTS = ("unpartitioned", "partitioned")
+
+
+def _is_partitioned(conn: Connection) -> bool:
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.video_snapshots'::regclass)"
+    )).scalar())
+
+
+def _create_copy(conn: Connection, schema: str) -> None:
+    started = time.perf_counter()
+    conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    conn.exec_driver_sql(f"CREATE TABLE {schema}.video_snapshots AS TABLE public.video_snapshots")
+    conn.exec_driver_sql(f"ALTER TABLE {schema}.video_snapshots ADD PRIMARY KEY (id)")
+    conn.exec_driver_sql(f"CREATE INDEX ON {schema}.video_snapshots (created_at)")
+    conn.exec_driver_sql(f"CREATE INDEX ON {schema}.video_snapshots (video_id, created_at)")
+    conn.exec_driver_sql(f"VACUUM ANALYZE {schema}.video_snapshots")
+    print(f"Unpartitioned copy in {schema}: {time.perf_counter() - started:.1f} s")
+
+
+def iter_range_shapes(creator_id: str, day) -> Iterator[ParsedQuery]:
+    """Snapshot shapes of sql_shapes plus a 30-day range."""
+    for parsed in iter_shapes(creator_id, day):
+        if parsed.entity == "snapshot":
+            yield parsed
+    month = DateRange(start=(day - timedelta(days=29)).isoformat(), end=day.isoformat())
+    for creator in (None, creator_id):
+        yield ParsedQuery(metric="sum_views_delta", entity="snapshot", creator_id=creator, date_range=month)
+
+
+def _shape_name(parsed: ParsedQuery) -> str:
+    name = _name(parsed)
+    if parsed.date_range is not None and parsed.date_range.start != parsed.date_range.end:
+        days = (date.fromisoformat(parsed.date_range.end) - date.fromisoformat(parsed.date_range.start)).days + 1
+        name = name.replace("range", f"{days}d")
+    return name
+
+
+def _partitions_read(plan: Any) -> int:
+    names = set()
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            name = node.get("Relation Name") or ""
+            if name.startswith("video_snapshots_p"):
+                names.add(name)
+            for child in node.get("Plans", []):
+                walk(child)
+            if "Plan" in node:
+                walk(node["Plan"])
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(plan)
+    return len(names)
+
+
+def run(url: str, repeat: int, schema: str, timezone: str, keep: bool) -> Dict[str, Any]:
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    results: List[Dict[str, Any]] = []
+    with engine.connect() as conn:
+        if not _is_partitioned(conn):
+            raise SystemExit("video_snapshots is not partitioned: apply app/migrations/005_partition_video_snapshots.sql")
+        anchors = _data_anchors(conn)
+        total_partitions = conn.execute(text(
+            "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = 'public.video_snapshots'::regclass"
+        )).scalar()
+        if conn.execute(text("SELECT to_regnamespace(:schema)"), {"schema": schema}).scalar() is None:
+            _create_copy(conn, schema)
+
+        try:
+            for parsed in iter_range_shapes(anchors["creator_id"], anchors["day"]):
+                sql, params = build_sql(parsed, use_rollups=False, timezone=timezone)
+                statement = text(sql)
+                row: Dict[str, Any] = {"shape": _shape_name(parsed), "query": parsed.model_dump(exclude_none=True)}
+                for layout in LAYOUTS:
+                    search_path = f"{schema}, public" if layout == "unpartitioned" else "public"
+                    conn.exec_driver_sql(f"SET search_path TO {search_path}")
+                    timings, value = _time_calls(lambda: conn.execute(statement, params).scalar(), repeat)
+                    ms = [t * 1000 for t in timings]
+                    row[layout] = {
+                        "value": int(value or 0),
+                        "p50_ms": round(_percentile(ms, 50), 3),
+                        "p95_ms": round(_percentile(ms, 95), 3),
+                        "mean_ms": round(statistics.fmean(ms), 3),
+                    }
+                    if layout == "partitioned":
+                        plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+                        row["partitions_read"] = _partitions_read(json.loads(plan) if isinstance(plan, str) else plan)
+                if row["unpartitioned"]["value"] != row["partitioned"]["value"]:
+                    raise SystemExit(f"Different answers for {row['shape']}: {row}")
+                results.append(row)
+                before, after = row["unpartitioned"]["p50_ms"], row["partitioned"]["p50_ms"]
+                print(f"{row['shape']:<55} p50 {before:9.3f} -> {after:9.3f}ms "
+                      f"({after / before if before else 0:5.2f}x), partitions {row['partitions_read']}/{total_partitions}")
+        finally:
+            conn.exec_driver_sql("SET search_path TO public")
+            if not keep:
+                conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+    engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "database": make_url(url).render_as_string(hide_password=True),
+            "repeat": repeat,
+            "timezone": timezone,
+            "creator_id": anchors["creator_id"],
+            "day": anchors["day"].isoformat(),
+            "rows": anchors["rows"],
+            "partitions": total_partitions,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--schema", default="partition_bench", help="scratch schema for the unpartitioned copy")
+    parser.add_argument("--keep", action="store_true", help="keep the unpartitioned copy for the next run")
+    parser.add_argument("--timezone", default="UTC")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set (or pass --database-url)")
+
+    report = run(args.database_url, args.repeat, args.schema, args.timezone, args.keep)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nSaved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
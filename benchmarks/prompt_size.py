@@ -0,0 +1,62 @@
+"""
+Prompt size per LLM request: full prompt vs system instruction + k examples.
+
+"full" is the old layout: schema, rules and every example of the bank in
+each request. "slim" is what llm_client sends now: the question with the
+k most similar examples, while the static system instruction is built
+once and is an identical prefix of every request, so the provider's
+prompt cache can serve it.
+
+Token counts are estimated as characters / 4 unless --count-tokens is
+given, in which case the model's count_tokens API is used (needs
+LLM_API_KEY and network access).
+
+    python -m benchmarks.prompt_size
+    python -m benchmarks.prompt_size --count-tokens -k 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+from pathlib import Path
+from typing import Callable
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[1] / "tests" / "data" / "questions.json"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("-k", type=int, default=3, help="examples per request")
+    parser.add_argument("--count-tokens", action="store_true", help="use the model's count_tokens API")
+    args = parser.parse_args(argv)
+
+    from app.nlp.prompt_builder import SYSTEM_INSTRUCTION, build_prompt
+
+    count: Callable[[str], int]
+    if args.count_tokens:
+        from app.nlp import llm_client
+
+        model = llm_client._get_genai().GenerativeModel(llm_client.model_name())
+        count = lambda text: model.count_tokens(text).total_tokens  # noqa: E731
+    else:
+        count = lambda text: len(text) // 4  # noqa: E731
+
+    questions = [item["question"] for item in json.loads(args.corpus.read_text(encoding="utf-8"))]
+    system_tokens = count(SYSTEM_INSTRUCTION)
+
+    full = [count(SYSTEM_INSTRUCTION + "\n\n" + build_prompt(q, k=None)) for q in questions]
+    slim = [count(build_prompt(q, k=args.k)) for q in questions]
+
+    unit = "tokens" if args.count_tokens else "~tokens (chars/4)"
+    print(f"questions: {len(questions)}, unit: {unit}")
+    print(f"system instruction (identical prefix, cacheable): {system_tokens}")
+    print(f"full prompt per request: mean={statistics.fmean(full):.0f} max={max(full)}")
+    print(f"slim prompt per request (k={args.k}): mean={statistics.fmean(slim):.0f} max={max(slim)}")
+    print(f"uncached input per request: -{1 - statistics.fmean(slim) / statistics.fmean(full):.0%}")
+
+
+if __name__ == "__main__":
+    main()
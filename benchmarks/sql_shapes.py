@@ -0,0 +1,219 @@
+"""
+Latency of every build_sql shape against a local Postgres.
+
+Enumerates the shapes build_sql can produce (each metric/entity pair and
+each special, with and without creator, date, time and min_views
+filters), runs every shape --repeat times after a warm-up and reports
+p50/p95 per shape for raw SQL, SQL over the rollup tables and, with
+--executors ...,columnar, the in-memory columnar executor. The creator and dates are taken from the data, so run
+it after loading a realistic dataset, e.g.
+
+    python -m app.scripts.generate_dataset --creators 20000 --snapshots 72 --load
+    python -m benchmarks.sql_shapes --output results/sql-before.json
+    python -m benchmarks.sql_shapes --output results/sql-after.json --compare results/sql-before.json
+
+Uses DATABASE_URL unless --database-url is given.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, make_url
+
+from app.nlp.query_schema import DateRange, ParsedQuery
+from app.services.query_builder import build_sql
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _data_anchors(conn: Connection) -> Dict[str, Any]:
+    """A busy creator and dates inside the loaded data."""
+    creator_id = conn.execute(text(
+        "SELECT creator_id FROM videos GROUP BY creator_id ORDER BY COUNT(*) DESC, creator_id LIMIT 1"
+    )).scalar()
+    # The day before the last publication day has both new videos and snapshots.
+    last = conn.execute(text("SELECT max(video_created_at) FROM videos")).scalar()
+    if creator_id is None or last is None:
+        raise SystemExit("The database is empty: load data first (app.scripts.generate_dataset --load)")
+    day = last.date() - timedelta(days=1)
+    return {
+        "creator_id": creator_id,
+        "day": day,
+        "rows": {
+            table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in ("videos", "video_snapshots")
+        },
+    }
+
+
+def _name(parsed: ParsedQuery) -> str:
+    filters = []
+    if parsed.creator_id is not None:
+        filters.append("creator")
+    if parsed.date_range is not None:
+        filters.append("day" if parsed.date_range.start == parsed.date_range.end else "range")
+    if parsed.time_from is not None:
+        filters.append("hours" if parsed.time_from.endswith(":00") else "minutes")
+    if parsed.min_views is not None:
+        filters.append("min_views")
+    head = f"{parsed.entity}/{parsed.special or parsed.metric}"
+    return head + (" [" + ",".join(filters) + "]" if filters else "")
+
+
+def iter_shapes(creator_id: str, day: date) -> Iterator[ParsedQuery]:
+    single = DateRange(start=day.isoformat(), end=day.isoformat())
+    week = DateRange(start=(day - timedelta(days=6)).isoformat(), end=day.isoformat())
+    date_ranges = [None, single, week]
+    creators = [None, creator_id]
+
+    for metric, creator, date_range, min_views in itertools.product(
+        ["videos_count", "sum_views_total", "sum_likes_total"], creators, date_ranges, [None, 100000]
+    ):
+        yield ParsedQuery(metric=metric, entity="video", creator_id=creator,
+                          date_range=date_range, min_views=min_views)
+
+    for date_range, min_views in itertools.product(date_ranges, [None, 100000]):
+        yield ParsedQuery(metric="videos_count", entity="video", date_range=date_range, min_views=min_views,
+                          special="distinct_creators_with_min_views")
+
+    times = [(None, None), ("10:00", "15:00"), ("10:30", "15:45")]
+    for metric, creator, date_range, (time_from, time_to) in itertools.product(
+        ["sum_views_delta", "videos_count"], creators, date_ranges, times
+    ):
+        if time_from is not None and date_range is not single:
+            continue
+        yield ParsedQuery(metric=metric, entity="snapshot", creator_id=creator, date_range=date_range,
+                          time_from=time_from, time_to=time_to)
+
+    for special, date_range in itertools.product(
+        ["distinct_videos_with_positive_delta", "snapshots_with_negative_delta_views"], date_ranges
+    ):
+        yield ParsedQuery(metric="videos_count", entity="snapshot", date_range=date_range, special=special)
+
+
+EXECUTORS = ("sql", "rollups", "columnar")
+
+
+def _time_calls(call, repeat: int) -> Tuple[List[float], Any]:
+    value = call()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings, value
+
+
+def _sql_call(conn: Connection, parsed: ParsedQuery, use_rollups: bool, timezone: str):
+    sql, params = build_sql(parsed, use_rollups=use_rollups, timezone=timezone)
+    statement = text(sql)
+    return lambda: conn.execute(statement, params).scalar()
+
+
+def run(url: str, repeat: int, executors: List[str], timezone: str) -> Dict[str, Any]:
+    engine = create_engine(url)
+    results = []
+    with engine.connect() as conn:
+        anchors = _data_anchors(conn)
+        shapes = list(iter_shapes(anchors["creator_id"], anchors["day"]))
+
+        store = None
+        if "columnar" in executors:
+            from app.services.columnar import ColumnarStore
+
+            store = ColumnarStore(lambda: engine)
+            store.refresh()
+            print(f"Columnar store loaded: {store.last_refresh}")
+
+        for executor in executors:
+            for parsed in shapes:
+                if executor == "columnar":
+                    call = lambda parsed=parsed: store.execute(parsed, timezone=timezone)  # noqa: E731
+                else:
+                    call = _sql_call(conn, parsed, executor == "rollups", timezone)
+                timings, value = _time_calls(call, repeat)
+                ms = [t * 1000 for t in timings]
+                results.append({
+                    "shape": _name(parsed),
+                    "executor": executor,
+                    "query": parsed.model_dump(exclude_none=True),
+                    "value": int(value or 0),
+                    "p50_ms": round(_percentile(ms, 50), 3),
+                    "p95_ms": round(_percentile(ms, 95), 3),
+                    "mean_ms": round(statistics.fmean(ms), 3),
+                })
+                print(f"{results[-1]['shape']:<70} {executor:<8} "
+                      f"p50={results[-1]['p50_ms']:9.3f}ms p95={results[-1]['p95_ms']:9.3f}ms")
+    engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "database": make_url(url).render_as_string(hide_password=True),
+            "host": platform.node(),
+            "repeat": repeat,
+            "timezone": timezone,
+            "creator_id": anchors["creator_id"],
+            "day": anchors["day"].isoformat(),
+            "rows": anchors["rows"],
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    previous = {(r["shape"], r["executor"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline['meta']['timestamp']} (rows {baseline['meta']['rows']}):")
+    for result in current["results"]:
+        old: Optional[Dict[str, Any]] = previous.get((result["shape"], result["executor"]))
+        if old is None or not old["p50_ms"]:
+            continue
+        print(f"{result['shape']:<70} {result['executor']:<8} "
+              f"p50 {old['p50_ms']:9.3f} -> {result['p50_ms']:9.3f}ms ({result['p50_ms'] / old['p50_ms']:5.2f}x)")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--executors", default="sql,rollups",
+                        help=f"comma-separated subset of {','.join(EXECUTORS)}: raw SQL, SQL with rollup tables, "
+                             "the in-memory columnar executor")
+    parser.add_argument("--timezone", default="UTC")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON of a previous run to compare p50 against")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set (or pass --database-url)")
+
+    executors = [name.strip() for name in args.executors.split(",") if name.strip()]
+    unknown = set(executors) - set(EXECUTORS)
+    if unknown:
+        parser.error(f"unknown executors: {', '.join(sorted(unknown))}")
+    report = run(args.database_url, args.repeat, executors, args.timezone)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nSaved to {args.output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
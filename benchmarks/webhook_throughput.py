@@ -0,0 +1,72 @@
+"""
+Throughput of the webhook endpoint with a fake LLM and database.
+
+Posts synthetic Telegram updates one after another to the aiohttp app
+built by app.main.build_webhook_app (secret check, background handling,
+the production dispatcher). Every update comes from a different user so
+the per-user rate limit does not kick in. Reports how fast updates are
+accepted (HTTP 200) and how fast they are answered.
+
+    python -m benchmarks.webhook_throughput --updates 1000 --db-latency 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks import fakes
+from benchmarks.cold_start import FAKE_ENV
+
+
+SECRET = "bench-secret"
+QUESTION = "Сколько всего видео есть в системе?"
+
+
+async def run_webhook(updates: int, db_latency: float) -> None:
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from app import main
+    from app.nlp import llm_client
+    from app.services import video_service
+
+    main.settings.webhook_secret = SECRET
+    main.settings.webhook_path = "/webhook"
+    llm_client.genai = fakes.FakeGenai()
+    video_service.get_async_session = fakes.fake_async_session(7, db_latency)
+
+    session = fakes.RecordingSession()
+    app = main.build_webhook_app(fakes.make_bot(session), fakes.shared_dispatcher())
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+    async with TestClient(TestServer(app)) as client:
+        started = time.perf_counter()
+        for update_id in range(1, updates + 1):
+            payload = fakes.make_update(update_id, QUESTION, user_id=update_id).model_dump(
+                mode="json", exclude_none=True
+            )
+            response = await client.post("/webhook", json=payload, headers=headers)
+            if response.status != 200:
+                raise RuntimeError(f"update {update_id}: HTTP {response.status}")
+        accepted = time.perf_counter() - started
+        while len(session.replies) < updates:
+            await asyncio.sleep(0.001)
+        answered = time.perf_counter() - started
+
+    print(f"{updates} updates: accepted at {updates / accepted:.0f}/s, answered at {updates / answered:.0f}/s")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--db-latency", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    for name, value in FAKE_ENV.items():
+        os.environ.setdefault(name, value)
+    asyncio.run(run_webhook(args.updates, args.db_latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_CHECK = """
+import sys
+
+import app.main
+import app.scripts.load_json
+from app import config, db
+from app.nlp import llm_client
+
+assert "google.generativeai" not in sys.modules
+assert "dateparser" not in sys.modules
+assert config.get_settings.cache_info().currsize == 0
+assert db._engine is None and db._async_engine is None
+assert llm_client.query_cache is None
+"""
+
+
+def test_importing_the_app_does_not_initialise_heavy_dependencies():
+    # Без переменных окружения: Settings не должны читаться при импорте.
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("TELEGRAM_BOT_TOKEN", "DATABASE_URL", "LLM_API_KEY")}
+
+    subprocess.run([sys.executable, "-c", _CHECK], cwd=ROOT, env=env, check=True)
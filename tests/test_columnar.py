@@ -0,0 +1,223 @@
+"""
+Колоночный исполнитель: небольшие проверки в памяти и дифференциальный
+тест против SQL из build_sql на локальном Postgres (нужен
+TEST_DATABASE_URL, см. tests/test_explain_plans.py).
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.nlp.query_schema import DateRange, ParsedQuery
+from app.services.columnar import ColumnarStore, build_tables, execute
+from app.services.query_builder import build_sql
+from benchmarks.sql_shapes import iter_shapes
+
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "columnar_test"
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "app" / "migrations"
+TIMEZONES = ["UTC", "Europe/Moscow", "Asia/Kolkata"]
+
+
+def _us(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+
+VIDEOS = [
+    ("v1", "c1", _us(2025, 11, 1, 10), 500, 50),
+    ("v2", "c1", _us(2025, 11, 2, 10), 50, 5),
+    ("v3", "c2", _us(2025, 11, 2, 23), 2000, 100),
+]
+SNAPSHOTS = [
+    ("v1", _us(2025, 11, 1, 11), 100),
+    ("v1", _us(2025, 11, 1, 12), -10),
+    ("v3", _us(2025, 11, 3, 0), 7),
+    ("v2", _us(2025, 11, 2, 11), 0),
+]
+
+
+def test_in_memory_queries_and_incremental_build():
+    tables = build_tables(1, VIDEOS, SNAPSHOTS)
+    day = DateRange(start="2025-11-02", end="2025-11-02")
+
+    def run(tables, **fields):
+        return execute(tables, ParsedQuery(**fields))
+
+    assert run(tables, metric="videos_count", entity="video", date_range=day) == 2
+    assert run(tables, metric="sum_views_total", entity="video", creator_id="c1") == 550
+    assert run(tables, metric="videos_count", entity="video", creator_id="nobody") == 0
+    assert run(tables, metric="videos_count", entity="video", min_views=100,
+               special="distinct_creators_with_min_views") == 2
+    assert run(tables, metric="sum_views_delta", entity="snapshot", creator_id="c1") == 90
+    assert run(tables, metric="videos_count", entity="snapshot",
+               special="snapshots_with_negative_delta_views") == 1
+    assert execute(tables, ParsedQuery(metric="videos_count", entity="video", date_range=day),
+                   timezone="Europe/Moscow") == 1
+
+    newer = build_tables(2, VIDEOS + [("v4", "c3", _us(2025, 11, 4), 1, 1)],
+                         [("v4", _us(2025, 11, 4, 1), 5)], previous=tables)
+    assert newer.snapshots_total == 5
+    assert run(newer, metric="sum_views_delta", entity="snapshot") == 102
+    assert run(newer, metric="videos_count", entity="snapshot",
+               special="distinct_videos_with_positive_delta") == 3
+
+    with pytest.raises(ValueError):
+        run(tables, metric="sum_views_delta", entity="video")
+
+
+def test_async_refresh_loads_once_then_revalidates_in_background():
+    now = [0.0]
+    store = ColumnarStore(engine_factory=None, refresh_interval=30, clock=lambda: now[0])
+    calls = []
+
+    def fake_refresh():
+        calls.append(now[0])
+        time.sleep(0.05)
+        store._tables = build_tables(len(calls), VIDEOS, SNAPSHOTS)
+        store._checked_at = now[0]
+        return store._tables
+
+    store.refresh = fake_refresh
+
+    async def run():
+        first = await asyncio.gather(store.ensure_fresh_async(), store.ensure_fresh_async())
+        cached = await store.ensure_fresh_async()
+        now[0] = 31.0
+        stale = await store.ensure_fresh_async()
+        await store._refreshing
+        return first, cached, stale
+
+    first, cached, stale = asyncio.run(run())
+
+    assert calls == [0.0, 31.0]
+    assert [t.data_version for t in first] == [1, 1]
+    assert cached.data_version == 1
+    assert stale.data_version == 1  # ответ не ждёт фонового обновления
+    assert store.tables.data_version == 2
+
+
+SEED_SQL = """
+SELECT ensure_video_snapshot_partitions('2025-10-01', '2025-12-31');
+
+INSERT INTO videos (id, creator_id, video_created_at, views_count, likes_count, comments_count, reports_count,
+                    created_at, updated_at)
+SELECT md5('video-' || i), md5('creator-' || (i % 40)),
+       TIMESTAMPTZ '2025-11-01 00:00:00+00' + (i % 10) * INTERVAL '1 day' + (i * 37 % 1440) * INTERVAL '1 minute',
+       (i * 7919) % 200000, (i * 31) % 5000, 0, 0, now(), now()
+FROM generate_series(1, 400) AS i;
+
+INSERT INTO video_snapshots (id, video_id, views_count, likes_count, comments_count, reports_count,
+                             delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
+                             created_at, updated_at)
+SELECT md5('snapshot-' || i || '-' || h), md5('video-' || i), h * 10, h, 0, 0,
+       (h * 7 + i) % 101 - 5, 0, 0, 0,
+       TIMESTAMPTZ '2025-11-01 00:00:00+00' + (i % 10) * INTERVAL '1 day' + (h * 60 + i % 60) * INTERVAL '1 minute',
+       now()
+FROM generate_series(1, 400) AS i, generate_series(1, 30) AS h;
+"""
+
+MORE_SQL = """
+INSERT INTO videos (id, creator_id, video_created_at, views_count, likes_count, comments_count, reports_count,
+                    created_at, updated_at)
+VALUES (md5('video-new'), md5('creator-new'), TIMESTAMPTZ '2025-11-12 09:00:00+00', 300000, 10, 0, 0, now(), now());
+
+INSERT INTO video_snapshots (id, video_id, views_count, likes_count, comments_count, reports_count,
+                             delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
+                             created_at, updated_at)
+SELECT md5('snapshot-new-' || h), md5('video-new'), h, 0, 0, 0, 50 - h, 0, 0, 0,
+       TIMESTAMPTZ '2025-11-12 10:00:00+00' + h * INTERVAL '1 hour', now()
+FROM generate_series(1, 60) AS h;
+
+UPDATE data_version SET version = version + 1;
+"""
+
+BACKFILL_SQL = """
+INSERT INTO video_snapshots (id, video_id, views_count, likes_count, comments_count, reports_count,
+                             delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
+                             created_at, updated_at)
+VALUES (md5('snapshot-old'), md5('video-1'), 0, 0, 0, 0, -3, 0, 0, 0, TIMESTAMPTZ '2025-11-01 00:30:00+00', now());
+
+UPDATE data_version SET version = version + 1;
+"""
+
+
+def _run_script(conn, sql: str) -> None:
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    admin = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    with engine.begin() as conn:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            _run_script(conn, migration.read_text(encoding="utf-8"))
+        _run_script(conn, SEED_SQL)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.dispose()
+
+
+def _shapes(day_iso: str):
+    from datetime import date
+
+    for creator in (_creator(7), "unknown-creator"):
+        yield from iter_shapes(creator, date.fromisoformat(day_iso))
+    yield ParsedQuery(metric="videos_count", entity="snapshot",
+                      date_range=DateRange(start="2025-11-03", end=None), time_from="10:00")
+
+
+def _creator(i: int) -> str:
+    import hashlib
+
+    return hashlib.md5(f"creator-{i}".encode()).hexdigest()
+
+
+def _assert_matches_sql(engine, store):
+    mismatches = []
+    with engine.connect() as conn:
+        for tz in TIMEZONES:
+            for parsed in _shapes("2025-11-05"):
+                for use_rollups in (False, True):
+                    sql, params = build_sql(parsed, use_rollups=use_rollups, timezone=tz)
+                    expected = int(conn.execute(text(sql), params).scalar() or 0)
+                    actual = store.execute(parsed, timezone=tz)
+                    if actual != expected:
+                        mismatches.append(f"{tz} rollups={use_rollups} {parsed.model_dump(exclude_none=True)}: "
+                                          f"columnar {actual} != sql {expected}")
+    assert not mismatches, "\n".join(mismatches[:20])
+
+
+def test_columnar_matches_sql_and_refreshes_incrementally(engine):
+    store = ColumnarStore(lambda: engine, refresh_interval=0)
+    store.refresh()
+    assert store.last_refresh["kind"] == "full"
+    _assert_matches_sql(engine, store)
+
+    with engine.begin() as conn:
+        _run_script(conn, MORE_SQL)
+    store.refresh()
+    assert store.last_refresh["kind"] == "incremental"
+    assert store.tables.snapshots_total == 400 * 30 + 60
+    _assert_matches_sql(engine, store)
+
+    with engine.begin() as conn:
+        _run_script(conn, BACKFILL_SQL)
+    store.refresh()
+    assert store.last_refresh["kind"] == "full"
+    _assert_matches_sql(engine, store)
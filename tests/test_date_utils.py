@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+from app.services import date_utils
+
+
+FAST_PHRASINGS = [
+    "2025-11-28",
+    "28.11.2025",
+    "28 ноября 2025",
+    "28 ноября 2025 года",
+    "1 Декабря 2025 г.",
+    "3 мая 2024",
+]
+
+
+@pytest.mark.parametrize("value", FAST_PHRASINGS)
+def test_fast_path_agrees_with_dateparser(value):
+    text = date_utils._normalize(value)
+
+    fast = date_utils._fast_parse(text, date.today())
+
+    assert fast is not None
+    assert fast == date_utils._parse_with_dateparser(value)
+
+
+def test_year_is_optional():
+    assert date_utils._fast_parse("28 ноября", date(2025, 12, 1)) == datetime(2025, 11, 28)
+
+
+def test_russian_day_range_takes_month_and_year_from_the_end():
+    assert date_utils.parse_date_range("с 1 по 5 ноября 2025") == (
+        datetime(2025, 11, 1),
+        datetime(2025, 11, 5),
+    )
+    assert date_utils.parse_date_range("с 28 ноября по 2 декабря 2025") == (
+        datetime(2025, 11, 28),
+        datetime(2025, 12, 2),
+    )
+
+
+def test_fast_forms_do_not_call_dateparser_and_are_memoised(monkeypatch):
+    def _fail(text):
+        raise AssertionError(f"dateparser called for {text!r}")
+
+    monkeypatch.setattr(date_utils, "_parse_with_dateparser", _fail)
+    date_utils._parse_cached.cache_clear()
+
+    assert date_utils.parse_date_string("5 ноября 2025") == datetime(2025, 11, 5)
+    assert date_utils.parse_date_string("5  ноября 2025 ") == datetime(2025, 11, 5)
+    assert date_utils._parse_cached.cache_info().hits == 1
+
+
+def test_invalid_day_is_rejected(monkeypatch):
+    monkeypatch.setattr(date_utils, "_parse_with_dateparser", lambda text: None)
+    date_utils._parse_cached.cache_clear()
+
+    with pytest.raises(ValueError):
+        date_utils.parse_date_string("31 ноября 2025")
+
+
+def test_dateparser_is_imported_lazily():
+    code = (
+        "import sys\n"
+        "from app.services.date_utils import parse_date_string, parse_date_range\n"
+        "parse_date_string('2025-11-28')\n"
+        "parse_date_range('с 1 по 5 ноября 2025')\n"
+        "assert 'dateparser' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).resolve().parents[1])
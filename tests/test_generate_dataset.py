@@ -0,0 +1,35 @@
+from app.scripts.generate_dataset import DatasetSpec, iter_videos, output_paths, write_json
+from app.scripts.json_stream import iter_videos as read_videos
+
+
+SPEC = DatasetSpec(creators=20, videos_per_creator=3, snapshots_per_video=6, seed=7)
+
+
+def test_generator_is_deterministic_and_independent_of_split(tmp_path):
+    whole = tmp_path / "whole.json"
+    write_json(SPEC, whole)
+    write_json(SPEC, tmp_path / "again.json")
+    assert whole.read_bytes() == (tmp_path / "again.json").read_bytes()
+
+    parts = output_paths(tmp_path / "part.json", 3)
+    for index, path in enumerate(parts):
+        write_json(SPEC, path, index, len(parts))
+
+    split_ids = sorted(video["id"] for path in parts for video in read_videos(path))
+    assert split_ids == sorted(video["id"] for video in read_videos(whole))
+    assert [path.name for path in parts] == ["part-000.json", "part-001.json", "part-002.json"]
+
+
+def test_snapshots_are_consistent_with_video_totals():
+    videos = list(iter_videos(SPEC))
+    assert len({video["creator_id"] for video in videos}) == SPEC.creators
+
+    for video in videos:
+        snapshots = video["snapshots"]
+        assert len(snapshots) == SPEC.snapshots_per_video
+        assert sum(s["delta_views_count"] for s in snapshots) == video["views_count"]
+        assert all(s["video_id"] == video["id"] for s in snapshots)
+        assert all(a["created_at"] < b["created_at"] for a, b in zip(snapshots, snapshots[1:]))
+        assert snapshots[0]["created_at"] > video["video_created_at"]
+
+    assert list(iter_videos(SPEC._replace(seed=8)))[0]["id"] != videos[0]["id"]
@@ -0,0 +1,239 @@
+"""
+Инкрементальный режим load_json: хэш записи видео, повторная загрузка
+изменённой выгрузки и синхронность creator_stats (нужен TEST_DATABASE_URL,
+см. tests/test_explain_plans.py).
+"""
+import copy
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.scripts import load_json
+
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "incremental_load_test"
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "app" / "migrations"
+
+
+def _snapshot(video_id: str, hour: int, views: int):
+    created_at = f"2025-11-01T{hour:02d}:00:00+00:00"
+    return {
+        "id": f"{video_id}-s{hour}",
+        "video_id": video_id,
+        "views_count": views,
+        "likes_count": 0,
+        "comments_count": 0,
+        "reports_count": 0,
+        "delta_views_count": 10,
+        "delta_likes_count": 0,
+        "delta_comments_count": 0,
+        "delta_reports_count": 0,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def _video(video_id: str, views: int, hours: int, creator_id: str = "creator"):
+    return {
+        "id": video_id,
+        "creator_id": creator_id,
+        "video_created_at": "2025-11-01T00:00:00+00:00",
+        "views_count": views,
+        "likes_count": 1,
+        "comments_count": 0,
+        "reports_count": 0,
+        "created_at": "2025-11-01T00:00:00+00:00",
+        "updated_at": "2025-11-01T00:00:00+00:00",
+        "snapshots": [_snapshot(video_id, hour, hour * 10) for hour in range(1, hours + 1)],
+    }
+
+
+def test_content_hash_ignores_snapshot_order_and_tracks_values():
+    video = _video("v1", 30, 3)
+    reordered = copy.deepcopy(video)
+    reordered["snapshots"].reverse()
+    reordered["unrelated_field"] = "ignored"
+    changed = copy.deepcopy(video)
+    changed["snapshots"][1]["views_count"] += 1
+
+    assert load_json.content_hash(video) == load_json.content_hash(reordered)
+    assert load_json.content_hash(video) != load_json.content_hash(changed)
+    assert load_json._video_params(video)["content_hash"] == load_json.content_hash(video)
+
+
+def _run_script(conn, sql: str) -> None:
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    admin = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    with engine.begin() as conn:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            _run_script(conn, migration.read_text(encoding="utf-8"))
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.dispose()
+
+
+CREATOR_STATS_FROM_VIDEOS_SQL = """
+SELECT creator_id, COUNT(*), SUM(views_count), SUM(likes_count), SUM(comments_count),
+       MAX(views_count), MIN(video_created_at), MAX(video_created_at)
+FROM videos
+GROUP BY creator_id
+ORDER BY creator_id
+"""
+
+CREATOR_STATS_SQL = """
+SELECT creator_id, videos_count, total_views, total_likes, total_comments,
+       max_views, first_video_at, last_video_at
+FROM creator_stats
+ORDER BY creator_id
+"""
+
+
+def _assert_creator_stats_in_sync(conn) -> None:
+    expected = [tuple(row) for row in conn.execute(text(CREATOR_STATS_FROM_VIDEOS_SQL))]
+    assert [tuple(row) for row in conn.execute(text(CREATOR_STATS_SQL))] == expected
+
+
+def _write(path: Path, videos) -> str:
+    path.write_text(json.dumps({"videos": videos}), encoding="utf-8")
+    return str(path)
+
+
+def test_incremental_reload_writes_only_changes(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(load_json, "get_engine", lambda: engine)
+
+    export = [_video("v1", 30, 3), _video("v2", 20, 2), _video("v3", 10, 1)]
+    first = load_json.load_file(_write(tmp_path / "first.json", export), mode="copy")
+    assert first.changes is None
+
+    refreshed = copy.deepcopy(export)
+    refreshed[0] = _video("v1", 40, 4)  # новый замер и новые итоговые просмотры
+    refreshed.append(_video("v4", 5, 2))
+
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version FROM data_version")).scalar()
+    stats = load_json.load_file(_write(tmp_path / "refreshed.json", refreshed), mode="incremental", batch_size=3)
+
+    assert stats.changes == {"inserted": 1, "updated": 1, "skipped": 2, "snapshots_inserted": 3, "creator_kept": 0}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT views_count FROM videos WHERE id = 'v1'")).scalar() == 40
+        assert conn.execute(text("SELECT COUNT(*) FROM video_snapshots")).scalar() == 9
+        assert conn.execute(text("SELECT SUM(snapshots_count) FROM snapshot_rollup_daily")).scalar() == 9
+        assert conn.execute(text("SELECT version FROM data_version")).scalar() == version + 1
+        _assert_creator_stats_in_sync(conn)
+
+    again = load_json.load_file(_write(tmp_path / "again.json", refreshed), mode="incremental")
+
+    assert again.changes == {"inserted": 0, "updated": 0, "skipped": 4, "snapshots_inserted": 0, "creator_kept": 0}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM data_version")).scalar() == version + 1
+
+
+def _truncate(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE video_snapshots, videos CASCADE"))
+        conn.execute(text(
+            "TRUNCATE creator_stats, snapshot_rollup_hourly, snapshot_rollup_daily, snapshot_rollup_video_daily"
+        ))
+
+
+def test_repeated_video_in_one_batch_keeps_all_snapshots(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(load_json, "get_engine", lambda: engine)
+    _truncate(engine)
+
+    first, second = _video("dup", 30, 2), _video("dup", 30, 4)
+    second["snapshots"] = second["snapshots"][2:]
+    stats = load_json.load_file(_write(tmp_path / "dup.json", [first, second]), mode="incremental")
+
+    assert stats.changes["inserted"] == 1
+    assert stats.changes["snapshots_inserted"] == 4
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM video_snapshots WHERE video_id = 'dup'")).scalar() == 4
+
+
+def test_creator_change_is_not_applied(engine, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(load_json, "get_engine", lambda: engine)
+    _truncate(engine)
+
+    load_json.load_file(_write(tmp_path / "first.json", [_video("m1", 30, 2, creator_id="old")]), mode="copy")
+    moved = _video("m1", 40, 3, creator_id="new")
+    stats = load_json.load_file(_write(tmp_path / "moved.json", [moved]), mode="incremental")
+
+    assert stats.changes["updated"] == 1
+    assert stats.changes["creator_kept"] == 1
+    assert "keeping 'old'" in capsys.readouterr().out
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT creator_id, views_count FROM videos WHERE id = 'm1'")).one() == ("old", 40)
+        rollups = conn.execute(text(
+            "SELECT creator_id, SUM(snapshots_count) FROM snapshot_rollup_daily GROUP BY 1"
+        )).all()
+        assert rollups == [("old", 3)]
+        _assert_creator_stats_in_sync(conn)
+
+
+def test_creator_stats_follow_updates_that_lower_extremes(engine):
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE video_snapshots, videos CASCADE"))
+        conn.execute(text("TRUNCATE creator_stats"))
+        conn.execute(text("""
+            INSERT INTO videos (id, creator_id, video_created_at, views_count, likes_count, comments_count,
+                                reports_count, created_at, updated_at)
+            VALUES ('a1', 'a', '2025-11-01', 100, 1, 1, 0, now(), now()),
+                   ('a2', 'a', '2025-11-03', 50, 2, 0, 0, now(), now()),
+                   ('b1', 'b', '2025-11-02', 70, 0, 3, 0, now(), now())
+        """))
+    with engine.begin() as conn:
+        # Максимум и самая ранняя дата автора a уходят вместе с a1.
+        conn.execute(text("UPDATE videos SET views_count = 10, video_created_at = '2025-11-05' WHERE id = 'a1'"))
+        _assert_creator_stats_in_sync(conn)
+        conn.execute(text("UPDATE videos SET creator_id = 'a' WHERE id = 'b1'"))
+        _assert_creator_stats_in_sync(conn)
+        assert conn.execute(text("SELECT COUNT(*) FROM creator_stats")).scalar() == 1
+
+
+@pytest.mark.parametrize("mode", ["row", "batch", "incremental"])
+def test_parallel_shards_keep_aggregates_in_sync(engine, tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(load_json, "get_engine", lambda: engine)
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE video_snapshots, videos CASCADE"))
+        conn.execute(text(
+            "TRUNCATE creator_stats, snapshot_rollup_hourly, snapshot_rollup_daily, snapshot_rollup_video_daily"
+        ))
+        conn.execute(text("SELECT ensure_video_snapshot_partitions('2025-11-01', '2025-11-01')"))
+
+    # Видео каждого креатора разбросаны по всем шардам, а пачка — одна
+    # строка: раньше шарды блокировали строки creator_stats и rollup-таблиц
+    # в разном порядке.
+    export = [_video(f"v{i}", 10 + i, 3, creator_id=f"creator-{i % 7}") for i in range(84)]
+    path = _write(tmp_path / "export.json", export)
+    shards = 4
+
+    def load_shard(shard: int):
+        return load_json.load_file(path, mode=mode, batch_size=1, shard_index=shard, shard_count=shards)
+
+    with ThreadPoolExecutor(max_workers=shards) as pool:
+        results = list(pool.map(load_shard, range(shards)))
+
+    assert sum(stats.videos for stats in results) == len(export)
+    with engine.connect() as conn:
+        _assert_creator_stats_in_sync(conn)
+        assert conn.execute(text("SELECT SUM(snapshots_count) FROM snapshot_rollup_hourly")).scalar() == 3 * len(export)
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from app.scripts.json_stream import find_video_start, iter_videos, iter_videos_shard
+
+
+VIDEOS = [
+    {
+        "id": f"video-{i}",
+        "creator_id": "c" * 32,
+        "views_count": 10 ** i,
+        "snapshots": [{"id": f"snap-{i}-{j}", "delta_views_count": -j} for j in range(5)],
+    }
+    for i in range(7)
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_videos_top_level_list(tmp_path, chunk_size):
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps(VIDEOS, indent=2), encoding="utf-8")
+
+    assert list(iter_videos(path, chunk_size=chunk_size)) == VIDEOS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 1 << 20])
+def test_iter_videos_object_with_videos_key(tmp_path, chunk_size):
+    path = tmp_path / "videos.json"
+    payload = {"meta": {"exported_at": "2025-11-30", "ids": [1, 2, 3]}, "videos": VIDEOS, "total": 7}
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+    assert list(iter_videos(path, chunk_size=chunk_size)) == VIDEOS
+
+
+def test_iter_videos_empty_list(tmp_path):
+    path = tmp_path / "videos.json"
+    path.write_text(" [ ] ", encoding="utf-8")
+
+    assert list(iter_videos(path)) == []
+
+
+def test_iter_videos_rejects_unsupported_structure(tmp_path):
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps({"items": VIDEOS}), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Unsupported JSON structure"):
+        list(iter_videos(path))
+
+
+def test_iter_videos_rejects_truncated_file(tmp_path):
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps(VIDEOS)[:-20], encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        list(iter_videos(path, chunk_size=16))
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("shard_count", [2, 3, 5, 16])
+def test_shards_split_the_file_into_disjoint_ranges(tmp_path, indent, shard_count):
+    # Кириллица в названиях: границы шардов попадают внутрь символов UTF-8.
+    videos = [dict(video, title="Видео «{\"id\": 1}» №" + str(i)) for i, video in enumerate(VIDEOS)]
+    path = tmp_path / "videos.json"
+    path.write_text(json.dumps({"meta": {"id": 0}, "videos": videos}, ensure_ascii=False, indent=indent), encoding="utf-8")
+
+    shards = [list(iter_videos_shard(path, index, shard_count, chunk_size=16)) for index in range(shard_count)]
+
+    assert [video for shard in shards for video in shard] == videos
+
+
+def test_find_video_start_skips_snapshots(tmp_path):
+    path = tmp_path / "videos.json"
+    raw = json.dumps(VIDEOS).encode("utf-8")
+    path.write_bytes(raw)
+    second = raw.index(b'{"id": "video-1"')
+
+    assert find_video_start(path, 0) == 1
+    assert find_video_start(path, 2, chunk_size=8) == second
+    assert find_video_start(path, second) == second
+    assert find_video_start(path, len(raw) - 5) == len(raw)
+
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.nlp import llm_client
+from app.nlp.query_cache import TemplateQueryCache
+from app.single_flight import SingleFlight
+
+
+_ANSWER = json.dumps({
+    "metric": "videos_count",
+    "entity": "video",
+    "creator_id": None,
+    "min_views": None,
+    "date_range": None,
+    "time_from": None,
+    "time_to": None,
+    "special": None,
+})
+
+
+class _FakeUsage:
+    prompt_token_count = 120
+    cached_content_token_count = 0
+    candidates_token_count = 40
+
+
+class _FakeResponse:
+    text = _ANSWER
+    usage_metadata = _FakeUsage()
+
+
+def _install_fake_model(monkeypatch, delay: float, stats: dict) -> None:
+    class _FakeModel:
+        def __init__(self, name, system_instruction=None):
+            self.name = name
+            stats["system_instruction"] = system_instruction
+
+        async def generate_content_async(self, prompt):
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                stats["in_flight"] -= 1
+            return _FakeResponse()
+
+    monkeypatch.setattr(llm_client, "genai", SimpleNamespace(GenerativeModel=_FakeModel))
+    monkeypatch.setattr(llm_client, "_llm_semaphore", None)
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(llm_client, "query_cache", TemplateQueryCache(max_size=0))
+
+
+def test_parse_user_query_async_respects_concurrency_cap(monkeypatch):
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    _install_fake_model(monkeypatch, delay=0.01, stats=stats)
+    monkeypatch.setattr(llm_client.settings, "llm_max_concurrency", 2)
+
+    async def run():
+        return await asyncio.gather(*(llm_client.parse_user_query_async(f"q{i}") for i in range(6)))
+
+    results = asyncio.run(run())
+
+    assert [r.metric for r in results] == ["videos_count"] * 6
+    assert stats["max_in_flight"] == 2
+
+
+def test_parse_user_query_async_times_out(monkeypatch):
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    _install_fake_model(monkeypatch, delay=1.0, stats=stats)
+    monkeypatch.setattr(llm_client.settings, "llm_timeout_seconds", 0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm_client.parse_user_query_async("q"))
+
+
+def test_confident_rule_parse_skips_llm(monkeypatch):
+    calls = []
+
+    class _RecordingModel:
+        def __init__(self, name, system_instruction=None):
+            calls.append(name)
+
+    monkeypatch.setattr(llm_client, "genai", SimpleNamespace(GenerativeModel=_RecordingModel))
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(llm_client, "query_cache", TemplateQueryCache(max_size=0))
+
+    parsed = asyncio.run(llm_client.parse_user_query_async("Сколько всего видео есть в системе?"))
+
+    assert parsed.metric == "videos_count"
+    assert parsed.entity == "video"
+    assert calls == []
+
+
+def test_schema_is_sent_once_as_system_instruction(monkeypatch):
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    _install_fake_model(monkeypatch, delay=0, stats=stats)
+    before = llm_client.usage_stats()
+
+    async def run():
+        for _ in range(3):
+            await llm_client.parse_user_query_async("q")
+
+    asyncio.run(run())
+    after = llm_client.usage_stats()
+
+    assert stats["system_instruction"] == llm_client.SYSTEM_INSTRUCTION
+    assert after["requests"] - before["requests"] == 3
+    assert after["prompt_tokens"] - before["prompt_tokens"] == 360
+
+
+def test_identical_concurrent_questions_share_one_llm_call(monkeypatch):
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    _install_fake_model(monkeypatch, delay=0.01, stats=stats)
+    monkeypatch.setattr(llm_client, "parse_flight", SingleFlight())
+
+    async def run():
+        questions = ["Какая статистика?", "какая  статистика", "Какая статистика?!"] * 4
+        return await asyncio.gather(*(llm_client.parse_user_query_async(q) for q in questions))
+
+    results = asyncio.run(run())
+
+    assert len(results) == 12
+    assert llm_client.parse_flight.stats()["calls"] == 1
+    assert llm_client.parse_flight.stats()["coalesced"] == 11
+
+
+def test_batch_parses_unknown_questions_with_one_llm_call(monkeypatch):
+    prompts = []
+
+    class _BatchModel:
+        def __init__(self, name, system_instruction=None):
+            pass
+
+        async def generate_content_async(self, prompt):
+            prompts.append(prompt)
+            invalid = {"metric": "unknown", "entity": "video"}
+            return SimpleNamespace(text=f"[{_ANSWER}, {json.dumps(invalid)}]", usage_metadata=_FakeUsage())
+
+    monkeypatch.setattr(llm_client, "genai", SimpleNamespace(GenerativeModel=_BatchModel))
+    monkeypatch.setattr(llm_client, "_llm_semaphore", None)
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(llm_client, "query_cache", TemplateQueryCache(max_size=0))
+
+    questions = ["Сколько всего видео есть в системе?", "Какая статистика?", "Что-то непонятное?", "какая статистика"]
+    results = asyncio.run(llm_client.parse_user_queries_async(questions))
+
+    assert len(prompts) == 1
+    assert '1. "Какая статистика?"\n2. "Что-то непонятное?"\n\n' in prompts[0]
+    assert results[0].metric == results[1].metric == "videos_count"  # правила и LLM
+    assert results[2] is None
+    assert results[3] == results[1]
+
+
+@pytest.mark.parametrize("failure", ["timeout", "wrong_length"])
+def test_batch_llm_failure_keeps_local_answers(monkeypatch, failure):
+    class _FailingModel:
+        def __init__(self, name, system_instruction=None):
+            pass
+
+        async def generate_content_async(self, prompt):
+            if failure == "timeout":
+                await asyncio.sleep(1)
+            return SimpleNamespace(text=f"[{_ANSWER}, {_ANSWER}]", usage_metadata=_FakeUsage())
+
+    monkeypatch.setattr(llm_client, "genai", SimpleNamespace(GenerativeModel=_FailingModel))
+    monkeypatch.setattr(llm_client, "_llm_semaphore", None)
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(llm_client, "query_cache", TemplateQueryCache(max_size=0))
+    monkeypatch.setattr(llm_client.settings, "llm_timeout_seconds", 0.01)
+
+    questions = ["Сколько всего видео есть в системе?", "Какая статистика?"]
+    results = asyncio.run(llm_client.parse_user_queries_async(questions))
+
+    assert results[0].metric == "videos_count"  # ответ правил не потерян
+    assert results[1] is None
@@ -0,0 +1,25 @@
+import asyncio
+
+from app.nlp import llm_client
+from app.services import video_service
+from benchmarks import load_test
+
+
+def test_load_harness_replays_corpus_through_dispatcher(monkeypatch):
+    # run_load подменяет LLM и БД фейками; monkeypatch вернёт оригиналы.
+    monkeypatch.setattr(llm_client, "genai", llm_client.genai)
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(video_service, "get_async_session", video_service.get_async_session)
+    monkeypatch.setattr(llm_client.settings, "rule_parser_min_confidence", 2.0)
+    monkeypatch.setattr(llm_client, "query_cache", None)
+    monkeypatch.setattr(llm_client.settings, "query_cache_size", 0)
+
+    corpus = load_test.load_corpus(load_test.DEFAULT_CORPUS)[:5]
+    report = asyncio.run(load_test.run_load(corpus, rate=100, duration=0.3, users=30,
+                                            llm_latency=0.01, db_latency=0.0))
+
+    assert report["messages"] == 30
+    assert report["outcomes"]["ok"] == 30
+    assert report["error_rate"] == 0
+    assert report["llm_calls"] == 30
+    assert report["latency_ms"]["p50"] > 0
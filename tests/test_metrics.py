@@ -0,0 +1,90 @@
+import asyncio
+import socket
+
+import aiohttp
+
+from app import metrics
+from app.nlp.query_schema import ParsedQuery
+from app.services import video_service
+from app.services.result_cache import ResultCache
+from app.single_flight import SingleFlight
+from benchmarks import fakes
+
+
+def test_counter_and_histogram_render_in_prometheus_text_format():
+    registry = metrics.Registry()
+    errors = registry.register(metrics.Counter("demo_errors_total", "Errors", ["stage"]))
+    latency = registry.register(metrics.Histogram("demo_seconds", "Latency", buckets=(0.1, 1.0)))
+
+    errors.inc(stage="sql")
+    errors.inc(2, stage="sql")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_errors_total Errors",
+        "# TYPE demo_errors_total counter",
+        'demo_errors_total{stage="sql"} 3',
+        "# HELP demo_seconds Latency",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1"} 2',
+        'demo_seconds_bucket{le="+Inf"} 3',
+        "demo_seconds_sum 3.55",
+        "demo_seconds_count 3",
+    ]
+
+
+def test_sql_latency_is_labelled_by_query_shape(monkeypatch):
+    monkeypatch.setattr(video_service, "get_async_session", fakes.fake_async_session(value=7))
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(video_service, "query_flight", SingleFlight())
+
+    labels = {"metric": "sum_views_delta", "entity": "snapshot", "special": None}
+    before = metrics.SQL_LATENCY.count(**labels)
+
+    parsed = ParsedQuery(metric="sum_views_delta", entity="snapshot")
+    assert asyncio.run(video_service.execute_analytics_query_async(parsed)) == 7
+
+    assert metrics.SQL_LATENCY.count(**labels) == before + 1
+    assert metrics.SQL_IN_FLIGHT.value() == 0
+    assert 'bot_sql_duration_seconds_count{metric="sum_views_delta",entity="snapshot",special="none"}' in metrics.render()
+
+
+def test_single_flight_counts_leaders_and_coalesced_calls():
+    flight = SingleFlight("parse")
+    before = {result: metrics.SINGLE_FLIGHT.value(flight="parse", result=result) for result in ("leader", "coalesced")}
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert metrics.SINGLE_FLIGHT.value(flight="parse", result="leader") == before["leader"] + 1
+    assert metrics.SINGLE_FLIGHT.value(flight="parse", result="coalesced") == before["coalesced"] + 4
+    assert 'bot_single_flight_requests_total{flight="parse",result="coalesced"}' in metrics.render()
+
+
+def test_metrics_endpoint_serves_registry():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def run():
+        runner = await metrics.start_metrics_server("127.0.0.1", port)
+        try:
+            async with aiohttp.ClientSession() as client:
+                async with client.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    return response.status, response.headers["Content-Type"], await response.text()
+        finally:
+            await runner.cleanup()
+
+    status, content_type, body = asyncio.run(run())
+
+    assert status == 200
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE bot_llm_tokens_total counter" in body
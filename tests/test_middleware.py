@@ -0,0 +1,94 @@
+import asyncio
+
+from aiogram import Dispatcher, Router
+from aiogram.types import Message
+
+from app.bot.middleware import OVERLOADED_REPLY, RATE_LIMITED_REPLY, AdmissionMiddleware, TokenBucket
+from benchmarks import fakes
+
+
+def _dispatcher(middleware: AdmissionMiddleware, delay: float = 0.0):
+    handled = []
+    router = Router()
+
+    @router.message()
+    async def _handler(message: Message) -> None:
+        await asyncio.sleep(delay)
+        handled.append(message.text)
+        await message.answer("ok")
+
+    dp = Dispatcher()
+    dp.message.middleware(middleware)
+    dp.include_router(router)
+    return dp, handled
+
+
+def _replies(session):
+    return sorted(text for _, text in session.replies)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=2, refill_per_second=1.0, now=0.0)
+
+    assert [bucket.take(0.0), bucket.take(0.0), bucket.take(0.0)] == [True, True, False]
+    assert bucket.take(0.5) is False
+    assert bucket.take(1.0) is True
+
+
+def test_user_over_the_rate_limit_gets_a_polite_reply():
+    now = [0.0]
+    middleware = AdmissionMiddleware(rate_per_minute=60, burst=2, max_in_flight=0, clock=lambda: now[0])
+    dp, handled = _dispatcher(middleware)
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+
+    async def run():
+        for update_id in range(1, 4):
+            await dp.feed_update(bot, fakes.make_update(update_id, f"q{update_id}", user_id=1))
+        await dp.feed_update(bot, fakes.make_update(4, "other user", user_id=2))
+        now[0] = 1.0
+        await dp.feed_update(bot, fakes.make_update(5, "after refill", user_id=1))
+
+    asyncio.run(run())
+
+    assert handled == ["q1", "q2", "other user", "after refill"]
+    assert _replies(session) == sorted(["ok"] * 4 + [RATE_LIMITED_REPLY])
+    assert middleware.stats()["rate_limited"] == 1
+
+
+def test_burst_beyond_in_flight_and_queue_is_shed():
+    middleware = AdmissionMiddleware(rate_per_minute=0, max_in_flight=2, max_queue=2)
+    dp, handled = _dispatcher(middleware, delay=0.02)
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+
+    async def run():
+        await asyncio.gather(*(
+            dp.feed_update(bot, fakes.make_update(i, f"q{i}", user_id=i)) for i in range(1, 7)
+        ))
+
+    asyncio.run(run())
+
+    assert len(handled) == 4
+    assert _replies(session) == sorted(["ok"] * 4 + [OVERLOADED_REPLY] * 2)
+    stats = middleware.stats()
+    assert (stats["admitted"], stats["queued"], stats["shed"], stats["in_flight"]) == (4, 2, 2, 0)
+
+
+def test_queue_wait_is_bounded_by_timeout():
+    middleware = AdmissionMiddleware(rate_per_minute=0, max_in_flight=1, max_queue=10, queue_timeout=0.01)
+    dp, handled = _dispatcher(middleware, delay=0.1)
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+
+    async def run():
+        await asyncio.gather(
+            dp.feed_update(bot, fakes.make_update(1, "slow", user_id=1)),
+            dp.feed_update(bot, fakes.make_update(2, "waits too long", user_id=2)),
+        )
+
+    asyncio.run(run())
+
+    assert handled == ["slow"]
+    assert _replies(session) == sorted(["ok", OVERLOADED_REPLY])
+    assert middleware.stats()["in_flight"] == 0
@@ -0,0 +1,26 @@
+import asyncio
+
+from app.nlp import llm_client
+from app.services import video_service
+from app.services.result_cache import ResultCache
+from benchmarks import load_test, multi_question
+
+
+def test_one_message_with_several_questions_costs_one_llm_call_and_one_statement(monkeypatch):
+    # _run подменяет LLM и БД фейками; monkeypatch вернёт оригиналы.
+    monkeypatch.setattr(llm_client, "genai", llm_client.genai)
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(video_service, "get_async_session", video_service.get_async_session)
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(llm_client.settings, "rule_parser_min_confidence", 2.0)
+    monkeypatch.setattr(llm_client, "query_cache", None)
+    monkeypatch.setattr(llm_client.settings, "query_cache_size", 0)
+
+    corpus = load_test.load_corpus(load_test.DEFAULT_CORPUS)[:4]
+    report = asyncio.run(multi_question._run([q for q, _ in corpus], dict(corpus), llm_latency=0.0, db_latency=0.0))
+
+    assert report["separate"]["llm_calls"] == 4
+    assert report["separate"]["db_statements"] == 4
+    assert report["one_message"]["llm_calls"] == 1
+    assert report["one_message"]["db_statements"] == 1
+    assert report["one_message"]["last_reply"] == "1. 42\n2. 42\n3. 42\n4. 42"
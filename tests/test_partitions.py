@@ -0,0 +1,173 @@
+"""
+Секционирование video_snapshots (миграция 005): загрузчик создаёт
+недостающие партиции и раскладывает по ним замеры во всех режимах.
+
+Нужен локальный Postgres (TEST_DATABASE_URL, см. tests/test_explain_plans.py).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.scripts.load_json import LOAD_MODES, _make_writer, _snapshot_params, _video_params
+
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "partitions_test"
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "app" / "migrations"
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def _video(mode: str, snapshots=None):
+    video_id = f"video-{mode}"
+    snapshots = snapshots or [
+        # 2024-02-29 и 2024-03-01 по UTC, хотя локальная дата у первого — 1 марта.
+        ("2024-03-01T02:30:00+03:00", 10),
+        ("2024-03-01T00:00:00+00:00", -2),
+        ("2024-03-01T23:59:59+00:00", 5),
+    ]
+    return {
+        "id": video_id,
+        "creator_id": "creator",
+        "video_created_at": "2024-02-29T12:00:00+00:00",
+        "views_count": 13,
+        "likes_count": 0,
+        "comments_count": 0,
+        "reports_count": 0,
+        "created_at": "2024-02-29T12:00:00+00:00",
+        "updated_at": "2024-03-01T23:59:59+00:00",
+        "snapshots": [
+            {
+                "id": f"{video_id}-{i}",
+                "views_count": 0,
+                "likes_count": 0,
+                "comments_count": 0,
+                "reports_count": 0,
+                "delta_views_count": delta,
+                "delta_likes_count": 0,
+                "delta_comments_count": 0,
+                "delta_reports_count": 0,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            for i, (created_at, delta) in enumerate(snapshots)
+        ],
+    }
+
+
+def _run_script(conn, sql: str) -> None:
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    admin = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"options": f"-csearch_path={SCHEMA} -cvideo_stats.snapshot_partition_granularity=day"},
+    )
+    with engine.begin() as conn:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            _run_script(conn, migration.read_text(encoding="utf-8"))
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.dispose()
+
+
+def _write(conn, mode: str, video) -> None:
+    writer = _make_writer(conn, mode, batch_size=2)
+    writer.add_video(_video_params(video))
+    for snap in video["snapshots"]:
+        writer.add_snapshot(_snapshot_params(video["id"], snap))
+    writer.finish()
+
+
+def _load(engine, mode: str, video) -> None:
+    with engine.begin() as conn:
+        _write(conn, mode, video)
+
+
+def _wait_for_partition_lock(engine, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    with engine.connect() as conn:
+        while time.monotonic() < deadline:
+            waiting = conn.execute(text(
+                "SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database() "
+                "AND wait_event_type = 'Lock' AND query LIKE '%ensure_video_snapshot_partitions%'"
+            )).scalar()
+            # pg_stat_activity читается один раз за транзакцию.
+            conn.rollback()
+            if waiting:
+                return
+            time.sleep(0.05)
+    pytest.fail("второй загрузчик не дождался блокировки партиций")
+
+
+@pytest.mark.parametrize("mode", LOAD_MODES)
+def test_loader_creates_partitions_and_routes_rows(engine, mode):
+    video = _video(mode)
+    _load(engine, mode, video)
+    _load(engine, mode, video)  # повторная загрузка ничего не дублирует
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT tableoid::regclass::text, COUNT(*) FROM video_snapshots WHERE video_id = :id GROUP BY 1 ORDER BY 1"
+        ), {"id": video["id"]}).all()
+        rollup = conn.execute(text(
+            "SELECT SUM(snapshots_count), SUM(delta_views_sum) FROM snapshot_rollup_video_daily WHERE video_id = :id"
+        ), {"id": video["id"]}).one()
+
+    assert rows == [("video_snapshots_p20240229", 1), ("video_snapshots_p20240301", 2)]
+    assert tuple(rollup) == (3, 13)
+
+
+@pytest.mark.parametrize("mode", LOAD_MODES)
+def test_concurrent_loaders_create_partition_once(engine, mode):
+    # Первый загрузчик создал партицию и ещё не закоммитил, второй ждёт его
+    # и после коммита должен увидеть партицию, а не создавать её снова.
+    created_at = f"2024-04-{10 + LOAD_MODES.index(mode):02d}T12:00:00+00:00"
+    first = _video(f"race-first-{mode}", [(created_at, 1)])
+    second = _video(f"race-second-{mode}", [(created_at, 2)])
+
+    with engine.connect() as conn, ThreadPoolExecutor(max_workers=1) as pool:
+        with conn.begin():
+            _write(conn, mode, first)
+            waiting = pool.submit(_load, engine, mode, second)
+            _wait_for_partition_lock(engine)
+        waiting.result(timeout=30)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT tableoid::regclass::text, COUNT(*) FROM video_snapshots "
+            "WHERE video_id IN (:first, :second) GROUP BY 1"
+        ), {"first": first["id"], "second": second["id"]}).all()
+
+    assert rows == [(f"video_snapshots_p{created_at[:10].replace('-', '')}", 2)]
+
+
+def test_future_partitions_are_created_by_the_migration(engine):
+    with engine.connect() as conn:
+        granularity, premake_days = conn.execute(text(
+            "SELECT granularity, extract(day FROM premake) FROM video_snapshot_partitioning"
+        )).one()
+        future = conn.execute(text(
+            "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = 'video_snapshots'::regclass "
+            "AND inhrelid::regclass::text >= 'video_snapshots_p' || to_char(now() AT TIME ZONE 'UTC', 'YYYYMMDD')"
+        )).scalar()
+        created_again = conn.execute(text("SELECT create_future_video_snapshot_partitions()")).scalar()
+
+    assert granularity == "day"
+    assert future == premake_days + 1
+    assert created_again == 0
@@ -0,0 +1,40 @@
+from app.nlp.prompt_builder import SYSTEM_INSTRUCTION, build_batch_prompt, build_prompt, select_examples
+from app.nlp.prompt_examples import EXAMPLE_BANK
+
+
+def test_negative_delta_question_gets_negative_delta_example():
+    examples = select_examples("Сколько замеров с отрицательным приростом было 2 декабря 2025?", k=2)
+
+    assert any("отрицательн" in question or "падением" in question for question, _ in examples)
+
+
+def test_creator_question_gets_creator_examples():
+    examples = select_examples("Сколько лайков у видео креатора с id 42?", k=1)
+
+    assert "лайков" in examples[0][0]
+    assert "креатора" in examples[0][0]
+
+
+def test_prompt_contains_only_k_examples_and_no_schema():
+    prompt = build_prompt("Сколько всего видео?", k=2)
+
+    assert prompt.count("Example ") == 2
+    assert "Database schema" not in prompt
+    assert "Database schema" in SYSTEM_INSTRUCTION
+    assert prompt.rstrip().endswith("Return ONLY the JSON object for ParsedQuery.")
+
+
+def test_k_none_uses_whole_bank():
+    prompt = build_prompt("Сколько всего видео?", k=None)
+
+    assert prompt.count("Example ") == len(EXAMPLE_BANK)
+
+
+def test_batch_prompt_numbers_questions_and_shares_examples():
+    questions = ["Сколько всего видео?", "Сколько всего видео в системе?"]
+    prompt = build_batch_prompt(questions, k=2)
+    examples = [question for question, _ in select_examples(questions[0], k=2) + select_examples(questions[1], k=2)]
+
+    assert prompt.count("Example ") == len(set(examples))
+    assert '1. "Сколько всего видео?"\n2. "Сколько всего видео в системе?"' in prompt
+    assert prompt.rstrip().endswith("Return ONLY a JSON array of 2 ParsedQuery objects, one per question, in the same order.")
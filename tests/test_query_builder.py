@@ -1,5 +1,13 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
 from app.nlp.query_schema import ParsedQuery, DateRange
-from app.services.query_builder import build_sql
+from app.services.query_builder import build_batch_sql, build_sql
+
+
+UTC = ZoneInfo("UTC")
 
 
 def _normalize_sql(sql: str) -> str:
@@ -59,10 +67,10 @@ def test_sum_views_delta_single_date():
 
     assert "SELECT COALESCE(SUM(s.delta_views_count), 0) AS value" in norm
     assert "FROM video_snapshots AS s" in norm
-    assert "s.created_at::date BETWEEN :start_date AND :end_date" in norm
+    assert "s.created_at >= :start_ts AND s.created_at < :end_ts" in norm
     assert params == {
-        "start_date": "2025-11-28",
-        "end_date": "2025-11-28",
+        "start_ts": datetime(2025, 11, 28, tzinfo=UTC),
+        "end_ts": datetime(2025, 11, 29, tzinfo=UTC),
     }
 
 
@@ -82,8 +90,216 @@ def test_special_distinct_videos_with_positive_delta():
     assert "SELECT COUNT(DISTINCT s.video_id) AS value" in norm
     assert "FROM video_snapshots AS s" in norm
     assert "s.delta_views_count > 0" in norm
-    assert "s.created_at::date BETWEEN :start_date AND :end_date" in norm
+    assert "s.created_at >= :start_ts AND s.created_at < :end_ts" in norm
+    assert params == {
+        "start_ts": datetime(2025, 11, 27, tzinfo=UTC),
+        "end_ts": datetime(2025, 11, 28, tzinfo=UTC),
+    }
+
+
+def test_rollups_full_range_sum_views_delta():
+    parsed = ParsedQuery(metric="sum_views_delta", entity="snapshot")
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert norm == "SELECT COALESCE(SUM(r.delta_views_sum), 0) AS value FROM snapshot_rollup_daily AS r"
+    assert params == {}
+
+
+def test_rollups_whole_days_with_creator():
+    parsed = ParsedQuery(
+        metric="videos_count",
+        entity="snapshot",
+        creator_id="abc",
+        date_range=DateRange(start="2025-11-01", end="2025-11-05"),
+    )
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert "SELECT COALESCE(SUM(r.snapshots_count), 0) AS value" in norm
+    assert "FROM snapshot_rollup_daily AS r" in norm
+    assert "r.bucket_date >= :start_date AND r.bucket_date <= :end_date" in norm
+    assert "r.creator_id = :creator_id" in norm
+    assert params == {
+        "start_date": date(2025, 11, 1),
+        "end_date": date(2025, 11, 5),
+        "creator_id": "abc",
+    }
+
+
+def test_rollups_hour_aligned_time_window():
+    parsed = ParsedQuery(
+        metric="sum_views_delta",
+        entity="snapshot",
+        date_range=DateRange(start="2025-11-28", end="2025-11-28"),
+        time_from="10:00",
+        time_to="15:00",
+    )
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert "FROM snapshot_rollup_hourly AS r" in norm
+    assert "r.bucket_start >= :start_ts AND r.bucket_start < :end_ts" in norm
+    # Правая граница BETWEEN включительна: замеры ровно в 15:00 добираются из сырой таблицы.
+    assert "s.created_at = :end_ts" in norm
+    assert params == {
+        "start_ts": datetime(2025, 11, 28, 10, 0, tzinfo=UTC),
+        "end_ts": datetime(2025, 11, 28, 15, 0, tzinfo=UTC),
+    }
+
+
+def test_rollups_not_used_for_unaligned_time_window():
+    parsed = ParsedQuery(
+        metric="sum_views_delta",
+        entity="snapshot",
+        date_range=DateRange(start="2025-11-28", end="2025-11-28"),
+        time_from="10:30",
+        time_to="15:00",
+    )
+
+    assert build_sql(parsed, use_rollups=True) == build_sql(parsed)
+
+
+def test_rollups_distinct_videos_with_positive_delta():
+    parsed = ParsedQuery(
+        metric="videos_count",
+        entity="snapshot",
+        date_range=DateRange(start="2025-11-27", end="2025-11-27"),
+        special="distinct_videos_with_positive_delta",
+    )
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert "SELECT COUNT(DISTINCT r.video_id) AS value" in norm
+    assert "FROM snapshot_rollup_video_daily AS r" in norm
+    assert "r.positive_delta_count > 0" in norm
+
+
+def test_date_range_uses_reporting_timezone():
+    parsed = ParsedQuery(
+        metric="videos_count",
+        entity="video",
+        creator_id="abc",
+        date_range=DateRange(start="2025-11-01", end="2025-11-05"),
+    )
+
+    sql, params = build_sql(parsed, timezone="Europe/Moscow")
+    norm = _normalize_sql(sql)
+
+    assert "v.video_created_at >= :start_ts AND v.video_created_at < :end_ts" in norm
+    assert "::date" not in norm
+    assert params["start_ts"] == datetime(2025, 10, 31, 21, 0, tzinfo=UTC)
+    assert params["end_ts"] == datetime(2025, 11, 5, 21, 0, tzinfo=UTC)
+
+
+def test_rollups_use_hourly_buckets_outside_utc():
+    parsed = ParsedQuery(
+        metric="sum_views_delta",
+        entity="snapshot",
+        date_range=DateRange(start="2025-11-28", end="2025-11-28"),
+    )
+
+    sql, params = build_sql(parsed, use_rollups=True, timezone="Europe/Moscow")
+    norm = _normalize_sql(sql)
+
+    assert "FROM snapshot_rollup_hourly AS r" in norm
+    assert "r.bucket_start >= :start_ts AND r.bucket_start < :end_ts" in norm
     assert params == {
-        "start_date": "2025-11-27",
-        "end_date": "2025-11-27",
+        "start_ts": datetime(2025, 11, 27, 21, 0, tzinfo=UTC),
+        "end_ts": datetime(2025, 11, 28, 21, 0, tzinfo=UTC),
     }
+
+
+def test_creator_stats_for_creator_totals():
+    parsed = ParsedQuery(metric="sum_views_total", entity="video", creator_id="abc")
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert norm == ("SELECT COALESCE(SUM(c.total_views), 0) AS value FROM creator_stats AS c "
+                    "WHERE c.creator_id = :creator_id")
+    assert params == {"creator_id": "abc"}
+
+
+def test_creator_stats_distinct_creators_with_min_views():
+    parsed = ParsedQuery(metric="videos_count", entity="video", min_views=100000,
+                         special="distinct_creators_with_min_views")
+
+    sql, params = build_sql(parsed, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert norm == "SELECT COUNT(*) AS value FROM creator_stats AS c WHERE c.max_views > :min_views"
+    assert params == {"min_views": 100000}
+
+
+def test_creator_stats_not_used_with_date_or_min_views_filters():
+    dated = ParsedQuery(metric="videos_count", entity="video", creator_id="abc",
+                        date_range=DateRange(start="2025-11-01", end="2025-11-05"))
+    popular = ParsedQuery(metric="sum_likes_total", entity="video", min_views=1000)
+
+    assert build_sql(dated, use_rollups=True) == build_sql(dated)
+    assert build_sql(popular, use_rollups=True) == build_sql(popular)
+
+
+def test_batch_shares_common_filters_and_filters_the_rest():
+    period = DateRange(start="2025-11-01", end="2025-11-05")
+    queries = [
+        ParsedQuery(metric="videos_count", entity="video", date_range=period),
+        ParsedQuery(metric="sum_views_total", entity="video", date_range=period, min_views=1000),
+        ParsedQuery(metric="videos_count", entity="video", date_range=period, min_views=2000),
+    ]
+
+    sql, params = build_batch_sql(queries)
+    norm = _normalize_sql(sql)
+
+    assert norm == (
+        "SELECT COUNT(*) AS q0, "
+        "COALESCE(SUM(v.views_count) FILTER (WHERE v.views_count > :min_views), 0) AS q1, "
+        "COUNT(*) FILTER (WHERE v.views_count > :min_views_1) AS q2 "
+        "FROM videos AS v WHERE v.video_created_at >= :start_ts AND v.video_created_at < :end_ts"
+    )
+    assert params["min_views"] == 1000 and params["min_views_1"] == 2000
+
+
+def test_batch_reads_each_table_once():
+    period = DateRange(start="2025-11-28", end="2025-11-28")
+    queries = [
+        ParsedQuery(metric="videos_count", entity="video", creator_id="abc", date_range=period),
+        ParsedQuery(metric="sum_views_delta", entity="snapshot", creator_id="abc", date_range=period),
+        ParsedQuery(metric="videos_count", entity="snapshot", date_range=period,
+                    special="snapshots_with_negative_delta_views"),
+    ]
+
+    norm = _normalize_sql(build_batch_sql(queries)[0])
+
+    assert norm.startswith("SELECT video_pass.q0, snapshot_pass.q1, snapshot_pass.q2 FROM (")
+    assert norm.count("FROM videos AS v") == 1
+    assert norm.count("FROM video_snapshots AS s") == 1
+    assert "CROSS JOIN" in norm
+
+
+def test_batch_keeps_rollup_queries_as_subqueries():
+    period = DateRange(start="2025-11-28", end="2025-11-28")
+    queries = [
+        ParsedQuery(metric="videos_count", entity="video", date_range=period),
+        ParsedQuery(metric="sum_views_delta", entity="snapshot", date_range=period),
+    ]
+
+    sql, params = build_batch_sql(queries, use_rollups=True)
+    norm = _normalize_sql(sql)
+
+    assert "FROM snapshot_rollup_daily AS r" in norm
+    assert "FROM video_snapshots" not in norm
+    assert norm.endswith(") AS video_pass")
+    assert params["q1_start_date"] == date(2025, 11, 28)
+
+
+def test_batch_rejects_shapes_build_sql_rejects():
+    with pytest.raises(ValueError):
+        build_batch_sql([ParsedQuery(metric="sum_views_delta", entity="video")])
+    with pytest.raises(ValueError):
+        build_batch_sql([])
@@ -0,0 +1,123 @@
+from app.nlp.query_cache import TemplateQueryCache, canonicalize
+from app.nlp.query_schema import DateRange, ParsedQuery
+
+
+CREATOR_A = "aca1061a9d324ecf8c3fa2bb32d7be63"
+CREATOR_B = "0123456789abcdef0123456789abcdef"
+
+
+def test_canonicalize_extracts_slots():
+    template, slots = canonicalize(
+        f"Сколько видео у креатора с id {CREATOR_A} вышло с 1 по 5 ноября 2025 включительно?"
+    )
+
+    assert template == "сколько видео у креатора с id <id> вышло с <date> по <date> включительно"
+    assert [(s.kind, s.value) for s in slots] == [
+        ("id", CREATOR_A),
+        ("date", "2025-11-01"),
+        ("date", "2025-11-05"),
+    ]
+
+
+def test_canonicalize_groups_thousands():
+    template, slots = canonicalize("Сколько видео набрало больше 100 000 просмотров?")
+
+    assert template == "сколько видео набрало больше <num> просмотров"
+    assert [(s.kind, s.value) for s in slots] == [("num", 100000)]
+
+
+def test_learned_template_is_filled_with_new_slots():
+    cache = TemplateQueryCache(max_size=10)
+    learned = cache.learn(
+        f"Сколько видео у креатора с id {CREATOR_A} вышло с 1 по 5 ноября 2025 включительно?",
+        ParsedQuery(
+            metric="videos_count",
+            entity="video",
+            creator_id=CREATOR_A,
+            date_range=DateRange(start="2025-11-01", end="2025-11-05"),
+        ),
+    )
+
+    parsed = cache.get(
+        f"Сколько видео у креатора с id {CREATOR_B} вышло с 3 по 9 декабря 2025 включительно?"
+    )
+
+    assert learned
+    assert parsed == ParsedQuery(
+        metric="videos_count",
+        entity="video",
+        creator_id=CREATOR_B,
+        date_range=DateRange(start="2025-12-03", end="2025-12-09"),
+    )
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_unmatched_values_are_not_learned():
+    cache = TemplateQueryCache(max_size=10)
+
+    # 2025-11-30 не следует ни из одного слота вопроса.
+    learned = cache.learn(
+        "Сколько видео вышло в ноябре 2025?",
+        ParsedQuery(
+            metric="videos_count",
+            entity="video",
+            date_range=DateRange(start="2025-11-01", end="2025-11-30"),
+        ),
+    )
+
+    assert not learned
+    assert cache.get("Сколько видео вышло в декабре 2025?") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = tmp_path / "query_cache.json"
+    cache = TemplateQueryCache(max_size=2, path=str(path))
+    for question in ("Сколько всего видео?", "Сколько всего креаторов?", "Сколько всего замеров?"):
+        cache.learn(question, ParsedQuery(metric="videos_count", entity="video"))
+    # Новые шаблоны сохраняются в фоне; flush() дописывает их сразу.
+    assert not path.exists()
+    cache.flush()
+
+    reloaded = TemplateQueryCache(max_size=2, path=str(path))
+
+    assert len(reloaded) == 2
+    assert reloaded.get("Сколько всего видео?") is None
+    assert reloaded.get("сколько  всего замеров") is not None
+
+
+def test_numeric_creator_id_is_filled_as_string():
+    cache = TemplateQueryCache(max_size=10)
+    learned = cache.learn(
+        "Сколько видео у креатора 123 вышло 5 ноября 2025?",
+        ParsedQuery(
+            metric="videos_count",
+            entity="video",
+            creator_id="123",
+            date_range=DateRange(start="2025-11-05", end="2025-11-05"),
+        ),
+    )
+
+    parsed = cache.get("Сколько видео у креатора 456 вышло 7 ноября 2025?")
+
+    assert learned
+    assert parsed == ParsedQuery(
+        metric="videos_count",
+        entity="video",
+        creator_id="456",
+        date_range=DateRange(start="2025-11-07", end="2025-11-07"),
+    )
+
+
+def test_invalid_skeleton_is_a_miss(tmp_path):
+    path = tmp_path / "query_cache.json"
+    # Скелет, которому значение слота не подходит: min_views из даты.
+    path.write_text(
+        '{"templates": [["сколько видео вышло <date>", '
+        '{"metric": "videos_count", "entity": "video", "min_views": {"$slot": 0}}]]}',
+        encoding="utf-8",
+    )
+    cache = TemplateQueryCache(max_size=10, path=str(path))
+
+    assert cache.get("Сколько видео вышло 5 ноября 2025?") is None
+    assert cache.stats() == {"size": 0, "hits": 0, "misses": 1}
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.nlp.query_schema import DateRange
+from app.services import video_service
+from app.services.report import REPORT_USAGE, parse_report_args, report_queries
+from app.services.result_cache import ResultCache
+from benchmarks import fakes
+
+
+CREATOR = "aca1061a9d324ecf8c3fa2bb32d7be63"
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        ("с 1 по 5 ноября 2025", (DateRange(start="2025-11-01", end="2025-11-05"), None)),
+        ("28 ноября 2025 года", (DateRange(start="2025-11-28", end="2025-11-28"), None)),
+        (f"2025-11-28 {CREATOR}", (DateRange(start="2025-11-28", end="2025-11-28"), CREATOR)),
+        ("  28.11.2025   123 ", (DateRange(start="2025-11-28", end="2025-11-28"), "123")),
+    ],
+)
+def test_parse_report_args(args, expected):
+    assert parse_report_args(args) == expected
+
+
+@pytest.mark.parametrize("args", [None, "", "   ", "абырвалг"])
+def test_parse_report_args_rejects_missing_period(args):
+    with pytest.raises(ValueError):
+        parse_report_args(args)
+
+
+def test_report_queries_mark_rows_not_filtered_by_creator():
+    period = DateRange(start="2025-11-01", end="2025-11-05")
+
+    panel = report_queries(period, CREATOR, min_views=1000)
+
+    assert len(panel) == 6
+    for label, parsed in panel:
+        assert parsed.date_range == period
+        assert ("(все креаторы)" in label) == (parsed.creator_id is None)
+    assert not any("(все креаторы)" in label for label, _ in report_queries(period, None, min_views=1000))
+
+
+def test_report_command_answers_with_one_statement(monkeypatch):
+    executed = []
+    monkeypatch.setattr(video_service, "get_async_session", fakes.fake_async_session(value=7, executed=executed))
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(video_service.settings, "query_executor", "sql")
+
+    session = fakes.RecordingSession()
+    bot = fakes.make_bot(session)
+    dp = fakes.shared_dispatcher()
+
+    async def run():
+        await dp.feed_update(bot, fakes.make_update(1, "/report 28 ноября 2025", user_id=5001))
+        await dp.feed_update(bot, fakes.make_update(2, "/report", user_id=5002))
+
+    asyncio.run(run())
+
+    assert len(executed) == 1
+    assert "FILTER (WHERE" in executed[0]
+    report, usage = [reply for _, reply in session.replies]
+    title, *lines = report.splitlines()
+    assert title == "Отчёт за 2025-11-28:"
+    assert len(lines) == 6 and all(line.endswith(": 7") for line in lines)
+    assert usage == REPORT_USAGE
@@ -0,0 +1,54 @@
+from app.services.result_cache import ResultCache
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_make_key_normalizes_whitespace_and_param_order():
+    key_a = ResultCache.make_key("SELECT COUNT(*)\n  FROM videos AS v", {"b": 2, "a": 1})
+    key_b = ResultCache.make_key("SELECT COUNT(*) FROM videos AS v", {"a": 1, "b": 2})
+
+    assert key_a == key_b
+
+
+def test_hit_until_ttl_expires():
+    clock = _FakeClock()
+    cache = ResultCache(max_size=10, ttl_seconds=60, clock=clock)
+    key = ResultCache.make_key("SELECT 1", {})
+
+    cache.set(key, data_version=1, value=42)
+    clock.now = 59
+    assert cache.get(key, data_version=1) == 42
+
+    clock.now = 61
+    assert cache.get(key, data_version=1) is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_data_version_change_invalidates_everything():
+    cache = ResultCache(max_size=10, ttl_seconds=60)
+    key = ResultCache.make_key("SELECT 1", {})
+
+    cache.set(key, data_version=1, value=42)
+
+    assert cache.get(key, data_version=2) is None
+    assert cache.get(key, data_version=1) is None
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_size=2, ttl_seconds=60)
+    keys = [ResultCache.make_key(f"SELECT {i}", {}) for i in range(3)]
+
+    cache.set(keys[0], 1, 0)
+    cache.set(keys[1], 1, 1)
+    cache.get(keys[0], 1)
+    cache.set(keys[2], 1, 2)
+
+    assert cache.get(keys[1], 1) is None
+    assert cache.get(keys[0], 1) == 0
+    assert cache.get(keys[2], 1) == 2
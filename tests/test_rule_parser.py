@@ -0,0 +1,72 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.nlp.query_schema import ParsedQuery
+from app.nlp.rule_parser import parse_with_rules
+
+
+CORPUS_PATH = Path(__file__).resolve().parent / "data" / "questions.json"
+MIN_CONFIDENCE = 0.9
+
+CORPUS = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+
+
+def _dump(parsed: ParsedQuery) -> dict:
+    return parsed.model_dump(exclude_none=True)
+
+
+def test_confident_answers_agree_with_llm_reference():
+    disagreements = []
+    for item in CORPUS:
+        result = parse_with_rules(item["question"])
+        if result.confidence < MIN_CONFIDENCE:
+            continue
+        if item["llm"] is None:
+            disagreements.append(f"{item['question']!r}: should be left to the LLM")
+            continue
+        expected = _dump(ParsedQuery.model_validate(item["llm"]))
+        if _dump(result.parsed) != expected:
+            disagreements.append(f"{item['question']!r}: {_dump(result.parsed)} != {expected}")
+
+    assert not disagreements, "\n".join(disagreements)
+
+
+def test_corpus_coverage():
+    answerable = [item for item in CORPUS if item["llm"] is not None]
+    covered = [
+        item for item in answerable
+        if parse_with_rules(item["question"]).confidence >= MIN_CONFIDENCE
+    ]
+
+    assert len(covered) / len(answerable) >= 0.9
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Сколько видео вышло 28 ноября?",
+        "Сколько видео вышло с 5 по 1 ноября 2025?",
+        "Сколько видео у креатора с id 1 и у креатора с id 2?",
+        # Открытые периоды не должны превращаться в один день.
+        "Сколько видео вышло до 1 ноября 2025?",
+        "Сколько видео вышло после 5 ноября 2025?",
+        "Сколько видео вышло раньше 5 ноября 2025?",
+        "Сколько видео вышло позже 5 ноября 2025?",
+        "Сколько видео вышло начиная с 5 ноября 2025?",
+        "Сколько видео вышло по 5 ноября 2025?",
+        # Фильтр или вторая метрика, которые правила не используют.
+        "Сколько видео с хотя бы одним лайком?",
+        "Сколько видео и креаторов?",
+        "Сколько видео вышло 28 ноября 2025 в Москве?",
+    ],
+)
+def test_unsure_questions_fall_back(question):
+    assert parse_with_rules(question).confidence < MIN_CONFIDENCE
+
+
+def test_creator_id_keeps_original_case():
+    result = parse_with_rules("Сколько видео у креатора с id AbC-42?")
+
+    assert result.parsed.creator_id == "AbC-42"
@@ -0,0 +1,48 @@
+from app.nlp.splitter import split_questions
+
+
+def test_numbered_lines_and_question_marks_are_split():
+    text = "1. Сколько всего видео?\n2) Сколько просмотров 28.11.2025?\n\n- А лайков? И креаторов?"
+
+    assert split_questions(text) == [
+        "Сколько всего видео?",
+        "Сколько просмотров 28.11.2025?",
+        "А лайков?",
+        "И креаторов?",
+    ]
+
+
+def test_single_question_with_clarification_is_kept_whole():
+    text = "На сколько выросли просмотры 28 ноября 2025 года? Нужно сложить изменения между замерами."
+
+    assert split_questions(text) == [text]
+    assert split_questions("1. Сколько всего видео?") == ["1. Сколько всего видео?"]
+    assert split_questions("  ") == []
+
+
+def test_wrapped_question_is_joined():
+    text = "Сколько всего видео,\nопубликованных в июне 2025 года?"
+
+    assert split_questions(text) == [text]
+    assert split_questions("1. Сколько всего видео,\nопубликованных в июне 2025 года?\n2. А лайков?") == [
+        "Сколько всего видео, опубликованных в июне 2025 года?",
+        "А лайков?",
+    ]
+    assert split_questions("- Сколько всего видео\n- Сколько креаторов?") == [
+        "Сколько всего видео",
+        "Сколько креаторов?",
+    ]
+
+
+def test_clarification_line_stays_with_its_question():
+    text = "Сколько видео у креатора с id 123?\nЗа ноябрь 2025.\nА лайков?"
+
+    assert split_questions(text) == ["Сколько видео у креатора с id 123? За ноябрь 2025.", "А лайков?"]
+
+
+def test_question_word_starts_a_new_question():
+    assert split_questions("Сколько видео\nСколько креаторов") == ["Сколько видео", "Сколько креаторов"]
+    assert split_questions("Сколько видео вышло,\nесли считать ноябрь?\nКакое число замеров?") == [
+        "Сколько видео вышло, если считать ноябрь?",
+        "Какое число замеров?",
+    ]
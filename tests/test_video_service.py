@@ -0,0 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app import metrics
+from app.nlp.query_schema import ParsedQuery
+from app.services import video_service
+from app.services.result_cache import ResultCache
+from app.single_flight import SingleFlight
+
+
+class _Result:
+    def scalar(self):
+        return 5
+
+
+class _Session:
+    def __init__(self, executed):
+        self._executed = executed
+
+    async def execute(self, statement, params=None):
+        self._executed.append(str(statement))
+        await asyncio.sleep(0.01)
+        return _Result()
+
+
+def test_identical_concurrent_queries_hit_the_database_once(monkeypatch):
+    executed = []
+
+    @asynccontextmanager
+    async def _session():
+        yield _Session(executed)
+
+    monkeypatch.setattr(video_service, "get_async_session", _session)
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(video_service, "query_flight", SingleFlight("query"))
+    coalesced = metrics.SINGLE_FLIGHT.value(flight="query", result="coalesced")
+
+    parsed = ParsedQuery(metric="videos_count", entity="video", min_views=1000)
+    other = ParsedQuery(metric="videos_count", entity="video", min_views=2000)
+
+    async def run():
+        return await asyncio.gather(
+            *(video_service.execute_analytics_query_async(parsed) for _ in range(5)),
+            video_service.execute_analytics_query_async(other),
+        )
+
+    assert asyncio.run(run()) == [5] * 6
+    assert len(executed) == 2
+    assert video_service.query_flight.stats()["coalesced"] == 4
+    assert metrics.SINGLE_FLIGHT.value(flight="query", result="coalesced") == coalesced + 4
+
+
+def test_batch_runs_distinct_queries_in_one_statement(monkeypatch):
+    executed = []
+
+    class _Row(_Result):
+        def one(self):
+            return (7, 8)
+
+    class _BatchSession(_Session):
+        async def execute(self, statement, params=None):
+            executed.append((str(statement), params))
+            return _Row()
+
+    @asynccontextmanager
+    async def _session():
+        yield _BatchSession(executed)
+
+    monkeypatch.setattr(video_service, "get_async_session", _session)
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(video_service.settings, "query_executor", "sql")
+
+    queries = [
+        ParsedQuery(metric="videos_count", entity="video", min_views=1000),
+        ParsedQuery(metric="sum_views_delta", entity="video"),  # build_sql не поддерживает
+        ParsedQuery(metric="videos_count", entity="video", min_views=2000),
+        ParsedQuery(metric="videos_count", entity="video", min_views=1000),
+    ]
+
+    assert asyncio.run(video_service.execute_analytics_queries_async(queries)) == [7, None, 8, 7]
+    assert len(executed) == 1
+    sql, params = executed[0]
+    assert ":q0_min_views" in sql and ":q1_min_views" in sql
+    assert params == {"q0_min_views": 1000, "q1_min_views": 2000}
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Optional
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from app import main
+from app.nlp import llm_client
+from app.services import video_service
+from app.services.result_cache import ResultCache
+from benchmarks import fakes
+
+
+SECRET = "test-secret"
+QUESTION = "Сколько всего видео есть в системе?"
+
+
+async def _wait_for_replies(session: fakes.RecordingSession, count: int, timeout: float = 10.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while len(session.replies) < count:
+        assert time.perf_counter() < deadline, f"{len(session.replies)}/{count} updates handled"
+        await asyncio.sleep(0.001)
+
+
+def _webhook_app(monkeypatch, gate: Optional[asyncio.Event] = None):
+    monkeypatch.setattr(main.settings, "webhook_secret", SECRET)
+    monkeypatch.setattr(main.settings, "webhook_path", "/webhook")
+    monkeypatch.setattr(llm_client, "genai", fakes.FakeGenai())
+    monkeypatch.setattr(llm_client, "_model", None)
+    monkeypatch.setattr(video_service, "get_async_session", fakes.fake_async_session(7, gate=gate))
+    monkeypatch.setattr(video_service, "result_cache", ResultCache(max_size=0))
+
+    session = fakes.RecordingSession()
+    app = main.build_webhook_app(fakes.make_bot(session), fakes.shared_dispatcher())
+    return app, session
+
+
+def _payload(update_id: int, text: str = QUESTION, user_id: int = 1000) -> dict:
+    return fakes.make_update(update_id, text, user_id=user_id).model_dump(mode="json", exclude_none=True)
+
+
+def test_webhook_rejects_wrong_secret(monkeypatch):
+    app, session = _webhook_app(monkeypatch)
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            missing = await client.post("/webhook", json=_payload(1))
+            wrong = await client.post(
+                "/webhook", json=_payload(2), headers={"X-Telegram-Bot-Api-Secret-Token": "nope"}
+            )
+            return missing.status, wrong.status
+
+    assert asyncio.run(run()) == (401, 401)
+    assert session.replies == []
+
+
+def test_webhook_answers_before_processing_and_handles_updates(monkeypatch):
+    # Запрос к БД ждёт события: Telegram должен получить 200 раньше.
+    gate = asyncio.Event()
+    app, session = _webhook_app(monkeypatch, gate=gate)
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            # Если webhook ждёт обработку, ответа не будет, пока gate закрыт.
+            response = await asyncio.wait_for(
+                client.post("/webhook", json=_payload(1), headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}),
+                timeout=5,
+            )
+            replies_before = list(session.replies)
+            gate.set()
+            await _wait_for_replies(session, 1)
+            return response.status, replies_before
+
+    status, replies_before = asyncio.run(run())
+
+    assert status == 200
+    assert replies_before == []
+    assert session.replies == [(1000, "7")]
+
+
+def test_webhook_handles_many_updates(monkeypatch):
+    app, session = _webhook_app(monkeypatch)
+    updates = 50
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            for update_id in range(1, updates + 1):
+                # Разные пользователи, чтобы не упереться в персональный лимит.
+                payload = _payload(update_id, user_id=update_id)
+                response = await client.post("/webhook", json=payload, headers=headers)
+                assert response.status == 200
+            await _wait_for_replies(session, updates)
+
+    asyncio.run(run())
+
+    assert [text for _, text in session.replies] == ["7"] * updates